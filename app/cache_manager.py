@@ -1,17 +1,28 @@
-from functools import lru_cache
-from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Tuple
 import time
 import hashlib
-import json
 import structlog
 
 logger = structlog.get_logger()
 
 class CacheManager:
+    """Per-user LRU cache with TTL.
+    
+    Entries are kept in recency order, so eviction is O(1), and each user's
+    keys are indexed so invalidate_user drops exactly that user's entries.
+    """
+    
     def __init__(self, max_size: int = 100, ttl_seconds: int = 300):
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self.cache: Dict[str, Tuple[Any, float]] = {}
+        self.cache: "OrderedDict[str, Tuple[Any, float, str]]" = OrderedDict()
+        self.user_keys: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
         
     def _make_key(self, user_id: str, operation: str, *args) -> str:
         key_data = f"{user_id}:{operation}:{':'.join(str(arg) for arg in args)}"
@@ -20,34 +31,60 @@ class CacheManager:
     def get(self, user_id: str, operation: str, *args) -> Optional[Any]:
         key = self._make_key(user_id, operation, *args)
         
-        if key in self.cache:
-            value, timestamp = self.cache[key]
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, timestamp, _ = entry
             if time.time() - timestamp < self.ttl_seconds:
+                self.cache.move_to_end(key)
+                self.hits += 1
                 logger.debug("cache_hit", user_id=user_id, operation=operation)
                 return value
-            else:
-                del self.cache[key]
+            self._remove(key)
+            self.expirations += 1
                 
+        self.misses += 1
         logger.debug("cache_miss", user_id=user_id, operation=operation)
         return None
         
     def set(self, user_id: str, operation: str, value: Any, *args):
         key = self._make_key(user_id, operation, *args)
         
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][1])
-            del self.cache[oldest_key]
+        if key in self.cache:
+            self._remove(key)
+        while len(self.cache) >= self.max_size:
+            self._remove(next(iter(self.cache)))
+            self.evictions += 1
             
-        self.cache[key] = (value, time.time())
+        self.cache[key] = (value, time.time(), user_id)
+        self.user_keys.setdefault(user_id, set()).add(key)
         logger.debug("cache_set", user_id=user_id, operation=operation)
         
     def invalidate_user(self, user_id: str):
-        keys_to_remove = [
-            key for key in self.cache.keys()
-            if key.startswith(hashlib.md5(f"{user_id}:".encode()).hexdigest()[:8])
-        ]
+        keys_to_remove = self.user_keys.pop(user_id, ())
         
         for key in keys_to_remove:
             del self.cache[key]
+        self.invalidations += len(keys_to_remove)
+            
+        if keys_to_remove:
+            logger.info("cache_invalidated", user_id=user_id, keys_removed=len(keys_to_remove))
+            
+    def _remove(self, key: str):
+        _, _, user_id = self.cache.pop(key)
+        keys = self.user_keys[user_id]
+        keys.discard(key)
+        if not keys:
+            del self.user_keys[user_id]
             
-        logger.info("cache_invalidated", user_id=user_id, keys_removed=len(keys_to_remove))
\ No newline at end of file
+    def get_metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.cache),
+            "users": len(self.user_keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
\ No newline at end of file
@@ -6,6 +6,40 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
     llm_provider: str = "openai"
+    llm_fallback_provider: Optional[str] = None
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_latency_window: int = 200
+    stub_llm_latency_ms: int = 500
+    openai_base_url: Optional[str] = None
+    anthropic_base_url: Optional[str] = None
+    llm_pool_max_connections: int = 100
+    llm_pool_max_keepalive: int = 20
+    llm_pool_keepalive_expiry_s: float = 30.0
+    llm_connect_timeout_s: float = 5.0
+    llm_request_timeout_s: float = 60.0
+    llm_sdk_max_retries: int = 2
+    llm_warmup: bool = True
+    llm_guard_enabled: bool = True
+    llm_limit_initial: int = 100
+    llm_limit_min: int = 1
+    llm_limit_max: int = 1000
+    llm_limit_backoff: float = 0.9
+    llm_queue_max: int = 200
+    llm_queue_timeout_s: float = 5.0
+    llm_breaker_failures: int = 3
+    llm_breaker_reset_s: float = 30.0
+    response_cache_enabled: bool = False
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_s: int = 300
+    response_cache_nonzero_temperature: bool = False
+    idempotency_max_entries: int = 10000
+    idempotency_ttl_s: int = 86400
+    prompt_memory_max_tokens: int = 1000
+    prompt_node_max_tokens: int = 200
+    prompt_memory_max_nodes: int = 5
+    prompt_token_counting: str = "exact"
+    prompt_token_cache_entries: int = 100000
     log_level: str = "INFO"
     redis_url: Optional[str] = None
     max_concurrent_users: int = 10
@@ -13,6 +47,33 @@ class Settings(BaseSettings):
     default_temperature: float = 0.7
     default_max_tokens: int = 500
     
+    memory_backend: str = "networkx"
+    memory_persistence_dir: Optional[str] = None
+    memory_log_flush_interval_ms: int = 10
+    memory_snapshot_interval: int = 100000
+    memory_snapshot_fork: bool = True
+    memory_max_hot_users: int = 0
+    memory_max_hot_bytes: int = 0
+    memory_cold_store_path: str = "memory_cold.db"
+    memory_retrieval_strategy: str = "bm25"
+    memory_embedding_dim: int = 256
+    memory_embedding_lsh_min_vectors: int = 50000
+    memory_recency_half_life_hours: float = 336.0
+    memory_dedup_max_distance: int = -1
+    memory_compaction_window: int = 0
+    memory_compaction_digest_size: int = 50
+    memory_compaction_max_digests: int = 16
+    memory_compaction_raw_messages: str = "spill"
+    memory_compaction_archive_path: str = "memory_archive.db"
+    memory_compaction_interval_ms: int = 10
+    keyword_tracker: str = "exact"
+    keyword_sketch_width: int = 4096
+    keyword_sketch_depth: int = 4
+    keyword_sketch_capacity: int = 256
+    preference_min_idf: float = 3.0
+    preference_idf_min_documents: int = 1000
+    document_frequency_width: int = 65536
+    document_frequency_depth: int = 4
     memory_retrieval_timeout_ms: int = 200
     total_response_timeout_ms: int = 3000
 
@@ -6,6 +6,7 @@ class ChatRequest(BaseModel):
     userId: str
     message: str
     config: Optional[Dict[str, Any]] = {}
+    idempotencyKey: Optional[str] = None
 
 class MemoryNode(BaseModel):
     nodeId: str
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from llm.base import LLMClient, LLMConfig
+import structlog
+
+logger = structlog.get_logger()
+
+# Context window (tokens) by model name prefix, longest prefix first
+CONTEXT_WINDOWS = [
+    ("gpt-4o", 128000),
+    ("gpt-4-turbo", 128000),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 16385),
+    ("claude", 200000)
+]
+DEFAULT_CONTEXT_WINDOW = 8192
+# "- " and the newline around each memory line
+LINE_OVERHEAD_TOKENS = 2
+# A node cut shorter than this is dropped rather than packed as a fragment
+MIN_FRAGMENT_TOKENS = 16
+
+def context_window(model: str) -> int:
+    for prefix, tokens in CONTEXT_WINDOWS:
+        if model.startswith(prefix):
+            return tokens
+    return DEFAULT_CONTEXT_WINDOW
+
+def approximate_tokens(text: str) -> int:
+    """About 4 characters per token for English text; no encoding"""
+    return (len(text) + 3) // 4
+
+class PromptPacker:
+    """Packs ranked memory nodes into a token budget for the prompt.
+    
+    The budget is the smaller of max_memory_tokens and what the model's
+    context window leaves after the reply (max_tokens), the system prompt
+    and the current message. Nodes go in rank order, each cut to
+    node_max_tokens; a node that no longer fits is cut to the space left,
+    or skipped in favour of smaller ones further down.
+    
+    Stored nodes are counted with the client's tokenizer once: the count is
+    kept in an LRU per tokenizer model and node id, checked against the
+    content's length and hash (the text itself is not kept, so the cache
+    holds no copy of message bodies), so a message is never encoded again
+    while it is cached.
+    With exact=False, or for the per-turn text, counts are approximated
+    from the length instead.
+    """
+    
+    def __init__(self, max_memory_tokens: int = 1000, node_max_tokens: int = 200, max_nodes: int = 5,
+                 exact: bool = True, cache_entries: int = 100000):
+        self.max_memory_tokens = max_memory_tokens
+        self.node_max_tokens = node_max_tokens
+        self.max_nodes = max_nodes
+        self.exact = exact
+        self.cache_entries = cache_entries
+        self.token_counts: "OrderedDict[Tuple[str, str], Tuple[int, int, int]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prompts = 0
+        self.memory_tokens = 0
+        self.truncated_nodes = 0
+        self.dropped_nodes = 0
+        
+    def node_tokens(self, llm_client: Optional[LLMClient], node_id: Optional[str], text: str) -> int:
+        if not self.exact or llm_client is None:
+            return approximate_tokens(text)
+        if node_id is None:
+            return llm_client.count_tokens(text)
+        # Node ids carry the user id, and a reused id (memory cleared) fails the content check
+        key = (getattr(llm_client, "default_model", ""), node_id)
+        entry = self.token_counts.get(key)
+        if entry is not None and entry[0] == len(text) and entry[1] == hash(text):
+            self.token_counts.move_to_end(key)
+            self.cache_hits += 1
+            return entry[2]
+        self.cache_misses += 1
+        tokens = llm_client.count_tokens(text)
+        self.token_counts[key] = (len(text), hash(text), tokens)
+        self.token_counts.move_to_end(key)
+        if len(self.token_counts) > self.cache_entries:
+            self.token_counts.popitem(last=False)
+        return tokens
+        
+    def memory_budget(self, message: str, stage: str, llm_client: Optional[LLMClient],
+                      llm_config: Optional[LLMConfig]) -> int:
+        if llm_client is None or llm_config is None:
+            return self.max_memory_tokens
+        model = llm_config.model or getattr(llm_client, "default_model", "")
+        fixed = approximate_tokens(message) + approximate_tokens(llm_config.system_prompt or "") + approximate_tokens(stage) + 40
+        return max(0, min(self.max_memory_tokens, context_window(model) - llm_config.max_tokens - fixed))
+        
+    def pack(self, message: str, memory_nodes: List[Dict], stage: str,
+             llm_client: Optional[LLMClient] = None, llm_config: Optional[LLMConfig] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """Memory lines for the prompt, best first, and what packing them cost"""
+        budget = remaining = self.memory_budget(message, stage, llm_client, llm_config)
+        lines = []
+        truncated = dropped = 0
+        
+        for node in memory_nodes:
+            if len(lines) >= self.max_nodes:
+                break
+            if not isinstance(node, dict):
+                continue
+            if node.get("content"):
+                text, prefix = node["content"], ""
+                # The turn's own message is already in the prompt
+                if text is message or text == message:
+                    continue
+            elif node.get("keyword"):
+                text, prefix = node["keyword"], "User likes: "
+            else:
+                continue
+                
+            tokens = self.node_tokens(llm_client, node.get("id"), text)
+            room = min(self.node_max_tokens, remaining - LINE_OVERHEAD_TOKENS - approximate_tokens(prefix))
+            if tokens > room:
+                if room < MIN_FRAGMENT_TOKENS or prefix:
+                    dropped += 1
+                    continue
+                # Cut by characters in proportion; exact re-encoding would cost more than it saves
+                text = text[:len(text) * room // tokens].rstrip() + " ..."
+                tokens = room
+                truncated += 1
+            lines.append(f"- {prefix}{text}")
+            remaining -= tokens + LINE_OVERHEAD_TOKENS + approximate_tokens(prefix)
+            
+        self.prompts += 1
+        self.memory_tokens += budget - remaining
+        self.truncated_nodes += truncated
+        self.dropped_nodes += dropped
+        return lines, {"budget": budget, "memory_tokens": budget - remaining, "truncated": truncated, "dropped": dropped}
+        
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "prompts": self.prompts,
+            "memory_tokens_avg": self.memory_tokens / self.prompts if self.prompts else 0.0,
+            "truncated_nodes": self.truncated_nodes,
+            "dropped_nodes": self.dropped_nodes,
+            "token_cache_entries": len(self.token_counts),
+            "token_cache_hits": self.cache_hits,
+            "token_cache_misses": self.cache_misses
+        }
\ No newline at end of file
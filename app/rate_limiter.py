@@ -39,4 +39,11 @@ class RateLimiter:
                 
             oldest_request = self.user_requests[user_id][0]
             wait_time = 60 - (time.time() - oldest_request)
-            return max(0, wait_time)
\ No newline at end of file
+            return max(0, wait_time)
+            
+    def forget(self, user_id: str):
+        """Drop an idle user's request history so it does not stay resident"""
+        with self.lock:
+            requests = self.user_requests.get(user_id)
+            if requests is not None and (not requests or requests[-1] < time.time() - 60):
+                del self.user_requests[user_id]
\ No newline at end of file
@@ -1,27 +1,154 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
+from collections import deque
+import asyncio
+import hashlib
+import json
 import uuid
 import time
 import structlog
 from app.models import ChatRequest, ChatResponse, MemoryNode
 from app.cache_manager import CacheManager
+from app.prompt_packer import PromptPacker
+from app.config import settings
 from memory.simple_graph_manager import SimpleGraphManager
-from memory.keyword_extractor import KeywordExtractor
+from memory.compact_graph_manager import CompactGraphManager
+from memory.keyword_extractor import KeywordExtractor, PREFERENCE_THRESHOLD
+from memory.document_frequency import DocumentFrequency
 from memory.recency_manager import RecencyManager
-from llm.factory import get_llm_client
-from llm.base import LLMConfig
+from memory.embeddings import HashingEmbedder
+from memory.persistence import MemoryPersistence
+from memory.user_tiering import ColdUserStore, UserTiering
+from memory.compaction import MessageArchive
+from llm.factory import get_llm_client, llm_guard_metrics
+from llm.base import LLMClient, LLMConfig
+from llm.single_flight import SingleFlight
 
 logger = structlog.get_logger()
 
+class IdempotencyKeyReusedError(Exception):
+    """An idempotencyKey the user already sent came back with a different message or config"""
+
 class SimpleChatService:
     def __init__(self):
-        self.graph_manager = SimpleGraphManager()
-        self.keyword_extractor = KeywordExtractor()
-        self.recency_manager = RecencyManager()
-        self.cache_manager = CacheManager()
+        embedder = None
+        if settings.memory_retrieval_strategy in ("embedding", "hybrid"):
+            embedder = HashingEmbedder(settings.memory_embedding_dim)
+        self.recency_manager = RecencyManager(settings.memory_recency_half_life_hours)
+        self.message_archive = None
+        if settings.memory_compaction_window and settings.memory_compaction_raw_messages == "spill":
+            self.message_archive = MessageArchive(settings.memory_compaction_archive_path)
+        graph_manager_class = CompactGraphManager if settings.memory_backend == "compact" else SimpleGraphManager
+        self.graph_manager = graph_manager_class(
+            embedder=embedder,
+            embedding_lsh_min_vectors=settings.memory_embedding_lsh_min_vectors,
+            recency=self.recency_manager,
+            dedup_max_distance=settings.memory_dedup_max_distance if settings.memory_dedup_max_distance >= 0 else None,
+            compaction_window=settings.memory_compaction_window,
+            digest_size=settings.memory_compaction_digest_size,
+            max_digests=settings.memory_compaction_max_digests,
+            archive=self.message_archive
+        )
+        self.keyword_extractor = KeywordExtractor(
+            tracker=settings.keyword_tracker,
+            sketch_width=settings.keyword_sketch_width,
+            sketch_depth=settings.keyword_sketch_depth,
+            sketch_capacity=settings.keyword_sketch_capacity,
+            document_frequency=DocumentFrequency(
+                settings.document_frequency_width,
+                settings.document_frequency_depth,
+                min_documents=settings.preference_idf_min_documents
+            ) if settings.preference_min_idf > 0 else None
+        )
+        self.suppressed_preferences: Dict[str, int] = {}
+        self.cache_manager = CacheManager(settings.response_cache_max_entries, settings.response_cache_ttl_s)
+        self.prompt_packer = PromptPacker(
+            max_memory_tokens=settings.prompt_memory_max_tokens,
+            node_max_tokens=settings.prompt_node_max_tokens,
+            max_nodes=settings.prompt_memory_max_nodes,
+            exact=settings.prompt_token_counting == "exact",
+            cache_entries=settings.prompt_token_cache_entries
+        )
+        self.llm_flight = SingleFlight("llm")
+        self.request_flight = SingleFlight("chat_request")
+        self.idempotent_responses = CacheManager(settings.idempotency_max_entries, settings.idempotency_ttl_s)
+        self.idempotent_replays = 0
+        # Fingerprint of the request running under each (user, idempotency key)
+        self.idempotent_running: Dict[tuple, str] = {}
         self.user_configs = {}
+        self.persistence = None
+        self.tiering = None
+        self.compaction_task = None
+        self.compaction_steps = 0
+        self.compacted_messages = 0
+        self.compaction_ms_max = 0.0
+        self.streams_completed = 0
+        self.stream_errors = 0
+        self.stream_ttft_ms = deque(maxlen=1000)
+        self.stream_tokens_per_sec = deque(maxlen=1000)
+        
+        if settings.memory_max_hot_users or settings.memory_max_hot_bytes:
+            self.tiering = UserTiering(
+                self.graph_manager,
+                self.keyword_extractor,
+                self.user_configs,
+                ColdUserStore(settings.memory_cold_store_path, keep=bool(settings.memory_persistence_dir)),
+                max_hot_users=settings.memory_max_hot_users,
+                max_hot_bytes=settings.memory_max_hot_bytes
+            )
+        
+        if settings.memory_persistence_dir:
+            self.persistence = MemoryPersistence(
+                settings.memory_persistence_dir,
+                self.graph_manager,
+                self.keyword_extractor,
+                self.user_configs,
+                flush_interval_ms=settings.memory_log_flush_interval_ms,
+                snapshot_interval=settings.memory_snapshot_interval,
+                fork_snapshots=settings.memory_snapshot_fork,
+                cold_store_path=settings.memory_cold_store_path
+            )
+            self.persistence.tiering = self.tiering
+            self.persistence.restore()
+            
+        if self.tiering:
+            for user_id in self.graph_manager.list_users():
+                self.tiering.touch(user_id)
+                
+    def start_compaction(self):
+        """Start the background compaction loop on the running event loop (no-op if disabled)"""
+        if settings.memory_compaction_window and self.compaction_task is None:
+            self.compaction_task = asyncio.create_task(self.run_compaction())
+            
+    async def run_compaction(self):
+        # One digest per step, on the event loop thread that also mutates
+        # memory, so no locking is needed and a request waits at most one step
+        interval = settings.memory_compaction_interval_ms / 1000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                start_time = time.time()
+                folded = self.graph_manager.compact_pending(1)
+                if folded:
+                    self.compaction_steps += 1
+                    self.compacted_messages += folded
+                    self.compaction_ms_max = max(self.compaction_ms_max, (time.time() - start_time) * 1000)
+            except Exception as e:
+                logger.error("memory_compaction_error", error=str(e))
+                
+    def ensure_user_loaded(self, user_id: str, pin: bool = False, existing_only: bool = False):
+        """pin: keep the user in RAM across awaits until release_user(); a spill
+        in between would make the later writes land on an empty user.
+        existing_only: for reads; an unknown user is not added to the hot set"""
+        if self.tiering:
+            self.tiering.touch(user_id, pin=pin, existing_only=existing_only)
+            
+    def release_user(self, user_id: str):
+        if self.tiering:
+            self.tiering.unpin(user_id)
         
-    def get_memory_stage(self, user_id: str) -> str:
-        message_count = self.graph_manager.count_user_messages(user_id)
+    def get_memory_stage(self, user_id: str, pending_messages: int = 0) -> str:
+        """pending_messages: messages of this turn not yet written (streaming writes them at the end)"""
+        message_count = self.graph_manager.count_user_messages(user_id) + pending_messages
         if message_count < 5:
             return "Stage 1"
         elif message_count < 15:
@@ -31,7 +158,8 @@ class SimpleChatService:
         else:
             return "Stage 4"
             
-    def get_memory_for_stage(self, user_id: str, stage: str, current_message: str) -> tuple[List[Dict], List[MemoryNode]]:
+    def get_memory_for_stage(self, user_id: str, stage: str, current_message: str,
+                             message_keywords: Optional[List[str]] = None) -> tuple[List[Dict], List[MemoryNode]]:
         start_time = time.time()
         memory_nodes = []
         memory_used = []
@@ -51,10 +179,51 @@ class SimpleChatService:
                 
             elif stage in ["Stage 2", "Stage 3", "Stage 4"]:
                 recent_messages = self.graph_manager.get_user_messages(user_id, limit=8)
-                preferences = self.graph_manager.get_user_preferences(user_id)
-                memory_nodes = recent_messages + preferences
+                # Preferences the message mentions come first; Stage 3+ then adds
+                # what the co-occurrence graph ties to the message, and weighs
+                # the rest by recency-decayed weight
+                candidates = self.graph_manager.mentioned_preferences(user_id, current_message, 3)
+                if stage != "Stage 2" and message_keywords:
+                    candidates += self.graph_manager.related_preferences(user_id, message_keywords, 3)
+                candidates += self.graph_manager.top_preferences(user_id, 3, decayed=stage != "Stage 2")
+                unique_preferences = {}
+                for pref in candidates:
+                    unique_preferences.setdefault(pref["id"], pref)
+                preferences = list(unique_preferences.values())[:3]
+                
+                relevant_messages = []
+                digests = []
+                if stage == "Stage 4":
+                    relevant_messages = self.graph_manager.search_user_messages(
+                        user_id,
+                        current_message,
+                        limit=3,
+                        exclude_ids={msg["id"] for msg in recent_messages},
+                        strategy=settings.memory_retrieval_strategy
+                    )
+                    # History older than the compaction window survives only in digests
+                    if message_keywords:
+                        digests = self.graph_manager.relevant_digests(user_id, message_keywords, 1)
+                    
+                memory_nodes = relevant_messages + digests + recent_messages + preferences
                 
                 memory_used = [
+                    MemoryNode(
+                        nodeId=msg["id"],
+                        type="Message",
+                        content=msg["content"][:100] if msg.get("content") else "",
+                        weight=msg["score"]
+                    )
+                    for msg in relevant_messages
+                ] + [
+                    MemoryNode(
+                        nodeId=digest["id"],
+                        type="Digest",
+                        content=digest["content"][:100],
+                        weight=digest["score"]
+                    )
+                    for digest in digests
+                ] + [
                     MemoryNode(
                         nodeId=msg["id"],
                         type="Message", 
@@ -66,7 +235,7 @@ class SimpleChatService:
                         nodeId=pref["id"],
                         type="Preference",
                         content=pref["keyword"],
-                        weight=pref["weight"]
+                        weight=pref.get("adjusted_weight", pref["weight"])
                     )
                     for pref in preferences[:3]
                 ]
@@ -78,20 +247,22 @@ class SimpleChatService:
             
         retrieval_time_ms = (time.time() - start_time) * 1000
         logger.info("memory_retrieval", user_id=user_id, stage=stage, nodes_retrieved=len(memory_nodes), retrieval_ms=retrieval_time_ms)
+        if retrieval_time_ms > settings.memory_retrieval_timeout_ms:
+            logger.warning("memory_retrieval_slow", user_id=user_id, stage=stage, retrieval_ms=retrieval_time_ms)
         
         return memory_nodes, memory_used
         
-    def build_prompt_with_memory(self, message: str, memory_nodes: List[Dict], stage: str) -> str:
+    def build_prompt_with_memory(self, message: str, memory_nodes: List[Dict], stage: str, user_id: str = "",
+                                 llm_client: Optional[LLMClient] = None, llm_config: Optional[LLMConfig] = None) -> str:
+        """Prompt with as much ranked memory as fits the token budget for the model and reply length"""
         prompt_parts = []
         
-        if memory_nodes:
+        memory_lines, packing = self.prompt_packer.pack(message, memory_nodes, stage, llm_client, llm_config)
+        if memory_lines:
             prompt_parts.append("Previous context:")
-            for node in memory_nodes[:5]:
-                if isinstance(node, dict):
-                    if node.get("content"):
-                        prompt_parts.append(f"- {node['content']}")
-                    elif node.get("keyword"):
-                        prompt_parts.append(f"- User likes: {node['keyword']}")
+            prompt_parts.extend(memory_lines)
+        if packing["truncated"] or packing["dropped"]:
+            logger.debug("prompt_memory_packed", user_id=user_id, **packing)
                         
         prompt_parts.append(f"\nCurrent message: {message}")
         prompt_parts.append(f"\n[You are in {stage} of memory evolution - provide a helpful response that acknowledges any preferences mentioned]")
@@ -99,55 +270,101 @@ class SimpleChatService:
         return "\n".join(prompt_parts)
         
     async def process_chat(self, request: ChatRequest) -> ChatResponse:
+        """Answer a chat request; a request carrying an idempotencyKey already
+        seen for the user gets the stored response back, and memory is not
+        written again. Concurrent requests with the same key share one run,
+        as do concurrent identical requests without a key (double submits).
+        A key sent again with a different message or config raises
+        IdempotencyKeyReusedError instead of returning the other reply."""
+        if not request.idempotencyKey:
+            # Near-duplicate folding is opt-in, so double submits must not reach memory twice
+            key = (
+                request.userId,
+                None,
+                " ".join(request.message.split()).casefold(),
+                json.dumps(request.config or {}, sort_keys=True, default=str)
+            )
+            return await self.request_flight.do(key, lambda: self._process_chat(request))
+            
+        fingerprint = hashlib.sha256(
+            json.dumps([request.message, request.config or {}], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        stored = self.idempotent_responses.get(request.userId, "chat_response", request.idempotencyKey)
+        if stored is not None:
+            stored_fingerprint, response = stored
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError(f"idempotencyKey {request.idempotencyKey!r} was already used for a different request")
+            self.idempotent_replays += 1
+            logger.info("chat_request_replayed", user_id=request.userId, idempotency_key=request.idempotencyKey)
+            return response
+            
+        flight_key = (request.userId, request.idempotencyKey)
+        if self.idempotent_running.setdefault(flight_key, fingerprint) != fingerprint:
+            raise IdempotencyKeyReusedError(f"idempotencyKey {request.idempotencyKey!r} is in use by a different request")
+            
+        async def run() -> ChatResponse:
+            # Stored inside the shared run, so it lands even if the first caller disconnects;
+            # failures are not stored, so a retry with the same key can still succeed
+            try:
+                response = await self._process_chat(request)
+                if response.stage != "Error":
+                    self.idempotent_responses.set(request.userId, "chat_response", (fingerprint, response), request.idempotencyKey)
+                return response
+            finally:
+                del self.idempotent_running[flight_key]
+            
+        return await self.request_flight.do(flight_key, run)
+        
+    async def _process_chat(self, request: ChatRequest) -> ChatResponse:
         request_id = str(uuid.uuid4())
         start_time = time.time()
         
         try:
             logger.info("chat_request_received", request_id=request_id, user_id=request.userId)
+            self.ensure_user_loaded(request.userId, pin=True)
             
             # Create user and add message
             self.graph_manager.create_user(request.userId)
-            self.graph_manager.add_message(request.userId, request.message, "user")
-            
-            # Track keywords and create preferences
-            try:
-                keywords_with_counts = self.keyword_extractor.track_user_keywords(request.userId, request.message)
-                for keyword, count in keywords_with_counts.items():
-                    self.graph_manager.create_preference(request.userId, keyword, weight=count * 0.1)
-            except Exception as e:
-                logger.error("keyword_tracking_error", error=str(e))
+            message_keywords = self.extract_message_keywords(request.message)
+            self.record_user_message(request.userId, request.message, message_keywords)
             
             # Get memory stage and retrieve memory
             stage = self.get_memory_stage(request.userId)
-            memory_nodes, memory_used = self.get_memory_for_stage(request.userId, stage, request.message)
+            memory_nodes, memory_used = self.get_memory_for_stage(request.userId, stage, request.message, message_keywords)
             
             # Build prompt
-            prompt = self.build_prompt_with_memory(request.message, memory_nodes, stage)
-            
-            # Configure LLM
-            user_config = self.user_configs.get(request.userId, {})
-            config_dict = {**user_config, **request.config}
-            llm_config = LLMConfig(
-                temperature=config_dict.get("temperature", 0.7),
-                max_tokens=config_dict.get("maxTokens", 500),
-                model=config_dict.get("model"),
-                system_prompt=config_dict.get("systemPrompt", "You are a helpful AI assistant with evolving memory capabilities. Acknowledge any preferences the user has mentioned.")
-            )
-            
-            # Call LLM
             llm_client = get_llm_client()
-            llm_response = llm_client.generate(prompt, llm_config)
+            llm_config = self.build_llm_config(request)
+            prompt = self.build_prompt_with_memory(request.message, memory_nodes, stage, request.userId, llm_client, llm_config)
+            
+            # Call LLM, unless an identical prompt and config was just answered
+            completion_key = self.completion_key(llm_client, prompt, llm_config)
+            cacheable = self.response_cacheable(llm_config)
+            content = self.cache_manager.get(request.userId, "llm_response", *completion_key) if cacheable else None
+            cached = content is not None
+            if not cached:
+                # Concurrent identical requests (retries, double submits) share one provider call
+                llm_response = await self.llm_flight.do(
+                    (request.userId, *completion_key),
+                    lambda: llm_client.agenerate(prompt, llm_config)
+                )
+                content = llm_response.content
             
-            # Store assistant response
-            self.graph_manager.add_message(request.userId, llm_response.content, "assistant")
+            # Store assistant response; a coalesced duplicate folds into the first copy
+            self.store_reply(request.userId, content)
+            if cacheable and not cached:
+                self.cache_manager.set(request.userId, "llm_response", content, *completion_key)
             
             conversation_count = self.graph_manager.count_user_messages(request.userId)
             total_time_ms = (time.time() - start_time) * 1000
             
-            logger.info("chat_completed", request_id=request_id, user_id=request.userId, stage=stage, total_time_ms=total_time_ms)
+            logger.info("chat_completed", request_id=request_id, user_id=request.userId, stage=stage, cached=cached, total_time_ms=total_time_ms)
             
+            if self.persistence:
+                self.persistence.maybe_snapshot()
+                
             return ChatResponse(
-                response=llm_response.content,
+                response=content,
                 requestId=request_id,
                 stage=stage,
                 memoryUsed=memory_used,
@@ -164,10 +381,253 @@ class SimpleChatService:
                 memoryUsed=[],
                 conversationCount=0
             )
+        finally:
+            self.release_user(request.userId)
             
+    async def stream_chat(self, request: ChatRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Events for /chat/stream: a "token" per text delta, then "done" or "error".
+        
+        Memory is read as it stands before this turn. The user message, its
+        keyword tracking and the assistant reply are written only once the
+        stream completes, so an aborted stream leaves memory untouched.
+        """
+        request_id = str(uuid.uuid4())
+        start_time = time.time()
+        
+        try:
+            logger.info("chat_stream_received", request_id=request_id, user_id=request.userId)
+            # Pinned until the stream ends: the writes come after it, seconds later
+            self.ensure_user_loaded(request.userId, pin=True)
+            self.graph_manager.create_user(request.userId)
+            message_keywords = self.extract_message_keywords(request.message)
+            
+            stage = self.get_memory_stage(request.userId, pending_messages=1)
+            memory_nodes, memory_used = self.get_memory_for_stage(request.userId, stage, request.message, message_keywords)
+            llm_client = get_llm_client()
+            llm_config = self.build_llm_config(request)
+            prompt = self.build_prompt_with_memory(request.message, memory_nodes, stage, request.userId, llm_client, llm_config)
+            completion_key = self.completion_key(llm_client, prompt, llm_config)
+            cacheable = self.response_cacheable(llm_config)
+            content = self.cache_manager.get(request.userId, "llm_response", *completion_key) if cacheable else None
+            cached = content is not None
+            first_token_time = None
+            if cached:
+                first_token_time = time.time()
+                yield {"event": "token", "data": {"text": content}}
+            else:
+                parts = []
+                async for text in llm_client.astream(prompt, llm_config):
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    parts.append(text)
+                    yield {"event": "token", "data": {"text": text}}
+                content = "".join(parts)
+            end_time = time.time()
+            
+            self.record_user_message(request.userId, request.message, message_keywords)
+            self.store_reply(request.userId, content)
+            if cacheable and not cached:
+                self.cache_manager.set(request.userId, "llm_response", content, *completion_key)
+            
+            # TTFT is what the user waits for (retrieval included); tokens/sec covers the decode after it
+            first_token_time = first_token_time or end_time
+            ttft_ms = (first_token_time - start_time) * 1000
+            output_tokens = llm_client.count_tokens(content)
+            tokens_per_sec = output_tokens / (end_time - first_token_time) if end_time > first_token_time else 0.0
+            self.streams_completed += 1
+            self.stream_ttft_ms.append(ttft_ms)
+            self.stream_tokens_per_sec.append(tokens_per_sec)
+            
+            logger.info(
+                "chat_stream_completed",
+                request_id=request_id,
+                user_id=request.userId,
+                stage=stage,
+                cached=cached,
+                ttft_ms=ttft_ms,
+                tokens_per_sec=tokens_per_sec,
+                output_tokens=output_tokens,
+                total_time_ms=(end_time - start_time) * 1000
+            )
+            
+            if self.persistence:
+                self.persistence.maybe_snapshot()
+                
+            response = ChatResponse(
+                response=content,
+                requestId=request_id,
+                stage=stage,
+                memoryUsed=memory_used,
+                conversationCount=self.graph_manager.count_user_messages(request.userId)
+            )
+            yield {"event": "done", "data": {**response.dict(), "ttftMs": ttft_ms, "tokensPerSec": tokens_per_sec}}
+            
+        except (GeneratorExit, asyncio.CancelledError):
+            logger.info("chat_stream_aborted", request_id=request_id, user_id=request.userId)
+            raise
+        except Exception as e:
+            self.stream_errors += 1
+            logger.error("chat_stream_error", error=str(e), request_id=request_id, user_id=request.userId)
+            yield {"event": "error", "data": {"requestId": request_id, "error": str(e)}}
+        finally:
+            self.release_user(request.userId)
+            
+    def extract_message_keywords(self, message: str) -> List[str]:
+        try:
+            return self.keyword_extractor.extract_keywords(message)
+        except Exception as e:
+            logger.error("keyword_tracking_error", error=str(e))
+            return []
+            
+    def record_user_message(self, user_id: str, message: str, message_keywords: List[str]):
+        messages_before = self.graph_manager.count_user_messages(user_id)
+        self.graph_manager.add_message(user_id, message, "user")
+        
+        # Track keywords and create preferences; a near-duplicate was folded
+        # into an earlier message and must not count its keywords again
+        if self.graph_manager.count_user_messages(user_id) == messages_before:
+            return
+        try:
+            keywords_with_counts = self.keyword_extractor.track_user_keywords(
+                user_id, message, keywords=message_keywords
+            )
+            self.graph_manager.link_keywords(user_id, message_keywords)
+            self.graph_manager.create_preferences(
+                user_id,
+                self.score_preferences(user_id, keywords_with_counts)
+            )
+        except Exception as e:
+            logger.error("keyword_tracking_error", error=str(e))
+            
+    def store_reply(self, user_id: str, content: str):
+        self.graph_manager.add_message(user_id, content, "assistant")
+            
+    def completion_key(self, llm_client, prompt: str, llm_config: LLMConfig) -> tuple:
+        """What determines a completion: the normalized prompt and the generation config"""
+        return (
+            " ".join(prompt.split()).casefold(),
+            settings.llm_provider,
+            llm_config.model or llm_client.default_model,
+            llm_config.temperature,
+            llm_config.system_prompt,
+            llm_config.max_tokens,
+            llm_config.top_p
+        )
+        
+    def response_cacheable(self, llm_config: LLMConfig) -> bool:
+        """Whether replies may go through the response cache.
+        
+        The key is the prompt, which embeds the memory it was built from, so
+        a hit is only possible while the memory it retrieves is unchanged and
+        nothing has to be invalidated when a message is stored. Sampled
+        (temperature > 0) replies are cached only when
+        response_cache_nonzero_temperature is set.
+        """
+        if not settings.response_cache_enabled:
+            return False
+        return llm_config.temperature <= 0 or settings.response_cache_nonzero_temperature
+            
+    def build_llm_config(self, request: ChatRequest) -> LLMConfig:
+        user_config = self.user_configs.get(request.userId, {})
+        config_dict = {**user_config, **request.config}
+        return LLMConfig(
+            temperature=config_dict.get("temperature", 0.7),
+            max_tokens=config_dict.get("maxTokens", 500),
+            model=config_dict.get("model"),
+            system_prompt=config_dict.get("systemPrompt", "You are a helpful AI assistant with evolving memory capabilities. Acknowledge any preferences the user has mentioned.")
+        )
+            
+    def score_preferences(self, user_id: str, keywords_with_counts: Dict[str, int]) -> Dict[str, float]:
+        """Preference weights for keywords past the mention threshold, minus globally common ones.
+        
+        TF-IDF style: a keyword the user repeats (high tf) still does not
+        become a new preference if its idf across all users is too low.
+        Existing preferences keep being reinforced.
+        """
+        document_frequency = self.keyword_extractor.document_frequency
+        weights = {}
+        for keyword, count in keywords_with_counts.items():
+            if (document_frequency is not None
+                    and document_frequency.is_common(keyword, settings.preference_min_idf)
+                    and not self.graph_manager.has_preference(user_id, keyword)):
+                if count == PREFERENCE_THRESHOLD:
+                    self.suppressed_preferences[user_id] = self.suppressed_preferences.get(user_id, 0) + 1
+                continue
+            weights[keyword] = count * 0.1
+        return weights
+        
     def update_user_config(self, user_id: str, config: Dict[str, Any]):
+        self.ensure_user_loaded(user_id)
         self.user_configs[user_id] = config
+        self.cache_manager.invalidate_user(user_id)
+        if self.persistence:
+            self.persistence.record_config(user_id, config)
         logger.info("user_config_updated", user_id=user_id)
         
     def get_user_config(self, user_id: str) -> Dict[str, Any]:
-        return self.user_configs.get(user_id, {})
\ No newline at end of file
+        self.ensure_user_loaded(user_id, existing_only=True)
+        return self.user_configs.get(user_id, {})
+        
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {}
+        document_frequency = self.keyword_extractor.document_frequency
+        if document_frequency is not None:
+            suppressed = sum(self.suppressed_preferences.values())
+            metrics["preference_filter"] = {
+                **document_frequency.get_metrics(),
+                "preference_nodes": self.graph_manager.count_preferences(),
+                "suppressed_preference_nodes": suppressed,
+                "users_with_suppressed": len(self.suppressed_preferences),
+                "suppressed_per_user_avg": suppressed / len(self.suppressed_preferences) if self.suppressed_preferences else 0.0
+            }
+        if self.tiering:
+            metrics["tiering"] = self.tiering.get_metrics()
+        if self.persistence:
+            metrics["persistence"] = self.persistence.get_metrics()
+        if settings.memory_compaction_window:
+            metrics["compaction"] = {
+                "pending_users": len(self.graph_manager.compaction_pending),
+                "steps": self.compaction_steps,
+                "compacted_messages": self.compacted_messages,
+                "step_ms_max": self.compaction_ms_max,
+                "archived_messages": self.message_archive.count() if self.message_archive else 0
+            }
+        if settings.response_cache_enabled:
+            metrics["response_cache"] = self.cache_manager.get_metrics()
+        metrics["prompt_packing"] = self.prompt_packer.get_metrics()
+        metrics["single_flight"] = {
+            "llm": self.llm_flight.get_metrics(),
+            "chat_request": self.request_flight.get_metrics()
+        }
+        if llm_guard_metrics():
+            metrics["llm_guards"] = llm_guard_metrics()
+        if settings.llm_fallback_provider:
+            llm_client = get_llm_client()
+            if hasattr(llm_client, "get_metrics"):
+                metrics["llm_routing"] = llm_client.get_metrics()
+        if "stub" in (settings.llm_provider, settings.llm_fallback_provider):
+            metrics["stub_llm"] = {"calls": get_llm_client("stub").calls}
+        metrics["idempotency"] = {
+            "stored_responses": len(self.idempotent_responses.cache),
+            "replays": self.idempotent_replays
+        }
+        if self.streams_completed or self.stream_errors:
+            ttft = sorted(self.stream_ttft_ms)
+            metrics["streaming"] = {
+                "completed": self.streams_completed,
+                "errors": self.stream_errors,
+                "ttft_ms_p50": ttft[len(ttft) // 2] if ttft else 0.0,
+                "ttft_ms_p95": ttft[int(len(ttft) * 0.95)] if ttft else 0.0,
+                "tokens_per_sec_avg": sum(self.stream_tokens_per_sec) / len(self.stream_tokens_per_sec) if ttft else 0.0
+            }
+        return metrics
+        
+    def close(self):
+        if self.compaction_task:
+            self.compaction_task.cancel()
+        if self.persistence:
+            self.persistence.close()
+        if self.tiering:
+            self.tiering.close()
+        if self.message_archive:
+            self.message_archive.close()
\ No newline at end of file
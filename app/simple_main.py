@@ -1,11 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+import json
 import structlog
 from datetime import datetime
 from app.config import settings
 from app.models import ChatRequest, ChatResponse, MemoryResponse, ConfigRequest
-from app.simple_chat_service import SimpleChatService
+from app.simple_chat_service import IdempotencyKeyReusedError, SimpleChatService
 from app.rate_limiter import RateLimiter
+from llm.factory import close_llm_clients, warmup_llm_clients
 
 structlog.configure(
     processors=[
@@ -43,6 +46,20 @@ app.add_middleware(
 chat_service = SimpleChatService()
 rate_limiter = RateLimiter(max_requests_per_minute=settings.max_concurrent_users)
 
+if chat_service.tiering:
+    chat_service.tiering.on_spill = rate_limiter.forget
+
+@app.on_event("startup")
+async def startup():
+    chat_service.start_compaction()
+    if settings.llm_warmup:
+        await warmup_llm_clients()
+
+@app.on_event("shutdown")
+async def shutdown():
+    chat_service.close()
+    await close_llm_clients()
+
 @app.get("/")
 async def root():
     return {"message": "AI Memory Backend (Simple)", "status": "running"}
@@ -56,6 +73,10 @@ async def health_check():
         "version": "simple"
     }
 
+@app.get("/metrics")
+async def metrics():
+    return chat_service.get_metrics()
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     if not rate_limiter.is_allowed(request.userId):
@@ -68,17 +89,41 @@ async def chat(request: ChatRequest):
     try:
         response = await chat_service.process_chat(request)
         return response
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error("chat_endpoint_error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Server-sent events: "token" events carry text deltas, the final "done"
+    event the usual chat response plus ttftMs and tokensPerSec"""
+    if not rate_limiter.is_allowed(request.userId):
+        wait_time = rate_limiter.get_wait_time(request.userId)
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded. Please wait {wait_time:.1f} seconds."
+        )
+        
+    async def events():
+        async for event in chat_service.stream_chat(request):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/memory/{user_id}", response_model=MemoryResponse)
 async def get_user_memory(user_id: str):
     try:
+        chat_service.ensure_user_loaded(user_id, existing_only=True)
         stage = chat_service.get_memory_stage(user_id)
         conversation_count = chat_service.graph_manager.count_user_messages(user_id)
         graph_stats = chat_service.graph_manager.get_graph_stats(user_id)
-        top_preferences = chat_service.graph_manager.get_user_preferences(user_id)[:5]
+        top_preferences = chat_service.graph_manager.top_preferences(user_id, 5)
         
         return MemoryResponse(
             userId=user_id,
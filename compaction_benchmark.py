@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compaction Benchmark
+Sends one user 20k messages on each memory backend, with embeddings and
+near-duplicate folding on, once without compaction and once with a
+200-message window, 50-message digests and raw messages spilled to a
+temporary SQLite archive. Reports the manager's memory estimate at five
+points, which should plateau with compaction, and the cost of each
+compaction step (one compact_pending(1) call after every message, as the
+background task does). Random-vocabulary text is the worst case for a step.
+Runs in-process; no server.
+
+    python compaction_benchmark.py          # 20k messages
+    python compaction_benchmark.py 100000
+"""
+
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.compaction import MessageArchive
+from memory.embeddings import HashingEmbedder
+
+MESSAGES = 20000
+WINDOW = 200
+DIGEST_SIZE = 50
+CHECKPOINTS = 5
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    every = MESSAGES // CHECKPOINTS
+    print(f"one user, {MESSAGES} messages; window {WINDOW}, digest {DIGEST_SIZE}; estimate in KiB")
+    print(f"{'backend':<9} {'window':>6} " + " ".join(f"{(i + 1) * every:>7}" for i in range(CHECKPOINTS))
+          + f" {'steps':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'archived':>9}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        for window in (0, WINDOW):
+            rng = random.Random(1)
+            words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))) for _ in range(5000)]
+            with tempfile.TemporaryDirectory() as directory:
+                archive = MessageArchive(os.path.join(directory, "archive.db")) if window else None
+                manager = cls(embedder=HashingEmbedder(256), dedup_max_distance=3, compaction_window=window,
+                              digest_size=DIGEST_SIZE, archive=archive)
+                estimates = []
+                steps = []
+                for i in range(MESSAGES):
+                    message = " ".join(rng.choices(words, k=rng.randint(5, 25))) + ". I love hiking in the alps."
+                    manager.add_message("user", message, "user" if i % 2 == 0 else "assistant")
+                    start = time.perf_counter()
+                    if manager.compact_pending(1):
+                        steps.append((time.perf_counter() - start) * 1000)
+                    if (i + 1) % every == 0:
+                        estimates.append(manager.estimate_user_bytes("user") // 1024)
+                        
+                row = f"{name:<9} {window:>6} " + " ".join(f"{estimate:>7}" for estimate in estimates)
+                if steps:
+                    steps.sort()
+                    row += (f" {len(steps):>6} {steps[len(steps) // 2]:>7.2f} {steps[int(len(steps) * 0.99)]:>7.2f}"
+                            f" {steps[-1]:>7.2f} {archive.count():>9}")
+                    archive.close()
+                print(row)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Co-occurrence Benchmark
+Builds one user's keyword co-occurrence graph from 1000 messages of 12
+words (half from a 300-word core vocabulary, half from 3000 words), with a
+preference for the keywords of every tenth message, and times
+related_preferences (personalized PageRank over the graph): right after the
+graph changed (matrix rebuild plus walk), for a new seed set on an
+unchanged graph, and repeated with the same seeds, plus link_keywords per
+message. Runs in-process; no server.
+
+    python cooccurrence_benchmark.py          # 1000 messages
+    python cooccurrence_benchmark.py 5000
+"""
+
+import random
+import sys
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.keyword_extractor import KeywordExtractor
+
+MESSAGES = 1000
+SEEDS = 20
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"one user, {MESSAGES} messages (ms)")
+    print(f"{'backend':<9} {'keywords':>9} {'edges':>7} {'link':>6} {'rebuild+rank':>13} {'new seeds':>10} {'same seeds':>11}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        rng = random.Random(1)
+        vocabulary = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(4, 8))) for _ in range(3000)]
+        manager, extractor = cls(), KeywordExtractor()
+        messages = [" ".join(rng.choices(vocabulary[:300] if rng.random() < 0.5 else vocabulary, k=12)) for _ in range(MESSAGES)]
+        link_s = 0.0
+        for i, message in enumerate(messages):
+            manager.add_message("user", message, "user")
+            keywords = extractor.extract_keywords(message)
+            if i % 10 == 0:
+                manager.create_preferences("user", {keyword: 0.1 for keyword in keywords})
+            start = time.perf_counter()
+            manager.link_keywords("user", keywords)
+            link_s += time.perf_counter() - start
+        graph = manager.keyword_graphs["user"]
+        seeds = [extractor.extract_keywords(message) for message in rng.sample(messages, SEEDS)]
+        
+        rebuild = new = same = 0.0
+        for keywords in seeds:
+            # A new message changes the graph, so the next ranking rebuilds the matrix
+            manager.link_keywords("user", keywords)
+            start = time.perf_counter()
+            manager.related_preferences("user", keywords, 3)
+            rebuild += time.perf_counter() - start
+        for keywords in seeds:
+            start = time.perf_counter()
+            manager.related_preferences("user", keywords[::-1][:5], 3)
+            new += time.perf_counter() - start
+            start = time.perf_counter()
+            manager.related_preferences("user", keywords[::-1][:5], 3)
+            same += time.perf_counter() - start
+        print(
+            f"{name:<9} {len(graph.keywords):>9} {len(graph.edges):>7} {link_s / MESSAGES * 1000:>6.3f} "
+            f"{rebuild / SEEDS * 1000:>13.1f} {new / SEEDS * 1000:>10.1f} {same / SEEDS * 1000:>11.3f}"
+        )
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
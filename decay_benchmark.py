@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Decay Benchmark
+Gives 100k preferences timestamps spread over 90 days and times recency
+decay: update_preference_weights_with_decay and per-timestamp multipliers
+against the old step-function RecencyManager, the batch ISO parse, NumPy
+weights_at plus top_k over stored log-weights, and top_preferences(decayed=True)
+on each memory backend, which should agree with the batch ranking. Runs
+in-process; no server.
+
+    python decay_benchmark.py            # 100k preferences
+    python decay_benchmark.py 1000000
+"""
+
+import random
+import sys
+import time
+from datetime import datetime
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.recency_manager import RecencyManager
+from memory.simple_graph_manager import iso_timestamp
+
+PREFERENCES = 100000
+TOP_K = 5
+REPEATS = 3
+
+def legacy_recency_multiplier(timestamp_str: str) -> float:
+    """The multiplier before exponential decay: parse, then step down by age"""
+    age_hours = (datetime.utcnow() - datetime.fromisoformat(timestamp_str)).total_seconds() / 3600
+    for limit, multiplier in ((1, 1.0), (24, 0.95), (72, 0.85), (168, 0.7), (720, 0.5)):
+        if age_hours < limit:
+            return multiplier
+    return 0.3
+
+def legacy_update_preference_weights_with_decay(preferences):
+    for pref in preferences:
+        if "last_seen" in pref:
+            recency_multiplier = legacy_recency_multiplier(pref["last_seen"])
+            base_weight = pref.get("count", 1) * 0.1
+            pref["weight"] = base_weight * recency_multiplier
+            pref["base_weight"] = base_weight
+            pref["recency_multiplier"] = recency_multiplier
+    return sorted(preferences, key=lambda x: x.get("weight", 0), reverse=True)
+
+def best_ms(func, repeats: int = REPEATS):
+    """Best of several runs in milliseconds, with the last result"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    rng = random.Random(0)
+    now = time.time()
+    epochs = [now - rng.random() * 90 * 86400 for _ in range(PREFERENCES)]
+    preferences = [
+        {"id": f"p{i}", "keyword": f"k{i}", "count": rng.randint(1, 10), "weight": 0.1, "last_seen": iso_timestamp(epoch)}
+        for i, epoch in enumerate(epochs)
+    ]
+    recency = RecencyManager()
+    timestamps = [pref["last_seen"] for pref in preferences]
+    log_weights = recency.log_weights([pref["count"] * 0.1 for pref in preferences], epochs)
+    
+    print(f"{PREFERENCES} preferences, top {TOP_K} (ms, best of {REPEATS})")
+    print(f"{'operation':<48} {'old':>8} {'new':>8}")
+    old, _ = best_ms(lambda: legacy_update_preference_weights_with_decay([dict(p) for p in preferences])[:TOP_K])
+    new, _ = best_ms(lambda: recency.update_preference_weights_with_decay([dict(p) for p in preferences])[:TOP_K])
+    copy, _ = best_ms(lambda: [dict(p) for p in preferences])
+    print(f"{'update_preference_weights_with_decay + top k':<48} {old:>8.1f} {new:>8.1f}")
+    print(f"{'  of which copying the input dicts':<48} {copy:>8.1f} {copy:>8.1f}")
+    old, _ = best_ms(lambda: [legacy_recency_multiplier(timestamp) for timestamp in timestamps])
+    new, _ = best_ms(lambda: recency.calculate_recency_multipliers(timestamps))
+    print(f"{'multipliers from ISO strings':<48} {old:>8.1f} {new:>8.1f}")
+    batch, top = best_ms(lambda: (recency.weights_at(log_weights, now), recency.top_k(log_weights, TOP_K))[1])
+    print(f"{'weights_at + top_k over log-weights':<48} {'':>8} {batch:>8.2f}")
+    expected = [preferences[i]["keyword"] for i in top]
+    
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        manager = cls(recency=recency)
+        for pref, epoch in zip(preferences, epochs):
+            manager._apply_preference("user", pref["keyword"], pref["count"] * 0.1, epoch)
+        elapsed, ranked = best_ms(lambda: manager.top_preferences("user", TOP_K, decayed=True), repeats=20)
+        agrees = [pref["keyword"] for pref in ranked] == expected
+        print(f"{f'top_preferences(decayed=True), {name}':<48} {'':>8} {elapsed:>8.3f}  agrees with batch: {agrees}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        PREFERENCES = int(sys.argv[1])
+    main()
\ No newline at end of file
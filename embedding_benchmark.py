@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Embedding Benchmark
+Fills an EmbeddingStore with 10k and 1M random unit vectors and measures
+top-5 search throughput in queries per second, with exact search (one
+matrix-vector product plus argpartition) and with the LSH index, whose
+top-1 recall against exact search is reported too. Queries are stored
+vectors plus noise, like a message close to one already seen. Also times
+HashingEmbedder on chat-sized text. Runs in-process; no server.
+
+    python embedding_benchmark.py            # 10k and 1M vectors
+    python embedding_benchmark.py 100000     # 10k and 100k
+"""
+
+import sys
+import time
+import numpy as np
+from memory.embeddings import EmbeddingStore, HashingEmbedder
+
+# (vectors, dimension)
+SIZES = [(10000, 256), (1000000, 128)]
+QUERIES = 200
+TOP_K = 5
+
+def search_all(store: EmbeddingStore, queries, k: int):
+    start = time.perf_counter()
+    results = [store.search(query, k) for query in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+def main():
+    rng = np.random.default_rng(1)
+    texts = [f"I was thinking about message {i}: maybe we hike the ridge trail on Saturday if it stays dry" for i in range(2000)]
+    embedder = HashingEmbedder()
+    start = time.perf_counter()
+    for text in texts:
+        embedder.embed(text)
+    print(f"HashingEmbedder(dim {embedder.dim}): {(time.perf_counter() - start) / len(texts) * 1e6:.0f} us per {len(texts[0])}-character message")
+    
+    print(f"{'vectors':>8} {'dim':>4} {'fill s':>7} {'exact QPS':>10} {'LSH QPS':>8} {'LSH top-1 recall':>17}")
+    for size, dim in SIZES:
+        vectors = rng.standard_normal((size, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store = EmbeddingStore(dim)
+        start = time.perf_counter()
+        for seq in range(size):
+            store.add(seq, vectors[seq])
+        fill_s = time.perf_counter() - start
+        queries = [
+            vectors[index] + 0.5 / np.sqrt(dim) * rng.standard_normal(dim).astype(np.float32)
+            for index in rng.integers(size, size=QUERIES)
+        ]
+        exact, exact_qps = search_all(store, queries, TOP_K)
+        store.set_lsh_min_vectors(1)
+        approximate, lsh_qps = search_all(store, queries, TOP_K)
+        recall = np.mean([a[0][0] == e[0][0] for a, e in zip(approximate, exact)])
+        print(f"{size:>8} {dim:>4} {fill_s:>7.1f} {exact_qps:>10.0f} {lsh_qps:>8.0f} {recall:>17.2f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        SIZES[-1] = (int(sys.argv[1]), SIZES[-1][1])
+    main()
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Graph Stats Test
+Drives both memory backends through every operation that changes a user's
+graph (messages, preferences, keyword links, near-duplicate folding,
+compaction, export/import, journal replay and snapshot pickling, with the
+NetworkX fast path and through its public API) and checks after each phase that the incrementally maintained counters of
+get_graph_stats() match a full recount (verify=True). Runs in-process; no
+server needed.
+"""
+
+import logging
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import structlog
+import memory.simple_graph_manager as simple_graph_manager
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.keyword_extractor import KeywordExtractor
+from memory.persistence import MemoryPersistence
+
+USERS = 20
+MESSAGES = 120
+WORDS = "coffee hiking pizza travel music guitar garden python running books movies cooking".split()
+
+def report(name, passed, detail):
+    print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return passed
+
+def verify_all(manager, users) -> str:
+    """The first user whose counters differ from a recount, or "" if none do"""
+    for user_id in users:
+        try:
+            manager.get_graph_stats(user_id, verify=True)
+        except AssertionError as e:
+            return str(e)
+    return ""
+
+def check_backend(cls):
+    rng = random.Random(42)
+    users = [f"stats-{slot}" for slot in range(USERS)]
+    results = []
+    directory = tempfile.mkdtemp(prefix="graph-stats-")
+    try:
+        manager = cls(dedup_max_distance=3, compaction_window=30, digest_size=20)
+        persistence = MemoryPersistence(directory, manager, KeywordExtractor(), {}, snapshot_interval=10 ** 9)
+        persistence.restore()
+        
+        def phase(name, detail=""):
+            error = verify_all(manager, users)
+            results.append(report(f"  {name}", not error, error or detail))
+            
+        for user_id in users:
+            manager.create_user(user_id)
+            manager.create_user(user_id)
+        phase("users created twice", f"{USERS} users")
+        
+        for i in range(MESSAGES):
+            for user_id in users:
+                words = rng.sample(WORDS, 4)
+                manager.add_message(user_id, f"message {i} about {' '.join(words)}", "user")
+                manager.add_message(user_id, f"reply {i}: tell me more about {words[0]}", "assistant")
+        phase("messages added", f"{MESSAGES * 2} per user")
+        
+        folded_before = sum(manager.count_user_messages(user_id) for user_id in users)
+        for user_id in users:
+            for _ in range(3):
+                manager.add_message(user_id, "I really love strong black coffee every single morning", "user")
+        folded = folded_before + 3 * USERS - sum(manager.count_user_messages(user_id) for user_id in users)
+        phase("near-duplicates folded", f"{folded} repeats folded")
+        
+        for user_id in users:
+            for keyword in rng.sample(WORDS, 5):
+                manager.create_preference(user_id, keyword)
+            manager.create_preferences(user_id, {keyword: 0.3 for keyword in rng.sample(WORDS, 5)})
+            manager.link_keywords(user_id, rng.sample(WORDS, 4))
+        phase("preferences and keyword links", f"{manager.count_preferences()} preference nodes")
+        
+        compacted = 0
+        while manager.compaction_pending:
+            compacted += manager.compact_pending(max_chunks=8)
+        phase("compaction", f"{compacted} messages folded into digests")
+        
+        other = cls(dedup_max_distance=3, compaction_window=30, digest_size=20)
+        for user_id in users[::2]:
+            other.import_user(user_id, manager.export_user(user_id))
+        for user_id in users[::2]:
+            manager.import_user(user_id, other.export_user(user_id))
+        phase("export/import round trip", f"{USERS // 2} users moved out and back")
+        
+        persistence.log.close()
+        replayed = cls(dedup_max_distance=3, compaction_window=30, digest_size=20)
+        replay = MemoryPersistence(directory, replayed, KeywordExtractor(), {}, snapshot_interval=10 ** 9)
+        stats = replay.restore()
+        error = verify_all(replayed, users) or next(
+            (f"{user_id} differs after replay" for user_id in users
+             if replayed.get_graph_stats(user_id) != manager.get_graph_stats(user_id)), ""
+        )
+        results.append(report("  journal replay", not error, error or f"{stats['records_replayed']} records"))
+        replay.log.close()
+        
+        restored = pickle.loads(pickle.dumps(manager))
+        error = verify_all(restored, users)
+        results.append(report("  snapshot pickle round trip", not error, error or "counters match"))
+        
+        if cls is SimpleGraphManager:
+            # Versions other than the checked NetworkX releases pack through the public API
+            direct = simple_graph_manager.NX_DIRECT
+            simple_graph_manager.NX_DIRECT = not direct
+            try:
+                other = pickle.loads(pickle.dumps(manager))
+            finally:
+                simple_graph_manager.NX_DIRECT = direct
+            same = all(
+                list(getattr(other.graph, view)(data=True)) == list(getattr(restored.graph, view)(data=True))
+                for view in ("nodes", "edges")
+            ) and dict(other.graph.pred) == dict(restored.graph.pred)
+            error = verify_all(other, users) or ("" if same else "graphs differ")
+            results.append(report(
+                f"  snapshot pickle round trip, {'public API' if direct else 'direct'}",
+                not error,
+                error or "same graph as the other path"
+            ))
+            
+        # A counter that drifted must be caught
+        manager.user_edge_counts[users[0]] += 1
+        error = verify_all(manager, users)
+        results.append(report("  drift detected", bool(error), "corrupted edge counter raises AssertionError"))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return all(results)
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    results = []
+    for cls in (SimpleGraphManager, CompactGraphManager):
+        print(cls.__name__)
+        results.append(check_backend(cls))
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Hedging & Failover Benchmark
+Runs the same request stream against a primary stub provider alone and
+through RoutingLLMClient (primary + fallback stub), for several injected
+latency distributions, and reports tail latency, errors and the extra
+provider calls that hedging costs. Runs in-process; no server or API keys.
+"""
+
+import asyncio
+import sys
+import time
+import structlog
+from llm.base import LLMConfig
+from llm.routing_client import RoutingLLMClient
+from llm.stub_client import StubClient
+
+REQUESTS = 1000
+CONCURRENCY = 50
+
+# name -> (primary StubClient kwargs, fallback StubClient kwargs)
+SCENARIOS = {
+    "log-normal": (
+        {"latency_ms": 200, "latency_sigma": 0.6},
+        {"latency_ms": 250, "latency_sigma": 0.6}
+    ),
+    "3% stalls": (
+        {"latency_ms": 200, "latency_sigma": 0.3, "stall_rate": 0.03, "stall_ms": 3000},
+        {"latency_ms": 250, "latency_sigma": 0.3, "stall_rate": 0.03, "stall_ms": 3000}
+    ),
+    "10% rate limited": (
+        {"latency_ms": 200, "latency_sigma": 0.3, "rate_limit_rate": 0.10},
+        {"latency_ms": 250, "latency_sigma": 0.3}
+    )
+}
+
+async def run(client):
+    """REQUESTS calls at CONCURRENCY, return (sorted latencies in ms, errors)"""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    errors = 0
+    
+    async def one(index):
+        nonlocal errors
+        async with semaphore:
+            start = time.time()
+            try:
+                await client.agenerate(f"Current message: request {index}", LLMConfig())
+            except Exception:
+                errors += 1
+                return
+            latencies.append((time.time() - start) * 1000)
+            
+    await asyncio.gather(*(one(index) for index in range(REQUESTS)))
+    return sorted(latencies), errors
+
+def percentile(latencies, q):
+    return latencies[min(int(len(latencies) * q), len(latencies) - 1)]
+
+async def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"{'scenario':<18} {'mode':<8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'errors':>7} {'calls':>6}")
+    for name, (primary_kwargs, fallback_kwargs) in SCENARIOS.items():
+        for mode in ("primary", "routed"):
+            primary = StubClient(seed=1, **primary_kwargs)
+            fallback = StubClient(seed=2, **fallback_kwargs)
+            client = primary if mode == "primary" else RoutingLLMClient(primary, fallback, "primary", "fallback")
+            latencies, errors = await run(client)
+            calls = primary.calls + fallback.calls
+            print(
+                f"{name:<18} {mode:<8} {percentile(latencies, 0.5):>7.0f} {percentile(latencies, 0.95):>7.0f} "
+                f"{percentile(latencies, 0.99):>7.0f} {latencies[-1]:>7.0f} {errors:>7} {calls / REQUESTS:>5.2f}x"
+            )
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        REQUESTS = int(sys.argv[1])
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Keyword Extraction Benchmark
+Generates 50k messages of 5-60 words that mix in stop words, punctuation,
+digits and non-ASCII text and measures extraction throughput in tokens per
+second: the old multi-pass extract_keywords, the single-pass one, and
+extract_keywords_batch in process and over a process pool. Also checks the
+single-pass output matches the old one on every message. Runs in-process;
+no server.
+
+    python keyword_extraction_benchmark.py        # batch with 4 processes
+    python keyword_extraction_benchmark.py 8
+"""
+
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from typing import List
+import structlog
+from memory.keyword_extractor import STOP_WORDS, KeywordExtractor, extract_keywords
+
+MESSAGES = 50000
+PROCESSES = 4
+REPEATS = 3
+
+def legacy_extract_keywords(text: str, min_length: int = 3) -> List[str]:
+    """Extraction before the single pass: separate unigram and bigram lists, full sort"""
+    words = re.findall(r'\b[a-z]+\b', text.lower())
+    filtered_words = [word for word in words if len(word) >= min_length and word not in STOP_WORDS]
+    bigrams = [
+        f"{words[i]} {words[i + 1]}" for i in range(len(words) - 1)
+        if words[i] not in STOP_WORDS and words[i + 1] not in STOP_WORDS
+    ]
+    return [term for term, _ in Counter(filtered_words + bigrams).most_common(10)]
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    rng = random.Random(0)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    vocabulary += sorted(STOP_WORDS) * 20 + ["Hello,", "I'm", "café", "don't", "42", "ok", "go"]
+    texts = [" ".join(rng.choices(vocabulary, k=rng.randint(5, 60))) for _ in range(MESSAGES)]
+    tokens = sum(len(text.split()) for text in texts)
+    mismatches = sum(legacy_extract_keywords(text) != extract_keywords(text) for text in texts)
+    print(f"{MESSAGES} messages, {tokens / 1e6:.2f}M tokens, {mismatches} outputs differ from the old extraction, {os.cpu_count()} CPUs")
+    
+    extractor = KeywordExtractor()
+    runs = [
+        ("old extract_keywords", lambda: [legacy_extract_keywords(text) for text in texts]),
+        ("extract_keywords", lambda: [extract_keywords(text) for text in texts]),
+        ("extract_keywords_batch", lambda: extractor.extract_keywords_batch(texts)),
+        (f"batch, {PROCESSES} processes", lambda: extractor.extract_keywords_batch(texts, processes=PROCESSES))
+    ]
+    print(f"{'extraction':<25} {'M tokens/s':>11}")
+    for name, run in runs:
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<25} {tokens / best / 1e6:>11.2f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        PROCESSES = int(sys.argv[1])
+    main()
\ No newline at end of file
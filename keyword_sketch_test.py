@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Keyword Sketch Test
+Feeds Zipf-distributed keyword streams (the shape of real keyword traffic)
+to KeywordSketch and to an exact Counter side by side, and checks the
+sketch against the Counter: top-k recall, no undercounting, the Count-Min
+overcount bound, the Space-Saving heavy-hitter guarantee and agreement on
+the 3-mention preference threshold. Runs in-process; no server needed.
+"""
+
+import math
+import sys
+import time
+from collections import Counter
+import numpy as np
+from memory.keyword_extractor import PREFERENCE_THRESHOLD
+from memory.keyword_sketch import KeywordSketch
+
+# (name, distinct keywords, mentions, Zipf exponent)
+STREAMS = [
+    ("typical user", 5000, 20000, 1.1),
+    ("heavy user", 200000, 1000000, 1.05)
+]
+TOP_K = (10, 50)
+MIN_RECALL = 0.95
+
+def zipf_stream(rng: np.random.Generator, vocabulary: int, mentions: int, exponent: float):
+    ranks = rng.zipf(exponent, size=mentions * 3)
+    ranks = ranks[ranks <= vocabulary][:mentions]
+    return [f"kw{rank}" for rank in ranks]
+
+def report(name, passed, detail):
+    print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return passed
+
+def check_stream(name: str, stream):
+    sketch = KeywordSketch()
+    exact = Counter()
+    start = time.perf_counter()
+    sketch.update(stream)
+    update_us = (time.perf_counter() - start) / len(stream) * 1e6
+    exact.update(stream)
+    total = len(stream)
+    results = []
+    print(f"{name}: {total} mentions, {len(exact)} distinct keywords, {update_us:.2f} us/mention")
+    
+    for k in TOP_K:
+        expected = {keyword for keyword, _ in exact.most_common(k)}
+        got = {keyword for keyword, _ in sketch.most_common(k)}
+        recall = len(expected & got) / k
+        results.append(report(f"  top-{k} recall", recall >= MIN_RECALL, f"{recall:.2f} (want >= {MIN_RECALL})"))
+        
+    errors = np.array([sketch[keyword] - count for keyword, count in exact.items()])
+    results.append(report("  never undercounts", errors.min() >= 0, f"smallest error {errors.min()}"))
+    
+    # Count-Min: within (e / width) * N with probability 1 - exp(-depth), per keyword
+    bound = math.e / sketch.width * total
+    within = float((errors <= bound).mean())
+    results.append(report(
+        "  overcount bound",
+        within >= 1 - math.exp(-sketch.depth),
+        f"{within:.4f} of keywords within e/width*N = {bound:.0f} (mean error {errors.mean():.2f}, max {errors.max()})"
+    ))
+    
+    # Space-Saving: every keyword mentioned more than the eviction floor is monitored,
+    # and the floor stays below plain Space-Saving's N / capacity
+    heavy = [keyword for keyword, count in exact.items() if count > sketch.floor]
+    summary = {keyword for keyword, _ in sketch.most_common()}
+    missing = [keyword for keyword in heavy if keyword not in summary]
+    results.append(report(
+        "  heavy hitters monitored",
+        not missing and sketch.floor <= total / sketch.capacity,
+        f"{len(heavy) - len(missing)}/{len(heavy)} keywords above floor {sketch.floor} (N/capacity = {total / sketch.capacity:.0f})"
+    ))
+    
+    # The preference rule only asks whether a keyword reached the threshold; no undercount means no misses
+    recent = set(stream[-10000:])
+    false_positives = sum(exact[keyword] < PREFERENCE_THRESHOLD <= sketch[keyword] for keyword in recent)
+    false_negatives = sum(sketch[keyword] < PREFERENCE_THRESHOLD <= exact[keyword] for keyword in recent)
+    results.append(report(
+        f"  threshold {PREFERENCE_THRESHOLD}",
+        false_negatives == 0,
+        f"{len(recent)} recent keywords, {false_negatives} missed, {false_positives} reached early"
+    ))
+    print(f"  memory: sketch {sketch.nbytes} bytes fixed, exact {len(exact)} Counter entries")
+    return all(results)
+
+def main():
+    rng = np.random.default_rng(0)
+    results = [check_stream(name, zipf_stream(rng, *shape)) for name, *shape in STREAMS]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Keyword Tracking Benchmark
+Gives one user a 10k-term keyword history and sends 500 messages of 10
+terms through track_user_keywords plus the preference writes the chat
+service makes for its result, against the old tracking that rescanned the
+whole history after every message and rewrote every keyword at or above
+the threshold, one create_preference call each. Runs in-process; no server.
+
+    python keyword_tracking_benchmark.py           # 10k-term vocabulary
+    python keyword_tracking_benchmark.py 100000
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+import structlog
+from memory import SimpleGraphManager
+from memory.keyword_extractor import PREFERENCE_THRESHOLD, KeywordExtractor
+
+VOCABULARY = 10000
+MESSAGES = 500
+TERMS = 10
+
+def legacy_track_user_keywords(extractor: KeywordExtractor, user_id: str, message: str):
+    """Tracking before it looked only at the message's keywords: rescan the whole history"""
+    history = extractor.user_keyword_history[user_id]
+    history.update(extractor.extract_keywords(message))
+    return {keyword: count for keyword, count in history.items() if count >= PREFERENCE_THRESHOLD}
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"one user, {VOCABULARY}-term history, {MESSAGES} messages of {TERMS} terms")
+    print(f"{'tracking':<9} {'ms/message':>11} {'writes/message':>15}")
+    for name in ("old", "new"):
+        rng = random.Random(0)
+        vocabulary = ["".join(rng.choice("abcdefghijklmnop") for _ in range(7)) for _ in range(VOCABULARY)]
+        messages = [" ".join(rng.sample(vocabulary, TERMS)) for _ in range(MESSAGES)]
+        extractor = KeywordExtractor()
+        extractor.user_keyword_history["user"] = Counter({keyword: rng.randint(1, 6) for keyword in vocabulary})
+        manager = SimpleGraphManager()
+        manager.create_user("user")
+        writes = 0
+        start = time.perf_counter()
+        for message in messages:
+            if name == "old":
+                changed = legacy_track_user_keywords(extractor, "user", message)
+                for keyword, count in changed.items():
+                    manager.create_preference("user", keyword, count * 0.1)
+            else:
+                changed = extractor.track_user_keywords("user", message)
+                manager.create_preferences("user", {keyword: count * 0.1 for keyword, count in changed.items()})
+            writes += len(changed)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<9} {elapsed / MESSAGES * 1000:>11.2f} {writes / MESSAGES:>15.1f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        VOCABULARY = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -1,64 +1,119 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
+import time
 import anthropic
-from llm.base import LLMClient, LLMConfig, LLMResponse
+import httpx
+from llm.base import LLMClient, LLMConfig, LLMRateLimitError, LLMResponse, LLMServerError, LLMTimeoutError
 import structlog
 
 logger = structlog.get_logger()
 
 class AnthropicClient(LLMClient):
-    def __init__(self, api_key: str, default_model: str = "claude-3-haiku-20240307"):
+    def __init__(self, api_key: str, default_model: str = "claude-3-haiku-20240307", base_url: Optional[str] = None,
+                 http_client: Optional[httpx.Client] = None, async_http_client: Optional[httpx.AsyncClient] = None,
+                 timeout: Optional[httpx.Timeout] = None, max_retries: Optional[int] = None):
+        """http_client / async_http_client: shared, pooled httpx clients (see llm.factory);
+        max_retries: the SDK's own retries (None keeps the SDK default)"""
         super().__init__(api_key)
-        self.client = anthropic.Anthropic(api_key=api_key)
+        options = {"api_key": api_key, "base_url": base_url}
+        if timeout is not None:
+            options["timeout"] = timeout
+        if max_retries is not None:
+            options["max_retries"] = max_retries
+        self.client = anthropic.Anthropic(http_client=http_client, **options)
+        self.async_client = anthropic.AsyncAnthropic(http_client=async_http_client, **options)
+        self.async_http_client = async_http_client
         self.default_model = default_model
         
+    async def awarmup(self):
+        if self.async_http_client is not None:
+            await self._warm_connection(self.async_http_client, str(self.async_client.base_url))
+            
+        
     def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
         model = config.model or self.default_model
         
         try:
-            kwargs = {
-                "model": model,
-                "max_tokens": config.max_tokens,
-                "temperature": config.temperature,
-                "messages": [{"role": "user", "content": prompt}]
-            }
-            
-            if config.system_prompt:
-                kwargs["system"] = config.system_prompt
-                
-            if config.top_p is not None:
-                kwargs["top_p"] = config.top_p
-                
             response, elapsed_ms = self._measure_time(
                 self.client.messages.create,
-                **kwargs
+                **self._request_kwargs(prompt, config, model)
             )
+            return self._to_response(response, model, elapsed_ms)
+        except Exception as e:
+            raise self._generation_error(e) from e
             
-            content = response.content[0].text if response.content else ""
-            tokens_used = response.usage.input_tokens + response.usage.output_tokens if response.usage else self.count_tokens(content)
-            
-            logger.info(
-                "anthropic_generation_complete",
-                model=model,
-                tokens=tokens_used,
-                response_time_ms=elapsed_ms
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        model = config.model or self.default_model
+        
+        try:
+            response, elapsed_ms = await self._ameasure_time(
+                self.async_client.messages.create,
+                **self._request_kwargs(prompt, config, model)
             )
+            return self._to_response(response, model, elapsed_ms)
+        except Exception as e:
+            raise self._generation_error(e) from e
             
-            return LLMResponse(
-                content=content,
-                model=model,
-                tokens_used=tokens_used,
-                response_time_ms=elapsed_ms
-            )
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        model = config.model or self.default_model
+        start_time = time.time()
+        
+        try:
+            async with self.async_client.messages.stream(**self._request_kwargs(prompt, config, model)) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            raise self._generation_error(e) from e
+            
+        logger.info("anthropic_stream_complete", model=model, response_time_ms=(time.time() - start_time) * 1000)
+        
+    def _request_kwargs(self, prompt: str, config: LLMConfig, model: str) -> dict:
+        kwargs = {
+            "model": model,
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature,
+            "messages": [{"role": "user", "content": prompt}]
+        }
             
-        except anthropic.RateLimitError as e:
+        if config.system_prompt:
+            kwargs["system"] = config.system_prompt
+                
+        if config.top_p is not None:
+            kwargs["top_p"] = config.top_p
+        return kwargs
+                
+    def _to_response(self, response, model: str, elapsed_ms: float) -> LLMResponse:
+        content = response.content[0].text if response.content else ""
+        tokens_used = response.usage.input_tokens + response.usage.output_tokens if response.usage else self.count_tokens(content)
+            
+        logger.info(
+            "anthropic_generation_complete",
+            model=model,
+            tokens=tokens_used,
+            response_time_ms=elapsed_ms
+        )
+            
+        return LLMResponse(
+            content=content,
+            model=model,
+            tokens_used=tokens_used,
+            response_time_ms=elapsed_ms
+        )
+            
+    def _generation_error(self, e: Exception) -> Exception:
+        if isinstance(e, anthropic.RateLimitError):
             logger.error("anthropic_rate_limit", error=str(e))
-            raise Exception(f"Rate limit exceeded: {e}")
-        except anthropic.AuthenticationError as e:
+            return LLMRateLimitError(f"Rate limit exceeded: {e}")
+        if isinstance(e, anthropic.APITimeoutError):
+            logger.error("anthropic_timeout", error=str(e))
+            return LLMTimeoutError(f"Request timed out: {e}")
+        if isinstance(e, (anthropic.InternalServerError, anthropic.APIConnectionError)):
+            logger.error("anthropic_server_error", error=str(e))
+            return LLMServerError(f"Provider error: {e}")
+        if isinstance(e, anthropic.AuthenticationError):
             logger.error("anthropic_auth_error", error=str(e))
-            raise Exception(f"Authentication failed: {e}")
-        except Exception as e:
-            logger.error("anthropic_generation_error", error=str(e))
-            raise Exception(f"Generation failed: {e}")
+            return Exception(f"Authentication failed: {e}")
+        logger.error("anthropic_generation_error", error=str(e))
+        return Exception(f"Generation failed: {e}")
             
     def count_tokens(self, text: str) -> int:
         return len(text) // 4
\ No newline at end of file
@@ -1,7 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
 import time
+import structlog
+
+logger = structlog.get_logger()
+
+class LLMRateLimitError(Exception):
+    """The provider rejected the request for rate or quota reasons; another provider may still serve it"""
+
+class LLMTimeoutError(Exception):
+    """The provider did not answer within the request timeout"""
+
+class LLMServerError(Exception):
+    """The provider failed transiently (a 5xx or a dropped connection); the same request may succeed if retried"""
+
+class LLMUnavailableError(Exception):
+    """Refused without calling the provider: its circuit breaker is open or its queue is full"""
 
 class LLMConfig(BaseModel):
     temperature: float = 0.7
@@ -24,12 +40,43 @@ class LLMClient(ABC):
     def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
         raise NotImplementedError
     
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        """Awaitable generate. Clients with an async SDK override this; the
+        default runs generate in a worker thread so it never blocks the event loop."""
+        return await asyncio.to_thread(self.generate, prompt, config)
+        
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        """Yield the completion as text deltas. Clients with a streaming API
+        override this; the default yields the whole agenerate reply at once."""
+        response = await self.agenerate(prompt, config)
+        yield response.content
+        
     @abstractmethod
     def count_tokens(self, text: str) -> int:
         raise NotImplementedError
         
+    async def awarmup(self):
+        """Prepare for the first request (open pooled connections, load tokenizers); no-op by default"""
+        
+    async def _warm_connection(self, http_client, url: str):
+        # Any response will do: the point is a pooled keep-alive connection
+        # with its TCP and TLS handshakes already done
+        start = time.time()
+        try:
+            await http_client.head(url)
+        except Exception as e:
+            logger.warning("llm_warmup_failed", url=url, error=str(e))
+            return
+        logger.info("llm_connection_warmed", url=url, warmup_ms=(time.time() - start) * 1000)
+        
     def _measure_time(self, func, *args, **kwargs):
         start = time.time()
         result = func(*args, **kwargs)
         elapsed_ms = (time.time() - start) * 1000
+        return result, elapsed_ms
+        
+    async def _ameasure_time(self, func, *args, **kwargs):
+        start = time.time()
+        result = await func(*args, **kwargs)
+        elapsed_ms = (time.time() - start) * 1000
         return result, elapsed_ms
\ No newline at end of file
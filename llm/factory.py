@@ -1,24 +1,175 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import threading
+import time
+import httpx
 from llm.base import LLMClient
-from llm.openai_client import OpenAIClient
-from llm.anthropic_client import AnthropicClient
+from llm.guard import AdaptiveLimiter, CircuitBreaker, GuardedLLMClient, ProviderGuard
 from app.config import settings
 import structlog
 
 logger = structlog.get_logger()
 
-def get_llm_client(provider: Optional[str] = None) -> LLMClient:
+# Long-lived clients keyed by (provider, model, api key), and the pooled HTTP
+# clients they share keyed by (provider, api key). SDK clients are thread-safe
+# and their pools keep connections (and TLS sessions) alive across requests.
+_clients: Dict[Tuple[str, Optional[str], str], LLMClient] = {}
+_http_pools: Dict[Tuple[str, str], Tuple[httpx.Client, httpx.AsyncClient]] = {}
+# One concurrency limit and circuit breaker per provider, whatever the model
+_guards: Dict[str, ProviderGuard] = {}
+_lock = threading.Lock()
+
+def get_llm_client(provider: Optional[str] = None, model: Optional[str] = None) -> LLMClient:
+    """Shared client for provider (default settings.llm_provider) and model (default: the client's own).
+    
+    With settings.llm_fallback_provider set, the default is a RoutingLLMClient
+    that hedges and fails over from llm_provider to the fallback.
+    """
+    if provider is None and settings.llm_fallback_provider and settings.llm_fallback_provider != settings.llm_provider:
+        return _routing_client(model)
     provider = provider or settings.llm_provider
+    api_key = _api_key(provider)
+    key = (provider, model, api_key)
     
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _create_client(provider, model, api_key)
+                if settings.llm_guard_enabled:
+                    client = GuardedLLMClient(client, _guard(provider), max_retries=_max_retries())
+                _clients[key] = client
+    return client
+
+def _routing_client(model: Optional[str]) -> LLMClient:
+    key = ("routing", model, settings.llm_fallback_provider)
+    client = _clients.get(key)
+    if client is None:
+        from llm.routing_client import RoutingLLMClient
+        # Resolved outside the lock, which get_llm_client takes itself
+        primary = get_llm_client(settings.llm_provider, model)
+        fallback = get_llm_client(settings.llm_fallback_provider)
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                logger.info("creating_routing_client", primary=settings.llm_provider, fallback=settings.llm_fallback_provider)
+                client = _clients[key] = RoutingLLMClient(
+                    primary,
+                    fallback,
+                    primary_name=settings.llm_provider,
+                    fallback_name=settings.llm_fallback_provider,
+                    hedge_quantile=settings.llm_hedge_quantile,
+                    hedge_min_samples=settings.llm_hedge_min_samples,
+                    latency_window=settings.llm_latency_window
+                )
+    return client
+
+def _guard(provider: str) -> ProviderGuard:
+    guard = _guards.get(provider)
+    if guard is None:
+        guard = _guards[provider] = ProviderGuard(
+            provider,
+            AdaptiveLimiter(
+                initial_limit=settings.llm_limit_initial,
+                min_limit=settings.llm_limit_min,
+                max_limit=settings.llm_limit_max,
+                backoff=settings.llm_limit_backoff,
+                max_queue=settings.llm_queue_max,
+                queue_timeout=settings.llm_queue_timeout_s
+            ),
+            CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_s)
+        )
+    return guard
+
+def llm_guard_metrics() -> Dict[str, dict]:
+    """Current limit, queue depth and breaker state per provider"""
+    return {provider: guard.get_metrics() for provider, guard in _guards.items()}
+
+def _api_key(provider: str) -> str:
     if provider == "openai":
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key not configured")
-        logger.info("creating_openai_client")
-        return OpenAIClient(settings.openai_api_key)
+        return settings.openai_api_key
     elif provider == "anthropic":
         if not settings.anthropic_api_key:
             raise ValueError("Anthropic API key not configured")
-        logger.info("creating_anthropic_client")
-        return AnthropicClient(settings.anthropic_api_key)
+        return settings.anthropic_api_key
+    elif provider == "stub":
+        return ""
     else:
-        raise ValueError(f"Unknown LLM provider: {provider}")
\ No newline at end of file
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+def _create_client(provider: str, model: Optional[str], api_key: str) -> LLMClient:
+    model_kwargs = {"default_model": model} if model else {}
+    if provider == "stub":
+        from llm.stub_client import StubClient
+        return StubClient(settings.stub_llm_latency_ms, **model_kwargs)
+        
+    http_client, async_http_client = _http_pool(provider, api_key)
+    pool_kwargs = {
+        "http_client": http_client,
+        "async_http_client": async_http_client,
+        "timeout": _timeout(),
+        "max_retries": 0 if settings.llm_guard_enabled else _max_retries(),
+        **model_kwargs
+    }
+    # Provider SDKs are imported on first use, so each is only required when selected
+    if provider == "openai":
+        from llm.openai_client import OpenAIClient
+        logger.info("creating_openai_client", model=model)
+        return OpenAIClient(api_key, base_url=settings.openai_base_url, **pool_kwargs)
+    else:
+        from llm.anthropic_client import AnthropicClient
+        logger.info("creating_anthropic_client", model=model)
+        return AnthropicClient(api_key, base_url=settings.anthropic_base_url, **pool_kwargs)
+
+def _max_retries() -> int:
+    """Retries per call; none when a fallback provider is configured.
+    
+    Made by the SDK without the guard, and by the guard (5xx and connection
+    errors only) with it: SDK retries back off and retry 429s and timeouts
+    inside one call too, so the guard would see a timeout only after
+    (retries + 1) request timeouts and never see the rate limits the backoff
+    absorbed. With a fallback the routing client fails over at once instead.
+    """
+    if settings.llm_fallback_provider and settings.llm_fallback_provider != settings.llm_provider:
+        return 0
+    return settings.llm_sdk_max_retries
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.llm_request_timeout_s, connect=settings.llm_connect_timeout_s)
+
+def _http_pool(provider: str, api_key: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    pool = _http_pools.get((provider, api_key))
+    if pool is None:
+        limits = httpx.Limits(
+            max_connections=settings.llm_pool_max_connections,
+            max_keepalive_connections=settings.llm_pool_max_keepalive,
+            keepalive_expiry=settings.llm_pool_keepalive_expiry_s
+        )
+        pool = _http_pools[(provider, api_key)] = (
+            httpx.Client(limits=limits, timeout=_timeout()),
+            httpx.AsyncClient(limits=limits, timeout=_timeout())
+        )
+    return pool
+
+async def warmup_llm_clients():
+    """Create the default provider's client and let it open connections before traffic arrives"""
+    start_time = time.time()
+    try:
+        client = get_llm_client()
+        await client.awarmup()
+    except Exception as e:
+        logger.warning("llm_warmup_skipped", provider=settings.llm_provider, error=str(e))
+        return
+    logger.info("llm_clients_warmed", provider=settings.llm_provider, warmup_ms=(time.time() - start_time) * 1000)
+
+async def close_llm_clients():
+    with _lock:
+        pools = list(_http_pools.values())
+        _http_pools.clear()
+        _clients.clear()
+        _guards.clear()
+    for http_client, async_http_client in pools:
+        http_client.close()
+        await async_http_client.aclose()
\ No newline at end of file
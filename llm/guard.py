@@ -0,0 +1,299 @@
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+import asyncio
+import random
+import time
+from llm.base import LLMClient, LLMConfig, LLMRateLimitError, LLMResponse, LLMServerError, LLMTimeoutError, LLMUnavailableError
+import structlog
+
+logger = structlog.get_logger()
+
+# Errors that mean the provider is overloaded: they shrink the limit and trip the breaker
+OVERLOAD_ERRORS = (LLMRateLimitError, LLMTimeoutError)
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a bounded wait queue.
+    
+    A call that finishes while the limit is in use raises it: by 1 until the
+    first overload (slow start, doubling per round trip), by 1/limit after
+    that (about +1 per limit's worth of calls). An overload error multiplies
+    it by backoff, once per round: only for a call started after the previous
+    cut, and at most once per smoothed call latency, so one burst of
+    rejections is one cut. Callers beyond the limit wait in a queue of at
+    most one limit's worth of calls (about one call's latency; never more
+    than max_queue) for up to queue_timeout seconds, and are shed with
+    LLMUnavailableError past either bound rather than left to pile up.
+    """
+    
+    def __init__(self, initial_limit: int = 100, min_limit: int = 1, max_limit: int = 1000,
+                 backoff: float = 0.9, max_queue: int = 200, queue_timeout: float = 5.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.slow_start = True
+        self.latency: Optional[float] = None
+        self.last_decrease = 0.0
+        self.shed = 0
+        
+    async def acquire(self) -> float:
+        """Take a slot, waiting if needed; returns the start time to hand back to release"""
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return time.time()
+        if len(self.waiters) >= min(self.max_queue, int(self.limit)):
+            self.shed += 1
+            raise LLMUnavailableError(f"Overloaded: {len(self.waiters)} requests already queued")
+            
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.in_flight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed += 1
+                raise LLMUnavailableError(f"Overloaded: no slot within {self.queue_timeout:.1f}s") from None
+            raise
+        return time.time()
+        
+    def release(self, start_time: float, overloaded: bool = False) -> bool:
+        """Give the slot back; True if this call's overload error cut the limit (a new round)"""
+        now = time.time()
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        cut = False
+        if overloaded:
+            if start_time >= self.last_decrease and now - self.last_decrease >= (self.latency or 0.0):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.slow_start = False
+                self.last_decrease = now
+                cut = True
+                logger.warning("llm_limit_decreased", limit=int(self.limit))
+        else:
+            elapsed = now - start_time
+            self.latency = elapsed if self.latency is None else 0.9 * self.latency + 0.1 * elapsed
+            if saturated:
+                self.limit = min(self.max_limit, self.limit + (1 if self.slow_start else 1 / self.limit))
+        self._wake()
+        return cut
+        
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            self.in_flight += 1
+            waiter.set_result(None)
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails fast while
+    open; after reset_timeout one probe call is let through (half-open), and
+    its outcome closes or re-opens the breaker."""
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.time() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.probing:
+                self.rejected += 1
+                return False
+            self.probing = True
+        return True
+        
+    def record(self, failed: Optional[bool]):
+        """failed: True for an overload error, False for any other outcome, None if the call was abandoned"""
+        self.probing = False
+        if failed is None:
+            return
+        # Any success (even one started before the breaker opened) shows the
+        # provider is serving again; late failures do not extend an open breaker
+        if not failed:
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                self.state = "closed"
+                logger.info("llm_circuit_closed")
+            return
+        if self.state == "open":
+            return
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning("llm_circuit_opened", consecutive_failures=self.consecutive_failures)
+            self.state = "open"
+            self.opened_at = time.time()
+
+class ProviderGuard:
+    """Limiter and breaker shared by every client of one provider.
+    
+    The breaker counts overload rounds (limiter cuts), not single errors: a
+    burst of rate limits that the limit already adapts to is one failure, and
+    any success in between resets the count, so it opens only when the
+    provider keeps failing at a reduced limit.
+    """
+    
+    def __init__(self, name: str, limiter: AdaptiveLimiter, breaker: CircuitBreaker):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.retries = 0
+        
+    async def enter(self) -> float:
+        if not self.breaker.allow():
+            raise LLMUnavailableError(f"Circuit open for {self.name}: failing fast")
+        try:
+            return await self.limiter.acquire()
+        except BaseException:
+            self.breaker.record(None)
+            raise
+            
+    def exit(self, start_time: float, error: Optional[BaseException]):
+        overloaded = isinstance(error, OVERLOAD_ERRORS)
+        if isinstance(error, LLMRateLimitError):
+            self.rate_limited += 1
+        elif isinstance(error, LLMTimeoutError):
+            self.timeouts += 1
+        cut = self.limiter.release(start_time, overloaded)
+        if isinstance(error, asyncio.CancelledError):
+            self.breaker.record(None)
+        elif not overloaded:
+            self.breaker.record(False)
+        else:
+            # A failed half-open probe always counts
+            self.breaker.record(True if cut or self.breaker.state == "half_open" else None)
+            
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "queue_depth": len(self.limiter.waiters),
+            "shed": self.limiter.shed,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "breaker_rejected": self.breaker.rejected,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "retries": self.retries
+        }
+
+class GuardedLLMClient(LLMClient):
+    """Runs a client's calls through its provider's ProviderGuard.
+    
+    Other attributes (default_model, ...) are those of the wrapped client.
+    The blocking generate() goes through the breaker but not the limiter,
+    whose queue lives on the event loop.
+    
+    The guard sees every attempt, so the SDK's own retries are turned off
+    (see llm.factory) and the guard makes them instead, for LLMServerError
+    only: up to max_retries more attempts, after retry_delay doubling per
+    attempt with jitter, each through the limiter and breaker again. Rate
+    limits and timeouts are not retried; they shrink the limit instead. A
+    stream is only retried before its first chunk.
+    """
+    
+    def __init__(self, client: LLMClient, guard: ProviderGuard, max_retries: int = 0, retry_delay: float = 0.5):
+        super().__init__(client.api_key)
+        self.client = client
+        self.guard = guard
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        
+    def __getattr__(self, name: str):
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+        
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        attempt = 0
+        while True:
+            start_time = await self.guard.enter()
+            error = None
+            try:
+                return await self.client.agenerate(prompt, config)
+            except LLMServerError as e:
+                error = e
+                if attempt >= self.max_retries:
+                    raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self.guard.exit(start_time, error)
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+            
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        # The slot is held until the stream is finished or abandoned
+        attempt = 0
+        while True:
+            start_time = await self.guard.enter()
+            error = None
+            started = False
+            try:
+                async for text in self.client.astream(prompt, config):
+                    started = True
+                    yield text
+                return
+            except LLMServerError as e:
+                error = e
+                if started or attempt >= self.max_retries:
+                    raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self.guard.exit(start_time, asyncio.CancelledError() if isinstance(error, GeneratorExit) else error)
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+            
+    def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        attempt = 0
+        while True:
+            if not self.guard.breaker.allow():
+                raise LLMUnavailableError(f"Circuit open for {self.guard.name}: failing fast")
+            failed = False
+            try:
+                return self.client.generate(prompt, config)
+            except OVERLOAD_ERRORS:
+                failed = True
+                raise
+            except LLMServerError:
+                if attempt >= self.max_retries:
+                    raise
+            finally:
+                self.guard.breaker.record(failed)
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+            
+    def _backoff(self, attempt: int) -> float:
+        """Seconds before retry number attempt + 1: exponential, capped at 8s, minus up to 25% jitter"""
+        self.guard.retries += 1
+        return min(self.retry_delay * 2 ** attempt, 8.0) * (1 - 0.25 * random.random())
+            
+    async def awarmup(self):
+        await self.client.awarmup()
+        
+    def count_tokens(self, text: str) -> int:
+        return self.client.count_tokens(text)
\ No newline at end of file
@@ -1,74 +1,142 @@
-from typing import Optional
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+import time
+import httpx
 import openai
-from openai import OpenAI
-from llm.base import LLMClient, LLMConfig, LLMResponse
+from openai import AsyncOpenAI, OpenAI
+from llm.base import LLMClient, LLMConfig, LLMRateLimitError, LLMResponse, LLMServerError, LLMTimeoutError
 import structlog
 import tiktoken
 
 logger = structlog.get_logger()
 
+@lru_cache(maxsize=16)
+def _encoder(model: str) -> Optional[tiktoken.Encoding]:
+    """Process-wide tiktoken encoder per model; None (count by characters) if it cannot be loaded"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        logger.warning("tiktoken_encoder_unavailable", model=model, error=str(e))
+        return None
+
 class OpenAIClient(LLMClient):
-    def __init__(self, api_key: str, default_model: str = "gpt-4o-mini"):
+    def __init__(self, api_key: str, default_model: str = "gpt-4o-mini", base_url: Optional[str] = None,
+                 http_client: Optional[httpx.Client] = None, async_http_client: Optional[httpx.AsyncClient] = None,
+                 timeout: Optional[httpx.Timeout] = None, max_retries: Optional[int] = None):
+        """http_client / async_http_client: shared, pooled httpx clients (see llm.factory);
+        max_retries: the SDK's own retries (None keeps the SDK default)"""
         super().__init__(api_key)
-        self.client = OpenAI(api_key=api_key)
+        options = {"api_key": api_key, "base_url": base_url}
+        if timeout is not None:
+            options["timeout"] = timeout
+        if max_retries is not None:
+            options["max_retries"] = max_retries
+        self.client = OpenAI(http_client=http_client, **options)
+        self.async_client = AsyncOpenAI(http_client=async_http_client, **options)
+        self.async_http_client = async_http_client
         self.default_model = default_model
-        self.encoder = None
+        
+    async def awarmup(self):
+        _encoder(self.default_model)
+        if self.async_http_client is not None:
+            await self._warm_connection(self.async_http_client, str(self.async_client.base_url))
+            
         
     def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
         model = config.model or self.default_model
         
         try:
-            messages = []
-            if config.system_prompt:
-                messages.append({"role": "system", "content": config.system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "temperature": config.temperature,
-                "max_tokens": config.max_tokens,
-            }
-            
-            if config.top_p is not None:
-                kwargs["top_p"] = config.top_p
-                
             response, elapsed_ms = self._measure_time(
                 self.client.chat.completions.create,
-                **kwargs
+                **self._request_kwargs(prompt, config, model)
             )
+            return self._to_response(response, model, elapsed_ms)
+        except Exception as e:
+            raise self._generation_error(e) from e
             
-            content = response.choices[0].message.content
-            tokens_used = response.usage.total_tokens if response.usage else self.count_tokens(content)
-            
-            logger.info(
-                "openai_generation_complete",
-                model=model,
-                tokens=tokens_used,
-                response_time_ms=elapsed_ms
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        model = config.model or self.default_model
+        
+        try:
+            response, elapsed_ms = await self._ameasure_time(
+                self.async_client.chat.completions.create,
+                **self._request_kwargs(prompt, config, model)
             )
+            return self._to_response(response, model, elapsed_ms)
+        except Exception as e:
+            raise self._generation_error(e) from e
             
-            return LLMResponse(
-                content=content,
-                model=model,
-                tokens_used=tokens_used,
-                response_time_ms=elapsed_ms
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        model = config.model or self.default_model
+        start_time = time.time()
+        
+        try:
+            stream = await self.async_client.chat.completions.create(
+                stream=True,
+                **self._request_kwargs(prompt, config, model)
             )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise self._generation_error(e) from e
+            
+        logger.info("openai_stream_complete", model=model, response_time_ms=(time.time() - start_time) * 1000)
+        
+    def _request_kwargs(self, prompt: str, config: LLMConfig, model: str) -> dict:
+        messages = []
+        if config.system_prompt:
+            messages.append({"role": "system", "content": config.system_prompt})
+        messages.append({"role": "user", "content": prompt})
+            
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "temperature": config.temperature,
+            "max_tokens": config.max_tokens,
+        }
             
-        except openai.RateLimitError as e:
+        if config.top_p is not None:
+            kwargs["top_p"] = config.top_p
+        return kwargs
+                
+    def _to_response(self, response, model: str, elapsed_ms: float) -> LLMResponse:
+        content = response.choices[0].message.content
+        tokens_used = response.usage.total_tokens if response.usage else self.count_tokens(content)
+            
+        logger.info(
+            "openai_generation_complete",
+            model=model,
+            tokens=tokens_used,
+            response_time_ms=elapsed_ms
+        )
+            
+        return LLMResponse(
+            content=content,
+            model=model,
+            tokens_used=tokens_used,
+            response_time_ms=elapsed_ms
+        )
+            
+    def _generation_error(self, e: Exception) -> Exception:
+        if isinstance(e, openai.RateLimitError):
             logger.error("openai_rate_limit", error=str(e))
-            raise Exception(f"Rate limit exceeded: {e}")
-        except openai.AuthenticationError as e:
+            return LLMRateLimitError(f"Rate limit exceeded: {e}")
+        if isinstance(e, openai.APITimeoutError):
+            logger.error("openai_timeout", error=str(e))
+            return LLMTimeoutError(f"Request timed out: {e}")
+        if isinstance(e, (openai.InternalServerError, openai.APIConnectionError)):
+            logger.error("openai_server_error", error=str(e))
+            return LLMServerError(f"Provider error: {e}")
+        if isinstance(e, openai.AuthenticationError):
             logger.error("openai_auth_error", error=str(e))
-            raise Exception(f"Authentication failed: {e}")
-        except Exception as e:
-            logger.error("openai_generation_error", error=str(e))
-            raise Exception(f"Generation failed: {e}")
+            return Exception(f"Authentication failed: {e}")
+        logger.error("openai_generation_error", error=str(e))
+        return Exception(f"Generation failed: {e}")
             
     def count_tokens(self, text: str) -> int:
-        try:
-            if not self.encoder:
-                self.encoder = tiktoken.encoding_for_model(self.default_model)
-            return len(self.encoder.encode(text))
-        except:
-            return len(text) // 4
\ No newline at end of file
+        encoder = _encoder(self.default_model)
+        if encoder is None:
+            return len(text) // 4
+        return len(encoder.encode(text))
\ No newline at end of file
@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import time
+from llm.base import LLMClient, LLMConfig, LLMRateLimitError, LLMResponse
+import structlog
+
+logger = structlog.get_logger()
+
+class RoutingLLMClient(LLMClient):
+    """Primary provider with a fallback for tail latency and failures.
+    
+    A request goes to the primary. If it is still running after the
+    primary's rolling latency quantile (p95 by default), a hedged copy goes
+    to the fallback and whichever finishes first wins; the other is
+    cancelled. A primary failure, a rate limit in particular, fails over
+    to the fallback at once instead of waiting for the hedge. The fallback
+    always runs its own default model.
+    """
+    
+    def __init__(self, primary: LLMClient, fallback: LLMClient, primary_name: str = "primary",
+                 fallback_name: str = "fallback", hedge_quantile: float = 0.95,
+                 hedge_min_samples: int = 20, latency_window: int = 200):
+        super().__init__(primary.api_key)
+        self.primary = primary
+        self.fallback = fallback
+        self.primary_name = primary_name
+        self.fallback_name = fallback_name
+        self.default_model = primary.default_model
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.rate_limit_failovers = 0
+        
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait on the primary before hedging; None until enough latencies are known"""
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * self.hedge_quantile), len(ordered) - 1)]
+        
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        self.requests += 1
+        start_time = time.time()
+        primary = asyncio.ensure_future(self.primary.agenerate(prompt, config))
+        hedge = None
+        
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+            if done:
+                if primary.exception() is None:
+                    self.latencies.append(time.time() - start_time)
+                    return primary.result()
+                return await self._failover(primary.exception(), prompt, config)
+                
+            # Primary is past its usual latency: race a hedged copy against it
+            self.hedged += 1
+            hedge = asyncio.ensure_future(self.fallback.agenerate(prompt, self._fallback_config(config)))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    break
+            else:
+                # Both failed; surface the primary's error
+                raise primary.exception()
+                
+            # The primary's time so far is a lower bound on its latency, and keeps the tail in the window
+            self.latencies.append(time.time() - start_time)
+            if winner is hedge:
+                self.hedge_wins += 1
+            logger.info(
+                "llm_hedge_finished",
+                winner=self.fallback_name if winner is hedge else self.primary_name,
+                elapsed_ms=(time.time() - start_time) * 1000
+            )
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # a losing copy's error is expected; mark it retrieved
+                    
+    async def _failover(self, error: BaseException, prompt: str, config: LLMConfig) -> LLMResponse:
+        self.failovers += 1
+        if isinstance(error, LLMRateLimitError):
+            self.rate_limit_failovers += 1
+        logger.warning(
+            "llm_failover",
+            primary=self.primary_name,
+            fallback=self.fallback_name,
+            rate_limited=isinstance(error, LLMRateLimitError),
+            error=str(error)
+        )
+        return await self.fallback.agenerate(prompt, self._fallback_config(config))
+        
+    def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        try:
+            return self.primary.generate(prompt, config)
+        except Exception as e:
+            self.failovers += 1
+            logger.warning("llm_failover", primary=self.primary_name, fallback=self.fallback_name, error=str(e))
+            return self.fallback.generate(prompt, self._fallback_config(config))
+            
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        # Streams are not hedged; they fail over only if the primary fails before its first token
+        started = False
+        try:
+            async for text in self.primary.astream(prompt, config):
+                started = True
+                yield text
+            return
+        except Exception as e:
+            if started:
+                raise
+            self.failovers += 1
+            logger.warning("llm_failover", primary=self.primary_name, fallback=self.fallback_name, error=str(e))
+        async for text in self.fallback.astream(prompt, self._fallback_config(config)):
+            yield text
+            
+    def _fallback_config(self, config: LLMConfig) -> LLMConfig:
+        # A model name picked for the primary means nothing to the other provider
+        return config.copy(update={"model": None}) if config.model else config
+        
+    async def awarmup(self):
+        await asyncio.gather(self.primary.awarmup(), self.fallback.awarmup())
+        
+    def count_tokens(self, text: str) -> int:
+        return self.primary.count_tokens(text)
+        
+    def get_metrics(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "primary": self.primary_name,
+            "fallback": self.fallback_name,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "rate_limit_failovers": self.rate_limit_failovers,
+            "hedge_delay_ms": delay * 1000 if delay is not None else None
+        }
\ No newline at end of file
@@ -0,0 +1,44 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call.
+    
+    The first caller for a key starts func(); callers arriving while it runs
+    await the same task and get its result (or its exception). The key is
+    released as soon as the call finishes, so nothing is cached here.
+    """
+    
+    def __init__(self, name: str = "llm"):
+        self.name = name
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = self.in_flight[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+            logger.debug("single_flight_coalesced", flight=self.name)
+        # Shielded, so one waiter disconnecting does not cancel the call the others await
+        return await asyncio.shield(task)
+        
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even if every waiter went away
+            
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight)
+        }
\ No newline at end of file
@@ -0,0 +1,102 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Optional
+from llm.base import LLMClient, LLMConfig, LLMRateLimitError, LLMResponse, LLMServerError, LLMTimeoutError
+import structlog
+
+logger = structlog.get_logger()
+
+class StubClient(LLMClient):
+    """Local provider for load tests: waits latency_ms, then answers with a canned reply.
+    
+    No network and no SDK, so the service's own overhead and concurrency
+    can be measured in isolation. Latency can be drawn from a distribution
+    instead: log-normal around latency_ms with latency_sigma, plus a
+    stall_rate fraction of calls that take stall_ms. rate_limit_rate of
+    calls fail with LLMRateLimitError, server_error_rate with LLMServerError.
+    
+    With capacity set, a call beyond capacity concurrent calls is throttled:
+    it fails with LLMRateLimitError at once, or, with overload_ms, with
+    LLMTimeoutError after hanging that long (a provider that stops answering).
+    """
+    
+    def __init__(self, latency_ms: float = 500, default_model: str = "stub", latency_sigma: float = 0.0,
+                 stall_rate: float = 0.0, stall_ms: float = 0.0, rate_limit_rate: float = 0.0,
+                 server_error_rate: float = 0.0, capacity: int = 0, overload_ms: float = 0.0, seed: Optional[int] = None):
+        super().__init__("")
+        self.latency = latency_ms / 1000
+        self.default_model = default_model
+        self.latency_sigma = latency_sigma
+        self.stall_rate = stall_rate
+        self.stall = stall_ms / 1000
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.capacity = capacity
+        self.overload = overload_ms / 1000
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.in_flight = 0
+        
+    def _next_latency(self) -> float:
+        self.calls += 1
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            raise LLMRateLimitError("Rate limit exceeded: injected by stub")
+        if self.server_error_rate and self.random.random() < self.server_error_rate:
+            raise LLMServerError("Provider error: injected by stub")
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            return self.stall
+        if self.latency_sigma:
+            return self.latency * self.random.lognormvariate(0.0, self.latency_sigma)
+        return self.latency
+        
+    def generate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        latency = self._next_latency()
+        start = time.time()
+        time.sleep(latency)
+        return self._reply(prompt, config, (time.time() - start) * 1000)
+        
+    async def agenerate(self, prompt: str, config: LLMConfig) -> LLMResponse:
+        latency = self._next_latency()
+        start = time.time()
+        self.in_flight += 1
+        try:
+            if self.capacity and self.in_flight > self.capacity:
+                await self._throttle()
+            await asyncio.sleep(latency)
+        finally:
+            self.in_flight -= 1
+        return self._reply(prompt, config, (time.time() - start) * 1000)
+        
+    async def _throttle(self):
+        if not self.overload:
+            raise LLMRateLimitError("Rate limit exceeded: stub over capacity")
+        await asyncio.sleep(self.overload)
+        raise LLMTimeoutError("Request timed out: stub over capacity")
+        
+    async def astream(self, prompt: str, config: LLMConfig) -> AsyncIterator[str]:
+        # Same total latency as agenerate, spread evenly over the words
+        latency = self._next_latency()
+        words = self._reply(prompt, config, 0.0).content.split(" ")
+        self.in_flight += 1
+        try:
+            if self.capacity and self.in_flight > self.capacity:
+                await self._throttle()
+            for index, word in enumerate(words):
+                await asyncio.sleep(latency / len(words))
+                yield word if index == 0 else " " + word
+        finally:
+            self.in_flight -= 1
+            
+    def _reply(self, prompt: str, config: LLMConfig, elapsed_ms: float) -> LLMResponse:
+        message = prompt.rsplit("Current message: ", 1)[-1].split("\n", 1)[0]
+        content = f"Stub reply to: {message[:200]}"
+        return LLMResponse(
+            content=content,
+            model=config.model or self.default_model,
+            tokens_used=self.count_tokens(prompt) + self.count_tokens(content),
+            response_time_ms=elapsed_ms
+        )
+        
+    def count_tokens(self, text: str) -> int:
+        return len(text) // 4
\ No newline at end of file
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+LLM Client Pool Benchmark
+Starts a local stub of the OpenAI /chat/completions endpoint (uvicorn, in a
+child process) and sends it 300 sequential agenerate calls through the
+openai SDK, once building a fresh OpenAIClient per request, as
+get_llm_client used to, and once through the shared, pooled client from
+llm.factory after warmup. Then measures throughput at 32 concurrent
+requests both ways. Plain HTTP only; no API keys.
+
+    python llm_pool_benchmark.py          # 300 requests
+    python llm_pool_benchmark.py 1000
+"""
+
+import asyncio
+import json
+import multiprocessing
+import socket
+import sys
+import time
+import structlog
+import uvicorn
+from app.config import settings
+from llm import factory
+from llm.base import LLMConfig
+from llm.openai_client import OpenAIClient
+
+REQUESTS = 300
+CONCURRENCY = 32
+ROUNDS = 10
+HOST = "127.0.0.1"
+PORT = 9100
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "stub reply"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+}).encode()
+
+async def stub_app(scope, receive, send):
+    """Answers every request with the same chat completion"""
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": COMPLETION})
+
+def serve():
+    uvicorn.run(stub_app, host=HOST, port=PORT, log_level="warning")
+
+def port_open() -> bool:
+    try:
+        socket.create_connection((HOST, PORT), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+def wait_for_port(server: multiprocessing.Process, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline and server.is_alive():
+        if port_open():
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"stub server did not start on {HOST}:{PORT}")
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    mean = sum(latencies) / len(latencies)
+    return f"{mean:>7.2f} {latencies[len(latencies) // 2]:>7.2f} {latencies[int(len(latencies) * 0.99)]:>7.2f}"
+
+async def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    base_url = f"http://{HOST}:{PORT}/v1"
+    settings.llm_provider = "openai"
+    settings.llm_fallback_provider = ""
+    settings.openai_api_key = "sk-test"
+    settings.openai_base_url = base_url
+    config = LLMConfig(max_tokens=5)
+    clients = {
+        "fresh": lambda: OpenAIClient("sk-test", base_url=base_url),
+        "pooled": factory.get_llm_client
+    }
+    
+    await factory.warmup_llm_clients()
+    print(f"{REQUESTS} sequential requests (ms), then {CONCURRENCY} concurrent x {ROUNDS} rounds")
+    print(f"{'client':<7} {'mean':>7} {'p50':>7} {'p99':>7} {'req/s':>7}")
+    for name, client in clients.items():
+        latencies = []
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            await client().agenerate("hi", config)
+            latencies.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await asyncio.gather(*(client().agenerate("hi", config) for _ in range(CONCURRENCY)))
+        throughput = CONCURRENCY * ROUNDS / (time.perf_counter() - start)
+        print(f"{name:<7} {summary(latencies)} {throughput:>7.0f}")
+    await factory.close_llm_clients()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        REQUESTS = int(sys.argv[1])
+    if port_open():
+        sys.exit(f"{HOST}:{PORT} is already in use; stop whatever is listening there first")
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    try:
+        wait_for_port(server)
+        asyncio.run(main())
+    finally:
+        server.terminate()
+        server.join()
\ No newline at end of file
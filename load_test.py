@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Concurrency Load Test
+Fires batches of concurrent /chat requests at increasing concurrency and
+reports throughput. Start the server with LLM_PROVIDER=stub so every
+completion takes a fixed STUB_LLM_LATENCY_MS: with a non-blocking service,
+throughput should grow linearly with concurrency.
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+import httpx
+
+API_BASE = "http://localhost:8001"
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+ROUNDS = 5
+
+async def send_message(client, user_id, message):
+    """Send one message, return (ok, latency_ms)"""
+    start = time.time()
+    try:
+        response = await client.post(
+            f"{API_BASE}/chat",
+            json={"userId": user_id, "message": message},
+            timeout=60
+        )
+        ok = response.status_code == 200 and response.json().get("stage") != "Error"
+    except Exception:
+        ok = False
+    return ok, (time.time() - start) * 1000
+
+async def run_level(client, concurrency):
+    """ROUNDS batches of `concurrency` simultaneous requests, one user per slot (stays under the per-user rate limit)"""
+    run_id = uuid.uuid4().hex[:8]
+    results = []
+    start = time.time()
+    for round_number in range(ROUNDS):
+        results += await asyncio.gather(*(
+            send_message(client, f"load-{run_id}-{slot}", f"Message {round_number}: I enjoy hiking and strong coffee")
+            for slot in range(concurrency)
+        ))
+    elapsed = time.time() - start
+    
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(1 for ok, _ in results if not ok),
+        "throughput": len(results) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)]
+    }
+
+async def main():
+    levels = [int(level) for level in sys.argv[1:]] or CONCURRENCY_LEVELS
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(limits=limits) as client:
+        baseline = None
+        print(f"{'concurrency':>11} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for concurrency in levels:
+            result = await run_level(client, concurrency)
+            baseline = baseline or result["throughput"] / concurrency
+            print(
+                f"{result['concurrency']:>11} {result['throughput']:>8.1f} {result['throughput'] / baseline:>8.1f} "
+                f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['errors']:>7}"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -1,3 +1,4 @@
 from memory.simple_graph_manager import SimpleGraphManager
+from memory.compact_graph_manager import CompactGraphManager
 
-__all__ = ["SimpleGraphManager"]
\ No newline at end of file
+__all__ = ["SimpleGraphManager", "CompactGraphManager"]
\ No newline at end of file
@@ -0,0 +1,175 @@
+from array import array
+from typing import Any, List, Dict, Optional
+import numpy as np
+import structlog
+from memory.simple_graph_manager import SimpleGraphManager, iso_timestamp
+
+logger = structlog.get_logger()
+
+class _PreferenceRecord:
+    __slots__ = ("keyword", "count", "weight", "first_seen", "last_seen")
+    
+    def __init__(self, keyword: str, weight: float, now: float):
+        self.keyword = keyword
+        self.count = 1
+        self.weight = weight
+        self.first_seen = now
+        self.last_seen = now
+
+class _UserStore:
+    """Columnar message storage for a single user.
+    
+    Message n lives at index n of every column; its content is the UTF-8
+    slice arena[offsets[n]:offsets[n + 1]] (or to the end of the arena for
+    the newest message). Compaction drops columns from the front, so n is
+    the message seq minus the user's compacted_upto.
+    """
+    __slots__ = ("uid", "created_at", "timestamps", "roles", "offsets", "arena", "preferences")
+    
+    def __init__(self, uid: int, created_at: float):
+        self.uid = uid
+        self.created_at = created_at
+        self.timestamps = array("d")
+        self.roles = array("B")
+        self.offsets = array("Q")
+        self.arena = bytearray()
+        self.preferences: Dict[str, _PreferenceRecord] = {}
+        
+    def content(self, n: int) -> str:
+        start = self.offsets[n]
+        end = self.offsets[n + 1] if n + 1 < len(self.offsets) else len(self.arena)
+        return self.arena[start:end].decode("utf-8")
+
+class CompactGraphManager(SimpleGraphManager):
+    """SimpleGraphManager backed by per-user columnar arrays instead of NetworkX attribute dicts.
+    
+    Users map to integer ids, messages are identified by their per-user
+    sequence number, timestamps are float epochs, roles are interned to a
+    byte code and contents are packed into a per-user byte arena. Reads
+    rebuild the same dicts SimpleGraphManager returns.
+    """
+    
+    def _init_storage(self):
+        self.users: Dict[str, _UserStore] = {}
+        self.role_names: List[str] = []
+        self.role_codes: Dict[str, int] = {}
+        
+    def _role_code(self, role: str) -> int:
+        code = self.role_codes.get(role)
+        if code is None:
+            code = len(self.role_names)
+            self.role_names.append(role)
+            self.role_codes[role] = code
+        return code
+        
+    def _has_user(self, user_id: str) -> bool:
+        return user_id in self.users
+        
+    def _store_user(self, user_id: str, timestamp: float):
+        self.users[user_id] = _UserStore(len(self.users), timestamp)
+        
+    def _store_message(self, user_id: str, message_id: str, message: str, role: str, timestamp: float):
+        store = self.users[user_id]
+        store.timestamps.append(timestamp)
+        store.roles.append(self._role_code(role))
+        store.offsets.append(len(store.arena))
+        store.arena += message.encode("utf-8")
+        
+    def _recent_messages(self, user_id: str, limit: int) -> List[Dict]:
+        store = self.users.get(user_id)
+        if store is None:
+            return []
+            
+        base = self.compacted_upto.get(user_id, 0)
+        total = base + len(store.timestamps)
+        return [self._get_message(user_id, n) for n in range(total - 1, max(total - limit, base) - 1, -1)]
+            
+    def _get_message(self, user_id: str, seq: int) -> Optional[Dict]:
+        store = self.users.get(user_id)
+        # Column index n holds message seq compacted_upto + n
+        n = seq - self.compacted_upto.get(user_id, 0)
+        if store is None or not 0 <= n < len(store.timestamps):
+            return None
+            
+        return {
+            "id": f"msg-{user_id}-{seq}",
+            "content": store.content(n),
+            "role": self.role_names[store.roles[n]],
+            "timestamp": iso_timestamp(store.timestamps[n])
+        }
+        
+    def _drop_messages(self, user_id: str, start: int, end: int):
+        store = self.users[user_id]
+        n = end - start
+        cut = store.offsets[n] if n < len(store.offsets) else len(store.arena)
+        del store.timestamps[:n]
+        del store.roles[:n]
+        del store.arena[:cut]
+        offsets = array("Q")
+        offsets.frombytes((np.frombuffer(store.offsets, dtype=np.uint64)[n:] - np.uint64(cut)).tobytes())
+        store.offsets = offsets
+        
+    def _update_preference(self, user_id: str, pref_id: str, keyword: str, timestamp: float) -> Optional[float]:
+        store = self.users.get(user_id)
+        record = store.preferences.get(keyword) if store else None
+        if record is None:
+            return None
+            
+        record.count += 1
+        record.weight = min(1.0, record.count * 0.1)
+        record.last_seen = timestamp
+        return record.weight
+        
+    def _store_preference(self, user_id: str, pref_id: str, keyword: str, weight: float, timestamp: float):
+        if user_id not in self.users:
+            self._apply_user(user_id, timestamp)
+        self.users[user_id].preferences[keyword] = _PreferenceRecord(keyword, weight, timestamp)
+        
+    def _list_preferences(self, user_id: str) -> List[Dict]:
+        store = self.users.get(user_id)
+        if store is None:
+            return []
+            
+        return [self._preference_dict(user_id, record) for record in store.preferences.values()]
+        
+    def _get_preference(self, user_id: str, keyword: str) -> Dict:
+        return self._preference_dict(user_id, self.users[user_id].preferences[keyword])
+        
+    def _preference_dict(self, user_id: str, record: _PreferenceRecord) -> Dict:
+        return {
+            "id": f"pref-{user_id}-{record.keyword.replace(' ', '_')}",
+            "keyword": record.keyword,
+            "weight": record.weight,
+            "count": record.count,
+            "last_seen": iso_timestamp(record.last_seen)
+        }
+        
+    def _pack_storage(self, state: Dict[str, Any]):
+        # The per-user arrays already pickle compactly
+        pass
+        
+    def _unpack_storage(self):
+        pass
+        
+    def _export_user_storage(self, user_id: str) -> _UserStore:
+        return self.users.pop(user_id)
+        
+    def _import_user_storage(self, user_id: str, storage: _UserStore):
+        self.users[user_id] = storage
+        
+    def _estimate_storage_bytes(self, user_id: str) -> int:
+        store = self.users.get(user_id)
+        if store is None:
+            return 0
+        return len(store.arena) + 17 * len(store.timestamps) + 200 * len(store.preferences) + 400
+        
+    def _compute_graph_stats(self, user_id: str) -> Dict:
+        store = self.users.get(user_id)
+        messages = len(store.timestamps) if store else 0
+        preferences = len(store.preferences) if store else 0
+        
+        return {
+            "total_nodes": (1 if store else 0) + messages + preferences,
+            "total_edges": messages + preferences,
+            "message_count": self.user_message_counts.get(user_id, 0)
+        }
\ No newline at end of file
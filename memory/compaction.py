@@ -0,0 +1,148 @@
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, Iterable, List, Tuple
+import re
+import sqlite3
+import threading
+from memory.keyword_extractor import count_terms
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+class ConversationDigest:
+    """Extractive summary of a run of compacted messages (first_seq..last_seq).
+    
+    Keeps the most mentioned keywords of the user's messages and the user
+    sentences that best cover them. Only user messages are quoted; the
+    assistant's replies are counted but can be regenerated from context.
+    """
+    __slots__ = ("first_seq", "last_seq", "start", "end", "message_count", "keywords", "sentences")
+    
+    MAX_KEYWORDS = 16
+    MAX_SENTENCES = 3
+    
+    def __init__(self, first_seq: int, last_seq: int, start: str, end: str, message_count: int,
+                 keywords: Dict[str, int], sentences: List[Tuple[float, str]]):
+        self.first_seq = first_seq
+        self.last_seq = last_seq
+        self.start = start
+        self.end = end
+        self.message_count = message_count
+        self.keywords = keywords
+        self.sentences = sentences
+        
+    @property
+    def content(self) -> str:
+        parts = [f"Earlier conversation ({self.message_count} messages, {self.start[:10]} to {self.end[:10]})."]
+        if self.keywords:
+            parts.append("Topics: " + ", ".join(list(self.keywords)[:8]) + ".")
+        if self.sentences:
+            parts.append("User said: " + " ".join(f'"{sentence}"' for _, sentence in self.sentences))
+        return " ".join(parts)
+        
+    def merge(self, newer: "ConversationDigest") -> "ConversationDigest":
+        keywords = Counter(self.keywords)
+        keywords.update(newer.keywords)
+        return ConversationDigest(
+            self.first_seq, newer.last_seq, self.start, newer.end, self.message_count + newer.message_count,
+            dict(keywords.most_common(self.MAX_KEYWORDS)),
+            _top_sentences(self.sentences + newer.sentences)
+        )
+        
+    def relevance(self, keywords: List[str]) -> int:
+        return sum(self.keywords.get(keyword, 0) for keyword in keywords)
+        
+    def estimate_bytes(self) -> int:
+        return 200 + 80 * len(self.keywords) + sum(100 + len(sentence) for _, sentence in self.sentences)
+
+def build_digest(first_seq: int, messages: List[Dict], max_sentence_chars: int = 200) -> ConversationDigest:
+    """Digest of consecutive messages starting at first_seq (dicts as _get_message returns them).
+    
+    Sentences score the summed chunk-wide counts of their terms, divided by
+    the square root of their term count so long sentences do not win by
+    length alone; a message sent several times (repeat_count) weighs more.
+    """
+    term_counts = Counter()
+    candidates = []
+    for message in messages:
+        if message["role"] != "user":
+            continue
+        repeats = message.get("repeat_count", 1)
+        for sentence in _SENTENCE_BOUNDARY.split(message["content"].strip()):
+            terms = count_terms(sentence)
+            if terms:
+                for term, count in terms.items():
+                    term_counts[term] += count * repeats
+                candidates.append((terms, repeats, sentence[:max_sentence_chars]))
+                
+    return ConversationDigest(
+        first_seq, first_seq + len(messages) - 1, messages[0]["timestamp"], messages[-1]["timestamp"], len(messages),
+        dict(term_counts.most_common(ConversationDigest.MAX_KEYWORDS)),
+        _top_sentences(
+            (repeats * sum(term_counts[term] for term in terms) / len(terms) ** 0.5, sentence)
+            for terms, repeats, sentence in candidates
+        )
+    )
+
+def _top_sentences(scored: Iterable[Tuple[float, str]]) -> List[Tuple[float, str]]:
+    """The best-scoring distinct sentences, best first"""
+    best = {}
+    for score, sentence in scored:
+        best[sentence] = max(score, best.get(sentence, 0.0))
+    return nlargest(ConversationDigest.MAX_SENTENCES, ((score, sentence) for sentence, score in best.items()))
+
+class MessageArchive:
+    """SQLite table of raw messages removed from memory by compaction.
+    
+    Unlike ColdUserStore this is the only remaining copy of those
+    messages, so it persists across restarts. It runs in WAL mode with
+    synchronous=NORMAL: a crash can lose the last few archived batches
+    but never corrupts the table.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS archived_messages (user_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+            "timestamp TEXT NOT NULL, content TEXT NOT NULL, repeat_count INTEGER NOT NULL, PRIMARY KEY (user_id, seq))"
+        )
+        self.conn.commit()
+        # Kept up to date by put_many, so count() (read on every /metrics scrape) never scans the table
+        self.rows = self.conn.execute("SELECT COUNT(*) FROM archived_messages").fetchone()[0]
+        
+    def put_many(self, user_id: str, first_seq: int, messages: List[Dict]):
+        rows = [
+            (user_id, first_seq + i, message["role"], message["timestamp"], message["content"], message.get("repeat_count", 1))
+            for i, message in enumerate(messages)
+        ]
+        with self.lock:
+            # Replaying a journaled compaction archives the same rows again
+            replaced = self.conn.execute(
+                "SELECT COUNT(*) FROM archived_messages WHERE user_id = ? AND seq BETWEEN ? AND ?",
+                (user_id, first_seq, first_seq + len(rows) - 1)
+            ).fetchone()[0]
+            self.conn.executemany("INSERT OR REPLACE INTO archived_messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+            self.rows += len(rows) - replaced
+            
+    def get_messages(self, user_id: str, first_seq: int, last_seq: int) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, role, timestamp, content, repeat_count FROM archived_messages "
+                "WHERE user_id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+                (user_id, first_seq, last_seq)
+            ).fetchall()
+        return [
+            {"id": f"msg-{user_id}-{seq}", "content": content, "role": role, "timestamp": timestamp, "repeat_count": repeat_count}
+            for seq, role, timestamp, content, repeat_count in rows
+        ]
+        
+    def count(self) -> int:
+        return self.rows
+            
+    def close(self):
+        with self.lock:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,146 @@
+from array import array
+from itertools import combinations
+from typing import Container, Dict, List, Optional, Tuple
+import numpy as np
+
+class CooccurrenceGraph:
+    """Weighted keyword co-occurrence graph for one user.
+    
+    Every pair of keywords mentioned in the same message gets its edge
+    weight bumped by one. Ranking runs personalized PageRank over a CSR
+    transition matrix that is rebuilt only when the graph version changes;
+    score vectors are memoized per seed set until the next change.
+    """
+    __slots__ = ("index", "keywords", "edges", "sources", "targets", "weights", "version",
+                 "_csr", "_csr_version", "_rankings")
+                 
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.keywords: List[str] = []
+        # (a, b) -> slot in the parallel sources/targets/weights arrays, which
+        # the matrix build reads without copying
+        self.edges: Dict[Tuple[int, int], int] = {}
+        self.sources = array("I")
+        self.targets = array("I")
+        self.weights = array("f")
+        self.version = 0
+        self._csr = None
+        self._csr_version = -1
+        self._rankings: Dict[frozenset, np.ndarray] = {}
+        
+    def add(self, keywords: List[str]):
+        keywords = list(dict.fromkeys(keywords))
+        if len(keywords) < 2:
+            return
+            
+        nodes = []
+        for keyword in keywords:
+            node = self.index.get(keyword)
+            if node is None:
+                node = self.index[keyword] = len(self.keywords)
+                self.keywords.append(keyword)
+            nodes.append(node)
+            
+        for pair in combinations(sorted(nodes), 2):
+            slot = self.edges.get(pair)
+            if slot is None:
+                self.edges[pair] = len(self.weights)
+                self.sources.append(pair[0])
+                self.targets.append(pair[1])
+                self.weights.append(1.0)
+            else:
+                self.weights[slot] += 1.0
+        self.version += 1
+        
+    def _transition_matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Column-stochastic transition matrix as CSR (indptr, indices, data) arrays"""
+        if self._csr_version == self.version:
+            return self._csr
+            
+        n_nodes = len(self.keywords)
+        # Zero-copy views; they must not outlive this call, since an exported
+        # array cannot grow.
+        sources = np.frombuffer(self.sources, dtype=np.uintc)
+        targets = np.frombuffer(self.targets, dtype=np.uintc)
+        weights = np.frombuffer(self.weights, dtype=np.float32)
+        # Undirected: store each edge in both directions
+        rows = np.concatenate([sources, targets]).astype(np.intp)
+        cols = np.concatenate([targets, sources]).astype(np.intp)
+        data = np.concatenate([weights, weights])
+        
+        out_degree = np.bincount(cols, weights=data, minlength=n_nodes).astype(np.float32)
+        data /= out_degree[cols]
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+        
+        self._csr = (indptr, cols[order], data[order])
+        self._csr_version = self.version
+        self._rankings.clear()
+        return self._csr
+        
+    def scores(self, seeds: List[str], alpha: float = 0.85, iterations: int = 20, tol: float = 1e-4) -> Optional[np.ndarray]:
+        """Personalized PageRank of every keyword node, restarting at the seed keywords"""
+        seed_nodes = frozenset(self.index[seed] for seed in seeds if seed in self.index)
+        if not seed_nodes:
+            return None
+            
+        indptr, indices, data = self._transition_matrix()
+        cached = self._rankings.get(seed_nodes)
+        if cached is not None:
+            return cached
+            
+        # Every node has at least one edge (add() only creates nodes in pairs),
+        # so no CSR row is empty and reduceat over indptr is a valid mat-vec.
+        row_starts = indptr[:-1]
+        teleport = np.zeros(len(self.keywords), dtype=np.float32)
+        teleport[list(seed_nodes)] = 1.0 / len(seed_nodes)
+        scores = teleport.copy()
+        for _ in range(iterations):
+            updated = (1 - alpha) * teleport + alpha * np.add.reduceat(data * scores[indices], row_starts)
+            converged = np.abs(updated - scores).sum() < tol
+            scores = updated
+            if converged:
+                break
+                
+        if len(self._rankings) >= 64:
+            self._rankings.clear()
+        self._rankings[seed_nodes] = scores
+        return scores
+        
+    def rank(self, seeds: List[str], k: int, accept: Optional[Container[str]] = None) -> List[Tuple[str, float]]:
+        """Up to k (keyword, score) pairs by personalized PageRank from the seeds, best first"""
+        scores = self.scores(seeds)
+        if scores is None or k <= 0:
+            return []
+            
+        ranked = []
+        for node in np.argsort(-scores, kind="stable"):
+            score = float(scores[node])
+            if score <= 0:
+                break
+            keyword = self.keywords[node]
+            if accept is None or keyword in accept:
+                ranked.append((keyword, score))
+                if len(ranked) == k:
+                    break
+        return ranked
+        
+    def estimate_bytes(self) -> int:
+        return len(self.keywords) * 120 + len(self.edges) * 110
+        
+    def __getstate__(self):
+        return {"index": self.index, "keywords": self.keywords, "edges": self.edges, "sources": self.sources,
+                "targets": self.targets, "weights": self.weights, "version": self.version}
+                
+    def __setstate__(self, state):
+        self.index = state["index"]
+        self.keywords = state["keywords"]
+        self.edges = state["edges"]
+        self.sources = state["sources"]
+        self.targets = state["targets"]
+        self.weights = state["weights"]
+        self.version = state["version"]
+        self._csr = None
+        self._csr_version = -1
+        self._rankings = {}
\ No newline at end of file
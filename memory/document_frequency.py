@@ -0,0 +1,34 @@
+from typing import Any, Dict, List
+import math
+from memory.keyword_sketch import KeywordSketch
+
+class DocumentFrequency:
+    """Global count of how many messages (across all users) mention each keyword.
+    
+    Counts live in a KeywordSketch, so memory stays fixed however large
+    the vocabulary grows. The sketch can only overcount, which makes idf()
+    err towards calling a keyword common.
+    """
+    
+    def __init__(self, width: int = 65536, depth: int = 4, capacity: int = 64, min_documents: int = 1000):
+        self.sketch = KeywordSketch(width, depth, capacity)
+        self.documents = 0
+        self.min_documents = min_documents
+        
+    def add(self, keywords: List[str]):
+        self.documents += 1
+        self.sketch.update(dict.fromkeys(keywords))
+        
+    def idf(self, keyword: str) -> float:
+        return math.log((self.documents + 1) / (self.sketch[keyword] + 1))
+        
+    def is_common(self, keyword: str, min_idf: float) -> bool:
+        """True once enough messages are seen and the keyword's idf is below min_idf"""
+        return self.documents >= self.min_documents and self.idf(keyword) < min_idf
+        
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "most_common": [keyword for keyword, _ in self.sketch.most_common(10)],
+            "bytes": self.sketch.nbytes
+        }
\ No newline at end of file
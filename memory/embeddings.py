@@ -0,0 +1,179 @@
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import re
+import numpy as np
+
+# Anything but letters, of any script
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+class HashingEmbedder:
+    """Local text embeddings from signed, hashed character trigrams.
+    
+    Trigrams are over the letters of any script, lowercased; everything
+    else separates words.
+    
+    Uses a fixed multiplicative hash rather than Python's salted hash() so
+    vectors stay comparable across restarts and snapshots.
+    """
+    
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        
+    def embed(self, text: str) -> np.ndarray:
+        normalized = " " + _NON_LETTERS.sub(" ", text.lower()).strip() + " "
+        data = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if len(data) < 3:
+            return vector
+            
+        # Code points fit in 21 bits, so a trigram packs into one 64-bit word
+        codes = (data[:-2] << np.uint64(42)) | (data[1:-1] << np.uint64(21)) | data[2:]
+        hashed = codes * np.uint64(0x9E3779B97F4A7C15)
+        buckets = (hashed >> np.uint64(40)) % np.uint64(self.dim)
+        signs = np.where(hashed & np.uint64(1 << 39), 1.0, -1.0)
+        vector += np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+        
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+@lru_cache(maxsize=8)
+def _hyperplanes(dim: int, n_tables: int, n_bits: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+
+class HyperplaneLSH:
+    """Random-hyperplane LSH over cosine similarity (n_tables tables of n_bits each)"""
+    __slots__ = ("dim", "n_tables", "n_bits", "seed", "buckets")
+    
+    def __init__(self, dim: int, n_tables: int = 24, n_bits: int = 14, seed: int = 0):
+        self.dim = dim
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.seed = seed
+        self.buckets: List[Dict[int, array]] = [{} for _ in range(n_tables)]
+        
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        planes = _hyperplanes(self.dim, self.n_tables, self.n_bits, self.seed)
+        bits = (vectors @ planes.T > 0).reshape(len(vectors), self.n_tables, self.n_bits)
+        return bits @ (1 << np.arange(self.n_bits, dtype=np.int64))
+        
+    def add(self, slots: np.ndarray, vectors: np.ndarray):
+        for slot, signature in zip(slots.tolist(), self._signatures(vectors).tolist()):
+            for table, key in zip(self.buckets, signature):
+                bucket = table.get(key)
+                if bucket is None:
+                    bucket = table[key] = array("I")
+                bucket.append(slot)
+                
+    def candidates(self, vector: np.ndarray) -> np.ndarray:
+        signature = self._signatures(vector[None, :])[0].tolist()
+        hits = [np.frombuffer(table[key], dtype=np.uintc) for table, key in zip(self.buckets, signature) if key in table]
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(hits)).astype(np.intp)
+
+class EmbeddingStore:
+    """One user's message embeddings in a preallocated, growable float32 matrix.
+    
+    Exact search is a single matrix-vector product plus argpartition. Once
+    the store holds lsh_min_vectors rows (0 disables), an LSH index narrows
+    the product to bucket candidates; it falls back to exact search when
+    the buckets yield fewer than k candidates.
+    """
+    __slots__ = ("dim", "matrix", "seqs", "size", "lsh_min_vectors", "lsh")
+    
+    def __init__(self, dim: int, capacity: int = 64, lsh_min_vectors: int = 0):
+        self.dim = dim
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.seqs = array("I")
+        self.size = 0
+        self.lsh_min_vectors = lsh_min_vectors
+        self.lsh: Optional[HyperplaneLSH] = None
+        
+    def add(self, seq: int, vector: np.ndarray):
+        if self.size == len(self.matrix):
+            grown = np.zeros((len(self.matrix) * 2, self.dim), dtype=np.float32)
+            grown[:self.size] = self.matrix[:self.size]
+            self.matrix = grown
+            
+        slot = self.size
+        self.matrix[slot] = vector
+        self.seqs.append(seq)
+        self.size += 1
+        
+        if self.lsh is not None:
+            self.lsh.add(np.array([slot]), self.matrix[slot:slot + 1])
+        elif self.lsh_min_vectors and self.size >= self.lsh_min_vectors:
+            self.lsh = HyperplaneLSH(self.dim)
+            self.lsh.add(np.arange(self.size), self.matrix[:self.size])
+            
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Return up to k (message seq, cosine similarity) pairs, best first"""
+        if not self.size or k <= 0:
+            return []
+            
+        # A float64 query would upcast the whole matrix product
+        vector = np.asarray(vector, dtype=np.float32)
+        slots = self.lsh.candidates(vector) if self.lsh is not None else None
+        if slots is not None and len(slots) >= k:
+            scores = self.matrix[slots] @ vector
+        else:
+            slots = None
+            scores = self.matrix[:self.size] @ vector
+            
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if slots is not None:
+            return [(self.seqs[slots[i]], float(scores[i])) for i in top if scores[i] > 0]
+        return [(self.seqs[i], float(scores[i])) for i in top if scores[i] > 0]
+        
+    def drop_before(self, seq: int):
+        """Remove the embeddings of messages with a sequence number below seq"""
+        n_drop = bisect_left(self.seqs, seq)
+        if not n_drop:
+            return
+            
+        self.size -= n_drop
+        capacity = len(self.matrix)
+        while capacity > 64 and capacity >= 4 * self.size:
+            capacity //= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self.size] = self.matrix[n_drop:n_drop + self.size]
+        self.matrix = matrix
+        del self.seqs[:n_drop]
+        # LSH buckets hold slots, which just shifted
+        self._rebuild_lsh()
+        
+    def set_lsh_min_vectors(self, lsh_min_vectors: int):
+        self.lsh_min_vectors = lsh_min_vectors
+        self._rebuild_lsh()
+        
+    def _rebuild_lsh(self):
+        self.lsh = None
+        if self.lsh_min_vectors and self.size >= self.lsh_min_vectors:
+            self.lsh = HyperplaneLSH(self.dim)
+            self.lsh.add(np.arange(self.size), self.matrix[:self.size])
+            
+    def __len__(self) -> int:
+        return self.size
+        
+    def __getstate__(self):
+        # Pickle only the filled rows, not the spare capacity
+        return {"dim": self.dim, "matrix": self.matrix[:self.size].copy(), "seqs": self.seqs,
+                "lsh_min_vectors": self.lsh_min_vectors, "lsh": self.lsh}
+                
+    def __setstate__(self, state):
+        self.dim = state["dim"]
+        self.seqs = state["seqs"]
+        self.size = len(self.seqs)
+        self.matrix = np.zeros((max(64, self.size), self.dim), dtype=np.float32)
+        self.matrix[:self.size] = state["matrix"]
+        self.lsh_min_vectors = state["lsh_min_vectors"]
+        self.lsh = state["lsh"]
\ No newline at end of file
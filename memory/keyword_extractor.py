@@ -1,11 +1,18 @@
 from collections import Counter
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from heapq import nlargest
+from typing import List, Dict, Iterable, Optional, Union
 import re
 import structlog
+from memory.keyword_sketch import KeywordSketch
+from memory.document_frequency import DocumentFrequency
 
 logger = structlog.get_logger()
 
-STOP_WORDS = {
+OP_KEYWORDS_TRACKED = 4
+PREFERENCE_THRESHOLD = 3
+
+STOP_WORDS = frozenset({
     'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
     'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during',
     'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
@@ -15,60 +22,159 @@ STOP_WORDS = {
     'where', 'why', 'how', 'all', 'many', 'some', 'much', 'most', 'other',
     'another', 'such', 'no', 'not', 'only', 'own', 'same', 'so', 'than',
     'too', 'very', 'just', 'my', 'your', 'our', 'his', 'her', 'its'
-}
+})
 
-class KeywordExtractor:
-    def __init__(self):
-        self.user_keyword_history = {}
+_WORD_PATTERN = re.compile(r'\b[a-z]+\b')
+
+def tokenize(text: str, min_length: int = 3) -> List[str]:
+    """The unigram terms extract_keywords considers, in message order (duplicates kept)"""
+    return [
+        word for word in _WORD_PATTERN.findall(text.lower())
+        if len(word) >= min_length and word not in STOP_WORDS
+    ]
+
+def count_terms(text: str, min_length: int = 3) -> Dict[str, int]:
+    """Mention counts of every unigram (>= min_length) and bigram term in one pass.
+    
+    Unigrams come first, then bigrams, each in first-seen order.
+    """
+    unigrams = {}
+    bigrams = {}
+    previous = None
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if word in STOP_WORDS:
+            previous = None
+            continue
+        if len(word) >= min_length:
+            unigrams[word] = unigrams.get(word, 0) + 1
+        if previous is not None:
+            bigram = previous + " " + word
+            bigrams[bigram] = bigrams.get(bigram, 0) + 1
+        previous = word
         
-    def extract_keywords(self, text: str, min_length: int = 3) -> List[str]:
-        text_lower = text.lower()
+    return {**unigrams, **bigrams}
+
+def extract_keywords(text: str, min_length: int = 3, limit: int = 10) -> List[str]:
+    """Top unigram and bigram terms of one text, most frequent first.
+    
+    Ties keep count_terms order, as Counter(unigrams + bigrams).most_common()
+    would.
+    """
+    counts = count_terms(text, min_length)
+    if len(counts) <= limit:
+        return sorted(counts, key=counts.__getitem__, reverse=True)
+    return nlargest(limit, counts, key=counts.__getitem__)
+
+def _extract_keywords_chunk(texts: List[str], min_length: int) -> List[List[str]]:
+    return [extract_keywords(text, min_length) for text in texts]
+
+class KeywordExtractor:
+    def __init__(self, tracker: str = "exact", sketch_width: int = 4096, sketch_depth: int = 4, sketch_capacity: int = 256,
+                 document_frequency: Optional[DocumentFrequency] = None):
+        """tracker "exact" keeps a Counter per user; "sketch" keeps a fixed-size KeywordSketch.
         
-        words = re.findall(r'\b[a-z]+\b', text_lower)
+        document_frequency, if given, is fed every tracked message's keywords.
+        """
+        if tracker not in ("exact", "sketch"):
+            raise ValueError(f"Unknown keyword tracker: {tracker}")
+        self.tracker = tracker
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.sketch_capacity = sketch_capacity
+        self.user_keyword_history: Dict[str, Union[Counter, KeywordSketch]] = {}
+        self.document_frequency = document_frequency
+        self.journal = None
         
-        filtered_words = [
-            word for word in words 
-            if len(word) >= min_length and word not in STOP_WORDS
-        ]
+    def _new_history(self) -> Union[Counter, KeywordSketch]:
+        if self.tracker == "sketch":
+            return KeywordSketch(self.sketch_width, self.sketch_depth, self.sketch_capacity)
+        return Counter()
         
-        bigrams = []
-        for i in range(len(words) - 1):
-            if words[i] not in STOP_WORDS and words[i+1] not in STOP_WORDS:
-                bigram = f"{words[i]} {words[i+1]}"
-                bigrams.append(bigram)
+    def extract_keywords(self, text: str, min_length: int = 3) -> List[str]:
+        keywords = extract_keywords(text, min_length)
         
-        all_terms = filtered_words + bigrams
+        logger.debug("keywords_extracted", keywords=keywords[:5])
         
-        term_counts = Counter(all_terms)
+        return keywords
         
-        keywords = [term for term, count in term_counts.most_common(10)]
+    def extract_keywords_batch(self, texts: Iterable[str], min_length: int = 3, processes: int = 0,
+                               chunk_size: int = 1000) -> List[List[str]]:
+        """extract_keywords for many texts (backfills, bulk imports).
         
-        logger.debug("keywords_extracted", keywords=keywords[:5])
+        With processes > 1 the texts are split into chunks and fanned out to
+        a process pool; that only pays off for large batches.
+        """
+        texts = list(texts)
+        if processes <= 1 or len(texts) <= chunk_size:
+            return _extract_keywords_chunk(texts, min_length)
+            
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = pool.map(_extract_keywords_chunk, chunks, [min_length] * len(chunks))
+            return [keywords for chunk in results for keywords in chunk]
         
-        return keywords
+    def track_user_keywords(self, user_id: str, message: str, keywords: Optional[List[str]] = None,
+                            threshold: int = PREFERENCE_THRESHOLD) -> Dict[str, int]:
+        """Count the message's keywords and return those of them at or above threshold.
         
-    def track_user_keywords(self, user_id: str, message: str) -> Dict[str, int]:
-        keywords = self.extract_keywords(message)
+        Only this message's keywords are examined, so the result is the set of
+        preferences the message creates or strengthens, never stale terms.
+        """
+        if keywords is None:
+            keywords = self.extract_keywords(message)
         
-        if user_id not in self.user_keyword_history:
-            self.user_keyword_history[user_id] = Counter()
+        history = self.user_keyword_history.get(user_id)
+        if history is None:
+            history = self.user_keyword_history[user_id] = self._new_history()
             
-        self.user_keyword_history[user_id].update(keywords)
+        history.update(keywords)
+        if self.document_frequency is not None and keywords:
+            self.document_frequency.add(keywords)
+        if self.journal and keywords:
+            self.journal.append(OP_KEYWORDS_TRACKED, user_id, "\n".join(keywords))
         
-        keywords_with_3_plus = {
-            keyword: count 
-            for keyword, count in self.user_keyword_history[user_id].items()
-            if count >= 3
-        }
+        changed = {}
+        crossed = []
+        for keyword in dict.fromkeys(keywords):
+            count = history[keyword]
+            if count >= threshold:
+                changed[keyword] = count
+                if count - keywords.count(keyword) < threshold:
+                    crossed.append(keyword)
         
-        if keywords_with_3_plus:
+        if crossed:
             logger.info(
                 "keywords_threshold_reached",
                 user_id=user_id,
-                keywords=list(keywords_with_3_plus.keys())[:5]
+                keywords=crossed[:5]
             )
             
-        return keywords_with_3_plus
+        return changed
+        
+    def apply_journal_record(self, op: int, fields: tuple) -> bool:
+        if op != OP_KEYWORDS_TRACKED:
+            return False
+            
+        user_id, keywords = fields
+        if user_id not in self.user_keyword_history:
+            self.user_keyword_history[user_id] = self._new_history()
+        self.user_keyword_history[user_id].update(keywords.split("\n"))
+        if self.document_frequency is not None:
+            self.document_frequency.add(keywords.split("\n"))
+        return True
+        
+    def export_user(self, user_id: str) -> Optional[Union[Counter, KeywordSketch]]:
+        return self.user_keyword_history.pop(user_id, None)
+        
+    def import_user(self, user_id: str, history: Optional[Union[Counter, KeywordSketch]]):
+        if history is not None:
+            self.user_keyword_history[user_id] = history
+            
+    def estimate_user_bytes(self, user_id: str) -> int:
+        history = self.user_keyword_history.get(user_id)
+        if isinstance(history, KeywordSketch):
+            return history.nbytes
+        return len(history or ()) * 120
         
     def get_user_top_keywords(self, user_id: str, limit: int = 10) -> List[tuple]:
         if user_id not in self.user_keyword_history:
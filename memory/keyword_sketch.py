@@ -0,0 +1,120 @@
+from array import array
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Tuple
+import heapq
+import math
+
+class KeywordSketch:
+    """Fixed-size, Counter-compatible keyword frequency tracker.
+    
+    Combines a Count-Min sketch (depth rows x width counters, conservative
+    update) with a Space-Saving summary of the top `capacity` keywords.
+    With N keyword mentions tracked so far:
+    
+    - Estimates never undercount. A Count-Min estimate exceeds the true
+      count by at most (e / width) * N with probability 1 - exp(-depth).
+    - Any keyword mentioned more than `floor` times is guaranteed to be in
+      the Space-Saving summary, and its summary count overcounts by at most
+      floor. floor is the largest count evicted from the summary so far, an
+      upper bound for every keyword outside it; keywords enter the summary
+      at min(floor + 1, sketch estimate), which keeps floor far below the
+      N / capacity of plain Space-Saving on skewed traffic.
+      
+    An estimate is the smaller of the two, so both bounds hold. Memory is
+    fixed: 4 * width * depth bytes for the sketch plus ~120 bytes per
+    summary slot, however many distinct keywords the user produces.
+    Overcounting matters most for rare keywords near a small threshold
+    (the 3-mention preference rule): widen the sketch as users' keyword
+    volume grows.
+    """
+    __slots__ = ("width", "depth", "capacity", "table", "total", "monitored", "heap", "floor")
+    
+    def __init__(self, width: int = 4096, depth: int = 4, capacity: int = 256):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = array("I", bytes(4 * width * depth))
+        self.total = 0
+        self.floor = 0
+        self.monitored: Dict[str, int] = {}
+        # Lazy min-heap over monitored counts; stale entries are skipped on pop
+        self.heap: List[Tuple[int, str]] = []
+        
+    def _slots(self, keyword: str) -> List[int]:
+        # Fixed, unsalted hash so a pickled sketch reads the same after a restart
+        digest = blake2b(keyword.encode("utf-8"), digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], "little")
+        h2 = int.from_bytes(digest[4:], "little") | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+        
+    def _sketch_add(self, keyword: str) -> int:
+        table = self.table
+        slots = self._slots(keyword)
+        estimate = min(table[slot] for slot in slots) + 1
+        for slot in slots:
+            if table[slot] < estimate:
+                table[slot] = estimate
+        return estimate
+        
+    def _sketch_estimate(self, keyword: str) -> int:
+        table = self.table
+        return min(table[slot] for slot in self._slots(keyword))
+        
+    def update(self, keywords: Iterable[str]):
+        monitored = self.monitored
+        for keyword in keywords:
+            self.total += 1
+            estimate = self._sketch_add(keyword)
+            count = monitored.get(keyword)
+            if count is not None:
+                count += 1
+            elif len(monitored) < self.capacity:
+                count = 1
+            else:
+                # The floor only rises: capping by the estimate can evict a count below
+                # what an earlier evicted keyword may have, and that one may come back
+                self.floor = max(self.floor, self._evict_min())
+                count = min(self.floor + 1, estimate)
+            monitored[keyword] = count
+            heapq.heappush(self.heap, (count, keyword))
+            
+        if len(self.heap) > 4 * self.capacity + 64:
+            self.heap = [(count, keyword) for keyword, count in monitored.items()]
+            heapq.heapify(self.heap)
+            
+    def _evict_min(self) -> int:
+        heap = self.heap
+        monitored = self.monitored
+        while True:
+            count, keyword = heapq.heappop(heap)
+            if monitored.get(keyword) == count:
+                del monitored[keyword]
+                return count
+                
+    def __getitem__(self, keyword: str) -> int:
+        estimate = self._sketch_estimate(keyword)
+        count = self.monitored.get(keyword)
+        return estimate if count is None else min(count, estimate)
+        
+    def most_common(self, n: int = None) -> List[Tuple[str, int]]:
+        table = self.table
+        items = [
+            (keyword, min(count, min(table[slot] for slot in self._slots(keyword))))
+            for keyword, count in self.monitored.items()
+        ]
+        if n is None:
+            return sorted(items, key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(n, items, key=lambda item: item[1])
+        
+    def __len__(self) -> int:
+        return len(self.monitored)
+        
+    @property
+    def nbytes(self) -> int:
+        return len(self.table) * 4 + self.capacity * 120
+        
+    @staticmethod
+    def dimensions(epsilon: float, delta: float) -> Tuple[int, int]:
+        """(width, depth) giving estimates within epsilon * N with probability 1 - delta"""
+        return math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta))
\ No newline at end of file
@@ -0,0 +1,106 @@
+from array import array
+from bisect import bisect_left
+from typing import Optional
+import re
+import numpy as np
+
+# Letters and digits of any script; punctuation, symbols and emoji separate words
+_NON_WORD = re.compile(r"[\W_]+")
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over the character trigrams of the normalized text.
+        
+    None if the text has fewer than 3 trigrams (too short, or no letters or
+    digits): such messages get no signature and are never folded.
+    """
+    normalized = " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+    data = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(data) < 5:
+        return None
+        
+    # Code points fit in 21 bits, so a trigram packs into one 64-bit word;
+    # the splitmix64 finalizer then makes every output bit depend on every input bit
+    z = (data[:-2] << np.uint64(42)) | (data[1:-1] << np.uint64(21)) | data[2:]
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    
+    # Per-bit vote: count the set bits of each position over all trigrams
+    ones = np.unpackbits(z.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").sum(axis=0, dtype=np.int64)
+    bits = np.packbits(2 * ones > len(z), bitorder="little")
+    return int.from_bytes(bits.tobytes(), "little")
+
+class SimHashIndex:
+    """SimHash signatures of one user's messages in one role, with a 4-band LSH index.
+    
+    Signatures are split into four 16-bit bands; two signatures within
+    Hamming distance 3 must agree on at least one band, so find() with
+    max_distance <= 3 only compares against messages sharing a band.
+    Each band bucket is scanned newest first and at most max_probes deep,
+    which bounds lookup time even when many messages collide on a band.
+    Slots count from the first signature ever added; signatures and seqs
+    start at slot `base` once older messages are dropped.
+    """
+    __slots__ = ("signatures", "seqs", "bands", "base")
+    
+    def __init__(self):
+        self.signatures = array("Q")
+        self.seqs = array("I")
+        self.bands: tuple = ({}, {}, {}, {})
+        self.base = 0
+        
+    def add(self, seq: int, signature: int):
+        slot = self.base + len(self.seqs)
+        self.signatures.append(signature)
+        self.seqs.append(seq)
+        for band, table in enumerate(self.bands):
+            key = (signature >> (16 * band)) & 0xFFFF
+            bucket = table.get(key)
+            if bucket is None:
+                bucket = table[key] = array("I")
+            bucket.append(slot)
+            
+    def find(self, signature: int, max_distance: int = 3, max_probes: int = 256) -> Optional[int]:
+        """Seq of the most recent message within max_distance bits of signature, if any"""
+        signatures = self.signatures
+        base = self.base
+        best = -1
+        for band, table in enumerate(self.bands):
+            bucket = table.get((signature >> (16 * band)) & 0xFFFF)
+            if bucket is None:
+                continue
+            for probes, slot in enumerate(reversed(bucket)):
+                if slot <= best or probes == max_probes:
+                    break
+                if (signatures[slot - base] ^ signature).bit_count() <= max_distance:
+                    best = slot
+                    break
+        return self.seqs[best - base] if best >= 0 else None
+        
+    def drop_before(self, seq: int):
+        """Forget the signatures of messages with a sequence number below seq.
+        
+        Only the band buckets of the dropped signatures are trimmed.
+        """
+        n_drop = bisect_left(self.seqs, seq)
+        if not n_drop:
+            return
+            
+        dropped = self.signatures[:n_drop]
+        del self.signatures[:n_drop]
+        del self.seqs[:n_drop]
+        self.base += n_drop
+        for band, table in enumerate(self.bands):
+            for key in {(signature >> (16 * band)) & 0xFFFF for signature in dropped}:
+                bucket = table[key]
+                keep = bisect_left(bucket, self.base)
+                if keep == len(bucket):
+                    del table[key]
+                else:
+                    del bucket[:keep]
+        
+    def __len__(self) -> int:
+        return len(self.seqs)
+        
+    def estimate_bytes(self) -> int:
+        return len(self.seqs) * 28
\ No newline at end of file
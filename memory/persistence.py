@@ -0,0 +1,458 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import gc
+import glob
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import traceback
+import zlib
+import structlog
+from memory.user_tiering import ColdUserStore, import_user_state
+
+logger = structlog.get_logger()
+
+OP_CONFIG_CHANGED = 5
+
+# Record layout: <payload length u32><crc32 of payload u32><payload>,
+# payload = <op u8> followed by tagged fields (b"s" + u32 length + UTF-8
+# bytes, or b"d" + float64).
+_HEADER = struct.Struct("<II")
+_LENGTH = struct.Struct("<I")
+_FLOAT = struct.Struct("<d")
+
+def encode_record(op: int, fields: tuple) -> bytes:
+    parts = [bytes((op,))]
+    for field in fields:
+        if isinstance(field, str):
+            data = field.encode("utf-8")
+            parts.append(b"s" + _LENGTH.pack(len(data)) + data)
+        else:
+            parts.append(b"d" + _FLOAT.pack(field))
+    payload = b"".join(parts)
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def decode_records(buf) -> Iterator[Tuple[int, tuple]]:
+    """Yield (op, fields) from a log buffer, stopping at the first torn or corrupt record"""
+    view = memoryview(buf)
+    unpack_header = _HEADER.unpack_from
+    unpack_length = _LENGTH.unpack_from
+    unpack_float = _FLOAT.unpack_from
+    crc32 = zlib.crc32
+    pos = 0
+    end = len(view)
+    try:
+        while pos + 8 <= end:
+            length, crc = unpack_header(view, pos)
+            start = pos + 8
+            stop = start + length
+            if length == 0 or stop > end or crc32(view[start:stop]) != crc:
+                logger.warning("memory_log_truncated_record", offset=pos)
+                return
+                
+            fields = []
+            i = start + 1
+            while i < stop:
+                if view[i] == 0x73:  # b"s"
+                    size = unpack_length(view, i + 1)[0]
+                    i += 5
+                    fields.append(str(view[i:i + size], "utf-8"))
+                    i += size
+                else:
+                    fields.append(unpack_float(view, i + 1)[0])
+                    i += 9
+                    
+            yield view[start], tuple(fields)
+            pos = stop
+    finally:
+        view.release()
+
+class MemoryLog:
+    """Append-only write-ahead log of memory mutations with group commit.
+    
+    append() only buffers the encoded record; a background thread writes
+    and fsyncs everything buffered once per flush interval (or as soon as
+    max_batch_bytes accumulate), so /chat never waits on disk. A crash can
+    lose at most the last flush interval of mutations.
+    """
+    
+    def __init__(self, path: str, flush_interval_ms: int = 10, max_batch_bytes: int = 1 << 20):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_bytes = max_batch_bytes
+        self.records_appended = 0
+        self.records_in_file = 0
+        self.records_written = 0
+        self.batches_written = 0
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = open(path, "ab")
+        self._thread = threading.Thread(target=self._run, name="memory-log-writer", daemon=True)
+        self._thread.start()
+        
+    def append(self, op: int, *fields):
+        record = encode_record(op, fields)
+        with self._lock:
+            self._pending.append(record)
+            self._pending_bytes += len(record)
+            self.records_appended += 1
+            self.records_in_file += 1
+            if self._pending_bytes >= self.max_batch_bytes:
+                self._wake.set()
+                
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                self._pending_bytes = 0
+            if not batch:
+                return
+                
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.records_written += len(batch)
+            self.batches_written += 1
+            
+    def reopen(self, path: str):
+        """Flush and switch appends to a new log file"""
+        with self._io_lock:
+            self._flush_and_close()
+            self.path = path
+            self._file = open(path, "ab")
+            self.records_in_file = 0
+            
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        with self._io_lock:
+            self._flush_and_close()
+            
+    def _flush_and_close(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+            self._pending_bytes = 0
+        if batch:
+            self._file.write(b"".join(batch))
+            self.records_written += len(batch)
+            self.batches_written += 1
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("memory_log_flush_error", error=str(e), path=self.path)
+                
+    @staticmethod
+    def read(path: str) -> Iterator[Tuple[int, tuple]]:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield from decode_records(buf)
+
+class MemoryPersistence:
+    """Durable storage for the in-process memory state.
+    
+    Mutations of the graph manager, keyword history and user configs are
+    journaled to memory-<generation>.log. A snapshot pickles the whole state
+    at a generation boundary; startup loads the newest snapshot and replays
+    only the logs written after it.
+    
+    With fork_snapshots (and os.fork available), the request that crosses
+    snapshot_interval only rotates the log and forks: a child process
+    pickles its copy-on-write image of the state while the server keeps
+    serving, and older logs are deleted once the child has written the
+    snapshot. The price is memory: pages the server modifies meanwhile are
+    copied, up to the size of the state in the worst case.
+    
+    Users spilled by tiering stay in the ColdUserStore: the snapshot lists
+    their ids, and replay skips their records up to the journal position
+    their blob is current as of.
+    """
+    
+    def __init__(self, directory: str, graph_manager, keyword_extractor, user_configs: Dict[str, Any],
+                 flush_interval_ms: int = 10, snapshot_interval: int = 100000, fork_snapshots: bool = True,
+                 cold_store_path: Optional[str] = None):
+        self.directory = directory
+        self.graph_manager = graph_manager
+        self.keyword_extractor = keyword_extractor
+        self.user_configs = user_configs
+        self.flush_interval_ms = flush_interval_ms
+        self.snapshot_interval = snapshot_interval
+        self.fork_snapshots = fork_snapshots and hasattr(os, "fork")
+        # Read when tiering is off but the snapshot lists cold users
+        self.cold_store_path = cold_store_path
+        self.generation = 0
+        self.log: Optional[MemoryLog] = None
+        self.tiering = None
+        self._records_at_snapshot = 0
+        self._replay_position: Optional[Tuple[int, int]] = None
+        self._snapshot_reaper: Optional[threading.Thread] = None
+        self.snapshots_written = 0
+        self.snapshots_failed = 0
+        self.last_snapshot_ms = 0.0
+        self.last_snapshot_pause_ms = 0.0
+        os.makedirs(directory, exist_ok=True)
+        
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"memory-{generation:08d}.log")
+        
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, "memory.snapshot")
+        
+    def restore(self) -> Dict[str, Any]:
+        """Load the latest snapshot, replay newer logs and start journaling"""
+        # Nothing loaded here is garbage; collections would only rescan millions of new objects
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._restore()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+                
+    def _restore(self) -> Dict[str, Any]:
+        start_time = time.time()
+        snapshot_path = self._snapshot_path()
+        if self.tiering:
+            self.tiering.journal_position = self.journal_position
+        cold_positions = {}
+        
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                state = pickle.load(f)
+            if type(state["graph_manager"]) is not type(self.graph_manager):
+                raise ValueError(
+                    f"Snapshot holds a {type(state['graph_manager']).__name__}, "
+                    f"configured backend is {type(self.graph_manager).__name__}"
+                )
+            self.generation = state["generation"]
+            self.graph_manager.load_snapshot(state["graph_manager"])
+            self.keyword_extractor.user_keyword_history = state["keyword_history"]
+            if state.get("document_frequency") is not None and self.keyword_extractor.document_frequency is not None:
+                self.keyword_extractor.document_frequency = state["document_frequency"]
+            self.user_configs.clear()
+            self.user_configs.update(state["user_configs"])
+            cold_positions = self._load_cold_users(state.get("cold_users", []))
+        snapshot_ms = (time.time() - start_time) * 1000
+        
+        replayed = skipped = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, "memory-*.log"))):
+            generation = int(os.path.basename(path)[7:-4])
+            if generation < self.generation:
+                os.remove(path)
+                continue
+            for seq, (op, fields) in enumerate(MemoryLog.read(path)):
+                position = cold_positions.get(fields[0])
+                if position is not None:
+                    # Already in the user's cold blob
+                    if (generation, seq) < position:
+                        skipped += 1
+                        continue
+                    del cold_positions[fields[0]]
+                self._replay_position = (generation, seq)
+                self._apply(op, fields)
+                replayed += 1
+            self.generation = max(self.generation, generation)
+        self._replay_position = None
+            
+        # Append to a fresh generation so new records never follow a torn tail
+        self.generation += 1
+        self.log = MemoryLog(self._log_path(self.generation), flush_interval_ms=self.flush_interval_ms)
+        self.graph_manager.journal = self.log
+        self.keyword_extractor.journal = self.log
+        
+        stats = {
+            "generation": self.generation,
+            "records_replayed": replayed,
+            "records_skipped": skipped,
+            "snapshot_load_ms": snapshot_ms,
+            "restore_ms": (time.time() - start_time) * 1000
+        }
+        logger.info("memory_restored", **stats)
+        return stats
+        
+    def _load_cold_users(self, user_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+        """Mark the snapshot's cold users cold (or import them, without tiering); returns their blobs' positions"""
+        if not user_ids:
+            return {}
+        if self.tiering:
+            store = self.tiering.store
+        elif self.cold_store_path:
+            store = ColdUserStore(self.cold_store_path, keep=True)
+        else:
+            logger.error("memory_cold_users_missing", missing=len(user_ids), cold_store=None)
+            return {}
+            
+        try:
+            stored = store.positions()
+            positions = {user_id: stored[user_id] for user_id in user_ids if user_id in stored}
+            if len(positions) < len(user_ids):
+                logger.error("memory_cold_users_missing", missing=len(user_ids) - len(positions), cold_store=store.path)
+            if self.tiering:
+                self.tiering.load_cold(positions)
+            else:
+                # One blob in memory at a time
+                for user_id in positions:
+                    state = pickle.loads(store.get(user_id))
+                    import_user_state(self.graph_manager, self.keyword_extractor, self.user_configs, user_id, state)
+        finally:
+            if not self.tiering:
+                store.close()
+        return positions
+        
+    def journal_position(self) -> Tuple[int, int]:
+        """(generation, index in that log) of the next record; what a blob spilled now is current as of"""
+        if self._replay_position is not None:
+            return self._replay_position
+        return self.generation, self.log.records_in_file if self.log else 0
+            
+    def _apply(self, op: int, fields: tuple):
+        if self.tiering:
+            self.tiering.touch(fields[0])
+            
+        if op == OP_CONFIG_CHANGED:
+            user_id, config = fields
+            self.user_configs[user_id] = json.loads(config)
+        elif not (self.graph_manager.apply_journal_record(op, fields)
+                  or self.keyword_extractor.apply_journal_record(op, fields)):
+            logger.warning("memory_log_unknown_op", op=op)
+            
+    def record_config(self, user_id: str, config: Dict[str, Any]):
+        if self.log:
+            self.log.append(OP_CONFIG_CHANGED, user_id, json.dumps(config))
+            
+    def maybe_snapshot(self):
+        if (self.log and self.log.records_appended - self._records_at_snapshot >= self.snapshot_interval
+                and not self.snapshot_in_progress()):
+            self.snapshot()
+            
+    def snapshot_in_progress(self) -> bool:
+        return self._snapshot_reaper is not None and self._snapshot_reaper.is_alive()
+        
+    def snapshot(self, background: bool = True):
+        """Snapshot the current state and start a new log generation.
+        
+        Must run on the thread that mutates memory so the snapshotted state
+        lines up exactly with the log rotation. With background and
+        fork_snapshots, the snapshot is written by a forked child and this
+        returns right after the fork.
+        """
+        start_time = time.time()
+        self.wait_for_snapshot()
+        self.generation += 1
+        self.log.reopen(self._log_path(self.generation))
+        self._records_at_snapshot = self.log.records_appended
+        
+        cold_users = []
+        if self.tiering:
+            # The blobs of users the snapshot lists as cold must be as durable as the snapshot
+            self.tiering.store.sync()
+            cold_users = list(self.tiering.cold_users)
+        state = {
+            "generation": self.generation,
+            "graph_manager": self.graph_manager,
+            "keyword_history": self.keyword_extractor.user_keyword_history,
+            "document_frequency": self.keyword_extractor.document_frequency,
+            "user_configs": self.user_configs,
+            "cold_users": cold_users
+        }
+        if not (background and self.fork_snapshots):
+            self._write_snapshot(state)
+            self._snapshot_written(self.generation, start_time, start_time)
+            return
+            
+        # Frozen objects are skipped by the collector, so the server's GC does
+        # not dirty (and copy) the pages the child is still reading
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                gc.disable()
+                self._write_snapshot(state)
+                exit_code = 0
+            except BaseException:
+                os.write(2, traceback.format_exc().encode())
+            finally:
+                os._exit(exit_code)
+                
+        self.last_snapshot_pause_ms = (time.time() - start_time) * 1000
+        self._snapshot_reaper = threading.Thread(
+            target=self._reap_snapshot,
+            args=(pid, self.generation, start_time),
+            name="memory-snapshot-reaper",
+            daemon=True
+        )
+        self._snapshot_reaper.start()
+        
+    def _write_snapshot(self, state: Dict[str, Any]):
+        snapshot_path = self._snapshot_path()
+        tmp_path = snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+        
+    def _reap_snapshot(self, pid: int, generation: int, start_time: float):
+        _, status = os.waitpid(pid, 0)
+        gc.unfreeze()
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code != 0:
+            # The previous snapshot and every log since it are still in place
+            self.snapshots_failed += 1
+            logger.error("memory_snapshot_failed", generation=generation, exit_code=exit_code)
+            return
+        self._snapshot_written(generation, start_time, start_time + self.last_snapshot_pause_ms / 1000)
+        
+    def _snapshot_written(self, generation: int, start_time: float, resumed_time: float):
+        for path in glob.glob(os.path.join(self.directory, "memory-*.log")):
+            if int(os.path.basename(path)[7:-4]) < generation:
+                os.remove(path)
+        self.snapshots_written += 1
+        self.last_snapshot_ms = (time.time() - start_time) * 1000
+        logger.info(
+            "memory_snapshot_written",
+            generation=generation,
+            snapshot_ms=self.last_snapshot_ms,
+            blocked_ms=(resumed_time - start_time) * 1000
+        )
+                
+    def wait_for_snapshot(self):
+        if self._snapshot_reaper is not None:
+            self._snapshot_reaper.join()
+            self._snapshot_reaper = None
+            
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "snapshot_in_progress": self.snapshot_in_progress(),
+            "snapshots_written": self.snapshots_written,
+            "snapshots_failed": self.snapshots_failed,
+            "last_snapshot_ms": self.last_snapshot_ms,
+            "last_snapshot_pause_ms": self.last_snapshot_pause_ms
+        }
+        
+    def close(self):
+        if self.log:
+            self.snapshot(background=False)
+            self.log.close()
+            self.log = None
\ No newline at end of file
@@ -0,0 +1,36 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+class PreferenceRanking:
+    """One user's preference keywords kept sorted by weight, heaviest first.
+    
+    Ties keep creation order, matching a stable sort of the graph's
+    preference neighbors. Updates are a binary search plus one list
+    insert/delete, so top(k) never has to sort the user's full set.
+    """
+    __slots__ = ("entries", "keys", "next_seq")
+    
+    def __init__(self):
+        self.entries: List[Tuple[float, int, str]] = []
+        self.keys: Dict[str, Tuple[float, int]] = {}
+        self.next_seq = 0
+        
+    def update(self, keyword: str, weight: float):
+        key = self.keys.get(keyword)
+        if key is not None:
+            if key[0] == -weight:
+                return
+            del self.entries[bisect_left(self.entries, (key[0], key[1], keyword))]
+            seq = key[1]
+        else:
+            seq = self.next_seq
+            self.next_seq += 1
+            
+        self.keys[keyword] = (-weight, seq)
+        insort(self.entries, (-weight, seq, keyword))
+        
+    def top(self, k: int) -> List[str]:
+        return [keyword for _, _, keyword in self.entries[:k]]
+        
+    def __len__(self) -> int:
+        return len(self.entries)
\ No newline at end of file
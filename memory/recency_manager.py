@@ -1,80 +1,127 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
 import math
+import time
+import numpy as np
 import structlog
 
 logger = structlog.get_logger()
 
+# Log-weights are stored relative to this fixed epoch (2024-01-01T00:00:00Z)
+# so values persisted in snapshots stay comparable across restarts.
+REFERENCE_EPOCH = 1704067200.0
+
 class RecencyManager:
-    def __init__(self):
-        self.decay_factor = 0.95
-        self.max_age_days = 30
+    """Exponential recency decay with a configurable half-life.
+        
+    A weight w last touched at epoch t is stored as the log-weight
+    ln(w) + rate * (t - REFERENCE_EPOCH). Its decayed value at any later
+    time is exp(log_weight - rate * (now - REFERENCE_EPOCH)), so decay is
+    applied only when a weight is read and the ordering of stored
+    log-weights never changes as time passes.
+    """
+    
+    def __init__(self, half_life_hours: float = 336.0):
+        self.half_life_hours = half_life_hours
+        self.rate = math.log(2) / (half_life_hours * 3600)
+        
+    def log_weight(self, weight: float, epoch: float) -> float:
+        if weight <= 0:
+            return -math.inf
+        return math.log(weight) + self.rate * (epoch - REFERENCE_EPOCH)
+        
+    def log_weights(self, weights: List[float], timestamps: List[Union[str, float]]) -> np.ndarray:
+        """Vectorized log_weight for epoch floats or naive-UTC ISO strings"""
+        weights = np.asarray(weights, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            return np.where(weights > 0, np.log(weights), -np.inf) + self.rate * (_to_epochs(timestamps) - REFERENCE_EPOCH)
+        
+    def weight_at(self, log_weight: float, now: Optional[float] = None) -> float:
+        if now is None:
+            now = time.time()
+        return math.exp(log_weight - self.rate * (now - REFERENCE_EPOCH))
         
-    def calculate_recency_multiplier(self, timestamp_str: str) -> float:
+    def weights_at(self, log_weights: np.ndarray, now: Optional[float] = None) -> np.ndarray:
+        """Vectorized weight_at for a batch of log-weights"""
+        if now is None:
+            now = time.time()
+        return np.exp(np.asarray(log_weights, dtype=np.float64) - self.rate * (now - REFERENCE_EPOCH))
+        
+    def top_k(self, log_weights: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k heaviest log-weights, heaviest first (ties keep input order)"""
+        log_weights = np.asarray(log_weights, dtype=np.float64)
+        if len(log_weights) > k:
+            top = np.argpartition(-log_weights, k - 1)[:k]
+            top.sort()
+        else:
+            top = np.arange(len(log_weights))
+        return top[np.argsort(-log_weights[top], kind="stable")]
+        
+    def calculate_recency_multiplier(self, timestamp: Union[str, float]) -> float:
         try:
-            timestamp = datetime.fromisoformat(timestamp_str)
-            now = datetime.utcnow()
-            age_hours = (now - timestamp).total_seconds() / 3600
-            
-            if age_hours < 1:
-                return 1.0
-            elif age_hours < 24:
-                return 0.95
-            elif age_hours < 72:
-                return 0.85
-            elif age_hours < 168:
-                return 0.7
-            elif age_hours < 720:
-                return 0.5
-            else:
-                return 0.3
-                
+            return float(self.calculate_recency_multipliers([timestamp])[0])
         except Exception as e:
             logger.error("recency_calculation_error", error=str(e))
             return 0.5
             
+    def calculate_recency_multipliers(self, timestamps: List[Union[str, float]], now: Optional[float] = None) -> np.ndarray:
+        """Decay multipliers for a batch of epoch floats or naive-UTC ISO strings"""
+        if now is None:
+            now = time.time()
+        epochs = _to_epochs(timestamps)
+        age_seconds = np.maximum(now - epochs, 0.0)
+        return np.exp(-self.rate * age_seconds)
+        
     def apply_recency_decay(self, nodes: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        weighted = []
+        timestamps = []
         for node in nodes:
             if isinstance(node, dict):
                 data = node.get("data", node)
+                timestamp = data.get("last_seen", data.get("timestamp"))
+                if timestamp is not None and "weight" in data:
+                    weighted.append(data)
+                    timestamps.append(timestamp)
                 
-                if "last_seen" in data:
-                    timestamp = data["last_seen"]
-                elif "timestamp" in data:
-                    timestamp = data["timestamp"]
-                else:
-                    continue
-                    
-                recency_multiplier = self.calculate_recency_multiplier(timestamp)
-                
-                if "weight" in data:
-                    original_weight = data["weight"]
-                    data["adjusted_weight"] = original_weight * recency_multiplier
-                    data["recency_multiplier"] = recency_multiplier
+        if not weighted:
+            return nodes
                     
-                    logger.debug(
-                        "recency_applied",
-                        original_weight=original_weight,
-                        adjusted_weight=data["adjusted_weight"],
-                        recency_multiplier=recency_multiplier
-                    )
+        multipliers = self.calculate_recency_multipliers(timestamps).tolist()
+        for data, recency_multiplier in zip(weighted, multipliers):
+            data["adjusted_weight"] = data["weight"] * recency_multiplier
+            data["recency_multiplier"] = recency_multiplier
                     
+        logger.debug("recency_applied", nodes=len(weighted))
         return nodes
         
     def update_preference_weights_with_decay(self, preferences: list[Dict]) -> list[Dict]:
-        updated_preferences = []
-        
-        for pref in preferences:
-            if "last_seen" in pref:
-                recency_multiplier = self.calculate_recency_multiplier(pref["last_seen"])
+        dated = [pref for pref in preferences if "last_seen" in pref]
+        if dated:
+            multipliers = self.calculate_recency_multipliers([pref["last_seen"] for pref in dated]).tolist()
+            for pref, recency_multiplier in zip(dated, multipliers):
                 base_weight = pref.get("count", 1) * 0.1
-                adjusted_weight = base_weight * recency_multiplier
-                
-                pref["weight"] = adjusted_weight
+                pref["weight"] = base_weight * recency_multiplier
                 pref["base_weight"] = base_weight
                 pref["recency_multiplier"] = recency_multiplier
                 
-            updated_preferences.append(pref)
-            
+        updated_preferences = list(preferences)
         updated_preferences.sort(key=lambda x: x.get("weight", 0), reverse=True)
-        return updated_preferences
\ No newline at end of file
+        return updated_preferences
+
+def _to_epochs(timestamps: List[Union[str, float]]) -> np.ndarray:
+    strings = [i for i, timestamp in enumerate(timestamps) if isinstance(timestamp, str)]
+    epochs = np.array([0.0 if isinstance(timestamp, str) else timestamp for timestamp in timestamps], dtype=np.float64)
+    if not strings:
+        return epochs
+        
+    try:
+        # NumPy parses the naive-UTC ISO strings the graph managers emit in one pass
+        parsed = np.array([timestamps[i] for i in strings], dtype="datetime64[us]")
+        epochs[strings] = parsed.astype(np.int64) / 1e6
+    except ValueError:
+        for i in strings:
+            parsed = datetime.fromisoformat(timestamps[i])
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            epochs[i] = parsed.timestamp()
+    return epochs
\ No newline at end of file
@@ -0,0 +1,105 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import math
+import numpy as np
+
+class BM25Index:
+    """Incremental inverted index with Okapi BM25 scoring over one user's messages.
+    
+    Documents are identified by the message sequence number. Each term's
+    postings are two parallel arrays (dense document slot, term frequency),
+    appended to as messages arrive, so indexing never rewrites old data.
+    Slots count from the first document ever added; doc_seqs and
+    doc_lengths start at slot `base` once older documents are dropped.
+    """
+    __slots__ = ("postings", "doc_seqs", "doc_lengths", "total_length", "k1", "b", "base")
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_seqs = array("I")
+        self.doc_lengths = array("I")
+        self.total_length = 0
+        self.k1 = k1
+        self.b = b
+        self.base = 0
+        
+    def __setstate__(self, state):
+        # Indexes pickled before drop_before existed carry no base
+        self.base = 0
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        
+    def add(self, seq: int, tokens: List[str]):
+        slot = self.base + len(self.doc_seqs)
+        self.doc_seqs.append(seq)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        
+        for term, tf in Counter(tokens).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+            posting[0].append(slot)
+            posting[1].append(tf)
+            
+    def search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        """Return up to k (message seq, score) pairs, best first"""
+        n_docs = len(self.doc_seqs)
+        if not n_docs or not tokens or k <= 0:
+            return []
+            
+        k1 = self.k1
+        avg_length = self.total_length / n_docs
+        length_norm_a = k1 * (1 - self.b)
+        length_norm_b = k1 * self.b / avg_length if avg_length else 0.0
+        # Zero-copy views over the posting arrays; they must not outlive this
+        # call, since an exported array cannot grow.
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.uintc)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            slots = np.frombuffer(posting[0], dtype=np.uintc) - np.uintc(self.base)
+            tfs = np.frombuffer(posting[1], dtype=np.uintc).astype(np.float32)
+            df = len(slots)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[slots] += idf * (k1 + 1) * tfs / (tfs + length_norm_a + length_norm_b * doc_lengths[slots])
+            
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        best = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(self.doc_seqs[slot], float(scores[slot])) for slot in best]
+        
+    def drop_before(self, seq: int, terms: Iterable[str]):
+        """Remove every document with a sequence number below seq (compacted messages).
+        
+        terms must include every term of the dropped documents; only their
+        postings are trimmed, so the cost is independent of vocabulary size.
+        """
+        n_drop = bisect_left(self.doc_seqs, seq)
+        if not n_drop:
+            return
+            
+        self.total_length -= sum(self.doc_lengths[:n_drop])
+        del self.doc_seqs[:n_drop]
+        del self.doc_lengths[:n_drop]
+        self.base += n_drop
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            slots, tfs = posting
+            keep = bisect_left(slots, self.base)
+            if keep == len(slots):
+                del self.postings[term]
+            elif keep:
+                del slots[:keep]
+                del tfs[:keep]
+                
+    def __len__(self) -> int:
+        return len(self.doc_seqs)
\ No newline at end of file
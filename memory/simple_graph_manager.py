@@ -1,108 +1,738 @@
 import networkx as nx
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
+import time
 import structlog
+from memory.preference_index import PreferenceRanking
+from memory.search_index import BM25Index
+from memory.keyword_extractor import count_terms, tokenize
+from memory.embeddings import EmbeddingStore
+from memory.cooccurrence import CooccurrenceGraph
+from memory.recency_manager import RecencyManager
+from memory.near_duplicates import SimHashIndex, simhash
+from memory.compaction import ConversationDigest, MessageArchive, build_digest
 
 logger = structlog.get_logger()
 
+OP_USER_CREATED = 1
+OP_MESSAGE_ADDED = 2
+OP_PREFERENCE_UPDATED = 3
+OP_KEYWORDS_LINKED = 6
+OP_MESSAGES_COMPACTED = 7
+
+# NetworkX releases whose DiGraph internals (_node/_succ/_pred) snapshot packing
+# was checked against; any other version packs and unpacks through the public API
+NX_DIRECT_VERSIONS = ("3.0", "3.1", "3.2", "3.3")
+NX_DIRECT = ".".join(nx.__version__.split(".")[:2]) in NX_DIRECT_VERSIONS
+
+def iso_timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
 class SimpleGraphManager:
     """Simplified graph manager without threading locks for testing"""
     
-    def __init__(self):
-        self.graph = nx.DiGraph()
+    # Dicts keyed by user_id that move with the user on export/import
+    PER_USER_ATTRS = ("user_message_counts", "user_node_counts", "user_edge_counts", "preference_rankings", "search_indexes", "embedding_stores", "keyword_graphs",
+                      "decay_rankings", "duplicate_indexes", "message_repeats", "digests", "compacted_upto")
+    # Configuration, left out of snapshots: a restored manager keeps the values it was constructed with
+    CONFIG_ATTRS = ("embedder", "archive", "recency", "dedup_max_distance", "compaction_window", "digest_size", "max_digests",
+                    "embedding_lsh_min_vectors")
+    
+    def __init__(self, embedder=None, embedding_lsh_min_vectors: int = 0, recency: Optional[RecencyManager] = None,
+                 dedup_max_distance: Optional[int] = None, compaction_window: int = 0, digest_size: int = 50,
+                 max_digests: int = 16, archive: Optional[MessageArchive] = None):
+        """dedup_max_distance: fold a message into an earlier one of the same user and
+        role whose SimHash is within this many bits (0-3; None disables). Messages
+        too short to have a SimHash are always stored.
+        
+        compaction_window: keep this many recent messages per user raw and let
+        compact_user() fold older ones, digest_size at a time, into at most
+        max_digests digests (0 disables). Folded messages are written to
+        archive if one is given, otherwise dropped.
+        """
+        if dedup_max_distance is not None and not 0 <= dedup_max_distance <= 3:
+            # The 4-band index only guarantees to find signatures within 3 bits
+            raise ValueError(f"dedup_max_distance must be between 0 and 3, got {dedup_max_distance}")
+        self.embedder = embedder
+        self.dedup_max_distance = dedup_max_distance
+        self.compaction_window = compaction_window
+        self.digest_size = digest_size
+        self.max_digests = max_digests
+        self.archive = archive
+        self.embedding_lsh_min_vectors = embedding_lsh_min_vectors
         self.user_message_counts = defaultdict(int)
-        self.preference_counts = defaultdict(lambda: defaultdict(int))
+        self.user_node_counts = defaultdict(int)
+        self.user_edge_counts = defaultdict(int)
+        self.preference_rankings: Dict[str, PreferenceRanking] = defaultdict(PreferenceRanking)
+        # Same preferences ordered by recency-decayed weight, keyed on log-weight
+        self.recency = recency or RecencyManager()
+        self.decay_rankings: Dict[str, PreferenceRanking] = defaultdict(PreferenceRanking)
+        self.search_indexes: Dict[str, BM25Index] = defaultdict(BM25Index)
+        self.embedding_stores: Dict[str, EmbeddingStore] = {}
+        self.keyword_graphs: Dict[str, CooccurrenceGraph] = defaultdict(CooccurrenceGraph)
+        # user_id -> role -> SimHashIndex, and user_id -> seq -> times the message was sent
+        self.duplicate_indexes: Dict[str, Dict[str, SimHashIndex]] = defaultdict(dict)
+        self.message_repeats: Dict[str, Dict[int, int]] = defaultdict(dict)
+        # user_id -> digests oldest first, and user_id -> first message seq still held raw
+        self.digests: Dict[str, List[ConversationDigest]] = defaultdict(list)
+        self.compacted_upto: Dict[str, int] = defaultdict(int)
+        # Users with a full digest_size chunk past the window, in arrival order
+        self.compaction_pending: Dict[str, None] = {}
+        self.journal = None
+        self._init_storage()
         
-    def create_user(self, user_id: str) -> Dict:
-        if not self.graph.has_node(user_id):
-            self.graph.add_node(
-                user_id,
-                node_type="User",
-                created_at=datetime.utcnow().isoformat()
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["journal"] = None
+        for attr in self.CONFIG_ATTRS:
+            del state[attr]
+        # The decay rankings are keyed on log-weights at this rate
+        state["recency_rate"] = self.recency.rate
+        self._pack_storage(state)
+        return state
+        
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._unpack_storage()
+        
+    def load_snapshot(self, snapshot: "SimpleGraphManager"):
+        """Take over the memory of an unpickled snapshot, keeping this manager's
+        configuration, and redo what was derived from the snapshot's own"""
+        state = dict(snapshot.__dict__)
+        recency_rate = state.pop("recency_rate", None)
+        self.__dict__.update(state)
+        
+        if recency_rate != self.recency.rate:
+            self._rebuild_decay_rankings()
+        for store in self.embedding_stores.values():
+            if store.lsh_min_vectors != self.embedding_lsh_min_vectors:
+                store.set_lsh_min_vectors(self.embedding_lsh_min_vectors)
+        self.compaction_pending = {}
+        for user_id in self.list_users():
+            self._check_compaction_due(user_id)
+            
+    def _rebuild_decay_rankings(self):
+        for user_id in list(self.decay_rankings):
+            ranking = self.decay_rankings[user_id] = PreferenceRanking()
+            preferences = self._list_preferences(user_id)
+            log_weights = self.recency.log_weights(
+                [preference["weight"] for preference in preferences],
+                [preference["last_seen"] for preference in preferences]
             )
+            for preference, log_weight in zip(preferences, log_weights):
+                ranking.update(preference["keyword"], float(log_weight))
+        
+    def create_user(self, user_id: str) -> Dict:
+        if not self._has_user(user_id):
+            timestamp = time.time()
+            self._apply_user(user_id, timestamp)
+            if self.journal:
+                self.journal.append(OP_USER_CREATED, user_id, timestamp)
             logger.info("user_created", user_id=user_id)
         return {"id": user_id, "type": "User"}
             
     def add_message(self, user_id: str, message: str, role: str) -> str:
         self.create_user(user_id)
         
-        message_id = f"msg-{user_id}-{self.user_message_counts[user_id]}"
-        self.user_message_counts[user_id] += 1
+        timestamp = time.time()
+        messages_before = self.user_message_counts[user_id]
+        message_id = self._apply_message(user_id, message, role, timestamp)
+        if self.journal:
+            self.journal.append(OP_MESSAGE_ADDED, user_id, role, message, timestamp)
         
-        self.graph.add_node(
-            message_id,
-            node_type="Message",
-            content=message,
-            role=role,
-            timestamp=datetime.utcnow().isoformat(),
-            user_id=user_id
-        )
+        if self.user_message_counts[user_id] == messages_before:
+            logger.info("message_repeated", user_id=user_id, message_id=message_id, role=role)
+        else:
+            logger.info("message_added", user_id=user_id, message_id=message_id, role=role)
+        return message_id
+            
+    def create_preference(self, user_id: str, keyword: str, weight: float = 0.1) -> str:
+        timestamp = time.time()
+        pref_id = self._apply_preference(user_id, keyword, weight, timestamp)
+        if self.journal:
+            self.journal.append(OP_PREFERENCE_UPDATED, user_id, keyword, weight, timestamp)
+            
+        logger.info("preference_updated", user_id=user_id, keyword=keyword, pref_id=pref_id)
+        return pref_id
         
-        self.graph.add_edge(user_id, message_id, edge_type="HAS_MESSAGE")
+    def create_preferences(self, user_id: str, weights: Dict[str, float]) -> List[str]:
+        """Create or bump several preferences at once (one timestamp, one log line)"""
+        if not weights:
+            return []
+            
+        timestamp = time.time()
+        pref_ids = []
+        for keyword, weight in weights.items():
+            pref_ids.append(self._apply_preference(user_id, keyword, weight, timestamp))
+            if self.journal:
+                self.journal.append(OP_PREFERENCE_UPDATED, user_id, keyword, weight, timestamp)
+                
+        logger.info("preferences_updated", user_id=user_id, keywords=list(weights)[:5], count=len(pref_ids))
+        return pref_ids
+        
+    def link_keywords(self, user_id: str, keywords: List[str]):
+        """Strengthen the co-occurrence edges between keywords mentioned in one message"""
+        if len(keywords) < 2:
+            return
+            
+        self.keyword_graphs[user_id].add(keywords)
+        if self.journal:
+            self.journal.append(OP_KEYWORDS_LINKED, user_id, "\n".join(keywords))
+            
+    def compact_user(self, user_id: str) -> int:
+        """Fold the user's oldest digest_size raw messages past the window into a digest.
+        
+        Returns how many messages were folded (0 if the user has no full
+        chunk to compact). Each call does a bounded amount of work, so a
+        background task can interleave it with requests.
+        """
+        start = self.compacted_upto.get(user_id, 0)
+        end = start + self.digest_size
+        if not self.compaction_window or self.user_message_counts.get(user_id, 0) - end < self.compaction_window:
+            return 0
+            
+        self._apply_compaction(user_id, end)
+        if self.journal:
+            self.journal.append(OP_MESSAGES_COMPACTED, user_id, float(end))
+        logger.info("messages_compacted", user_id=user_id, first_seq=start, last_seq=end - 1, digests=len(self.digests[user_id]))
+        return end - start
+        
+    def compact_pending(self, max_chunks: int = 1) -> int:
+        """Compact up to max_chunks chunks, round-robin over users with a chunk due; returns messages folded"""
+        folded = 0
+        for _ in range(max_chunks):
+            if not self.compaction_pending:
+                break
+            user_id = next(iter(self.compaction_pending))
+            del self.compaction_pending[user_id]
+            folded += self.compact_user(user_id)
+            self._check_compaction_due(user_id)
+        return folded
+        
+    def _check_compaction_due(self, user_id: str):
+        if (self.compaction_window and self.user_message_counts.get(user_id, 0) - self.compacted_upto.get(user_id, 0)
+                >= self.compaction_window + self.digest_size):
+            self.compaction_pending[user_id] = None
+            
+    def apply_journal_record(self, op: int, fields: tuple) -> bool:
+        """Re-apply a journaled mutation without logging or re-journaling it (used on replay)"""
+        if op == OP_USER_CREATED:
+            user_id, timestamp = fields
+            if not self._has_user(user_id):
+                self._apply_user(user_id, timestamp)
+        elif op == OP_MESSAGE_ADDED:
+            user_id, role, message, timestamp = fields
+            if not self._has_user(user_id):
+                self._apply_user(user_id, timestamp)
+            self._apply_message(user_id, message, role, timestamp)
+        elif op == OP_PREFERENCE_UPDATED:
+            self._apply_preference(*fields)
+        elif op == OP_KEYWORDS_LINKED:
+            user_id, keywords = fields
+            self.keyword_graphs[user_id].add(keywords.split("\n"))
+        elif op == OP_MESSAGES_COMPACTED:
+            user_id, end = fields
+            self._apply_compaction(user_id, int(end))
+            self.compaction_pending.pop(user_id, None)
+            self._check_compaction_due(user_id)
+        else:
+            return False
+        return True
+        
+    def _apply_user(self, user_id: str, timestamp: float):
+        self._store_user(user_id, timestamp)
+        self.user_node_counts[user_id] += 1
+        
+    def _apply_message(self, user_id: str, message: str, role: str, timestamp: float) -> str:
+        duplicate_index = signature = None
+        if self.dedup_max_distance is not None:
+            signature = simhash(message)
+        if signature is not None:
+            duplicate_index = self.duplicate_indexes[user_id].get(role)
+            if duplicate_index is None:
+                duplicate_index = self.duplicate_indexes[user_id][role] = SimHashIndex()
+            original = duplicate_index.find(signature, self.dedup_max_distance)
+            if original is not None:
+                repeats = self.message_repeats[user_id]
+                repeats[original] = repeats.get(original, 1) + 1
+                return f"msg-{user_id}-{original}"
+                
+        seq = self.user_message_counts[user_id]
+        message_id = f"msg-{user_id}-{seq}"
+        self.user_message_counts[user_id] += 1
         
-        logger.info("message_added", user_id=user_id, message_id=message_id, role=role)
+        self._store_message(user_id, message_id, message, role, timestamp)
+        self.user_node_counts[user_id] += 1
+        self.user_edge_counts[user_id] += 1
+        self.search_indexes[user_id].add(seq, tokenize(message))
+        if duplicate_index is not None:
+            duplicate_index.add(seq, signature)
+        if self.embedder:
+            store = self.embedding_stores.get(user_id)
+            if store is None:
+                store = self.embedding_stores[user_id] = EmbeddingStore(
+                    self.embedder.dim, lsh_min_vectors=self.embedding_lsh_min_vectors
+                )
+            store.add(seq, self.embedder.embed(message))
+        self._check_compaction_due(user_id)
         return message_id
+        
+    def _apply_compaction(self, user_id: str, end: int):
+        start = self.compacted_upto[user_id]
+        messages = self._annotate_repeats(user_id, [self._get_message(user_id, seq) for seq in range(start, end)])
+        if self.archive is not None:
+            self.archive.put_many(user_id, start, messages)
             
-    def create_preference(self, user_id: str, keyword: str, weight: float = 0.1) -> str:
+        self._drop_messages(user_id, start, end)
+        self.compacted_upto[user_id] = end
+        self.user_node_counts[user_id] -= end - start
+        self.user_edge_counts[user_id] -= end - start
+        self.search_indexes[user_id].drop_before(end, {term for message in messages for term in tokenize(message["content"])})
+        if user_id in self.embedding_stores:
+            self.embedding_stores[user_id].drop_before(end)
+        for duplicate_index in self.duplicate_indexes.get(user_id, {}).values():
+            duplicate_index.drop_before(end)
+        repeats = self.message_repeats.get(user_id)
+        if repeats:
+            for seq in [seq for seq in repeats if seq < end]:
+                del repeats[seq]
+                
+        digests = self.digests[user_id]
+        digests.append(build_digest(start, messages))
+        if len(digests) > self.max_digests:
+            # Merge the adjacent pair covering the fewest messages, so older
+            # history ends up in progressively coarser digests
+            i = min(range(len(digests) - 1), key=lambda i: digests[i].message_count + digests[i + 1].message_count)
+            digests[i:i + 2] = [digests[i].merge(digests[i + 1])]
+        
+    def _apply_preference(self, user_id: str, keyword: str, weight: float, timestamp: float) -> str:
         pref_id = f"pref-{user_id}-{keyword.replace(' ', '_')}"
         
-        if self.graph.has_node(pref_id):
-            node_data = self.graph.nodes[pref_id]
-            node_data["count"] += 1
-            node_data["weight"] = min(1.0, node_data["count"] * 0.1)
-            node_data["last_seen"] = datetime.utcnow().isoformat()
-        else:
-            self.graph.add_node(
-                pref_id,
-                node_type="Preference",
-                keyword=keyword,
-                count=1,
-                weight=weight,
-                first_seen=datetime.utcnow().isoformat(),
-                last_seen=datetime.utcnow().isoformat(),
-                user_id=user_id
-            )
-            self.graph.add_edge(user_id, pref_id, edge_type="HAS_PREFERENCE")
+        new_weight = self._update_preference(user_id, pref_id, keyword, timestamp)
+        if new_weight is None:
+            self._store_preference(user_id, pref_id, keyword, weight, timestamp)
+            self.user_node_counts[user_id] += 1
+            self.user_edge_counts[user_id] += 1
+            new_weight = weight
             
-        logger.info("preference_updated", user_id=user_id, keyword=keyword, pref_id=pref_id)
+        self.preference_rankings[user_id].update(keyword, new_weight)
+        self.decay_rankings[user_id].update(keyword, self.recency.log_weight(new_weight, timestamp))
         return pref_id
             
     def get_user_messages(self, user_id: str, limit: int = 5) -> List[Dict]:
-        messages = []
-        for node, data in self.graph.nodes(data=True):
-            if data.get("node_type") == "Message" and data.get("user_id") == user_id:
-                messages.append({
-                    "id": node,
-                    "content": data.get("content"),
-                    "role": data.get("role"),
-                    "timestamp": data.get("timestamp")
-                })
-                
-        messages.sort(key=lambda x: x["timestamp"], reverse=True)
-        return messages[:limit]
+        if limit <= 0:
+            return []
+        return self._annotate_repeats(user_id, self._recent_messages(user_id, limit))
+        
+    def _annotate_repeats(self, user_id: str, messages: List[Dict]) -> List[Dict]:
+        repeats = self.message_repeats.get(user_id)
+        if repeats:
+            for message in messages:
+                count = repeats.get(int(message["id"].rsplit("-", 1)[1]))
+                if count:
+                    message["repeat_count"] = count
+        return messages
+        
+    def search_user_messages(self, user_id: str, query: str, limit: int = 5, exclude_ids=(), strategy: str = "bm25") -> List[Dict]:
+        """Rank the user's past messages by relevance to query; each dict carries a "score".
+        
+        strategy is "bm25" (keyword), "embedding" (local vector similarity,
+        needs an embedder) or "hybrid" (reciprocal rank fusion of both).
+        """
+        if limit <= 0:
+            return []
+            
+        fetch = limit + len(exclude_ids)
+        if strategy == "bm25":
+            ranked = self._bm25_search(user_id, query, fetch)
+        elif strategy == "embedding":
+            ranked = self._embedding_search(user_id, query, fetch)
+        elif strategy == "hybrid":
+            ranked = self._fuse_rankings(
+                self._bm25_search(user_id, query, fetch * 2),
+                self._embedding_search(user_id, query, fetch * 2)
+            )[:fetch]
+        else:
+            raise ValueError(f"Unknown retrieval strategy: {strategy}")
+            
+        results = []
+        for seq, score in ranked:
+            message = self._get_message(user_id, seq)
+            if message is None or message["id"] in exclude_ids:
+                continue
+            message["score"] = score
+            results.append(message)
+            if len(results) == limit:
+                break
+        return self._annotate_repeats(user_id, results)
+        
+    def _bm25_search(self, user_id: str, query: str, k: int) -> List[tuple]:
+        index = self.search_indexes.get(user_id)
+        return index.search(tokenize(query), k) if index else []
+        
+    def _embedding_search(self, user_id: str, query: str, k: int) -> List[tuple]:
+        store = self.embedding_stores.get(user_id)
+        if not self.embedder or store is None:
+            return []
+        return store.search(self.embedder.embed(query), k)
+        
+    @staticmethod
+    def _fuse_rankings(*rankings: List[tuple]) -> List[tuple]:
+        fused = defaultdict(float)
+        for ranking in rankings:
+            for rank, (seq, _) in enumerate(ranking):
+                fused[seq] += 1.0 / (60 + rank)
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        
+    def relevant_digests(self, user_id: str, keywords: List[str], k: int) -> List[Dict]:
+        """Up to k digests of compacted history that mention the keywords most, best first"""
+        digests = self.digests.get(user_id)
+        if not digests or not keywords or k <= 0:
+            return []
+            
+        scored = [(digest.relevance(keywords), digest) for digest in digests]
+        scored = sorted((item for item in scored if item[0] > 0), key=lambda item: item[0], reverse=True)
+        return [
+            {
+                "id": f"digest-{user_id}-{digest.first_seq}-{digest.last_seq}",
+                "content": digest.content,
+                "timestamp": digest.end,
+                "score": float(score)
+            }
+            for score, digest in scored[:k]
+        ]
             
     def count_user_messages(self, user_id: str) -> int:
         return self.user_message_counts.get(user_id, 0)
             
     def get_user_preferences(self, user_id: str) -> List[Dict]:
+        """Full preference listing sorted by weight (for export); use top_preferences for reads"""
+        preferences = self._list_preferences(user_id)
+        preferences.sort(key=lambda x: x["weight"], reverse=True)
+        return preferences
+        
+    def has_preference(self, user_id: str, keyword: str) -> bool:
+        ranking = self.preference_rankings.get(user_id)
+        return ranking is not None and keyword in ranking.keys
+        
+    def count_preferences(self) -> int:
+        return sum(len(ranking) for ranking in self.preference_rankings.values())
+        
+    def top_preferences(self, user_id: str, k: int, decayed: bool = False) -> List[Dict]:
+        """Heaviest k preferences; with decayed=True, ranked by recency-decayed weight
+        (each dict then also carries "adjusted_weight")"""
+        rankings = self.decay_rankings if decayed else self.preference_rankings
+        ranking = rankings.get(user_id)
+        if not ranking or k <= 0:
+            return []
+        if not decayed:
+            return [self._get_preference(user_id, keyword) for keyword in ranking.top(k)]
+            
+        now = time.time()
+        preferences = []
+        for keyword in ranking.top(k):
+            preference = self._get_preference(user_id, keyword)
+            preference["adjusted_weight"] = self.recency.weight_at(-ranking.keys[keyword][0], now)
+            preferences.append(preference)
+        return preferences
+            
+    def mentioned_preferences(self, user_id: str, message: str, k: int) -> List[Dict]:
+        """Preferences whose keyword (unigram or bigram) occurs in message, heaviest decayed weight first.
+        
+        Each term of the message is one dict lookup against the user's
+        preference ranking, so this is O(len(message)) however many
+        preferences the user has, with no matcher to rebuild.
+        """
+        ranking = self.decay_rankings.get(user_id)
+        if not ranking or k <= 0:
+            return []
+            
+        keys = ranking.keys
+        hits = [(keys[term], term, count) for term, count in count_terms(message).items() if term in keys]
+        hits.sort()
+        now = time.time()
+        preferences = []
+        for (neg_log_weight, _), keyword, count in hits[:k]:
+            preference = self._get_preference(user_id, keyword)
+            preference["adjusted_weight"] = self.recency.weight_at(-neg_log_weight, now)
+            preference["mentions"] = count
+            preferences.append(preference)
+        return preferences
+        
+    def related_preferences(self, user_id: str, keywords: List[str], k: int) -> List[Dict]:
+        """Preferences ranked by personalized PageRank over the keyword co-occurrence graph, seeded with keywords"""
+        graph = self.keyword_graphs.get(user_id)
+        ranking = self.preference_rankings.get(user_id)
+        if graph is None or not ranking or k <= 0:
+            return []
+            
+        decay_ranking = self.decay_rankings[user_id]
+        now = time.time()
+        related = []
+        for keyword, score in graph.rank(keywords, k, accept=ranking.keys):
+            preference = self._get_preference(user_id, keyword)
+            preference["relevance"] = score
+            preference["adjusted_weight"] = self.recency.weight_at(-decay_ranking.keys[keyword][0], now)
+            related.append(preference)
+        return related
+        
+    def get_graph_stats(self, user_id: str, verify: bool = False) -> Dict:
+        stats = {
+            "total_nodes": self.user_node_counts.get(user_id, 0),
+            "total_edges": self.user_edge_counts.get(user_id, 0),
+            "message_count": self.user_message_counts.get(user_id, 0)
+        }
+        
+        if verify:
+            recomputed = self._compute_graph_stats(user_id)
+            if recomputed != stats:
+                logger.error("graph_stats_mismatch", user_id=user_id, incremental=stats, recomputed=recomputed)
+                raise AssertionError(f"Graph stats out of sync for {user_id}: {stats} != {recomputed}")
+                
+        if self.compacted_upto.get(user_id):
+            stats["compacted_messages"] = self.compacted_upto[user_id]
+            stats["digests"] = len(self.digests[user_id])
+        return stats
+        
+    def list_users(self) -> List[str]:
+        return list(self.user_node_counts)
+        
+    def export_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a user's memory from this manager and return it as picklable state"""
+        if not self._has_user(user_id):
+            return None
+            
+        state = {attr: getattr(self, attr).pop(user_id, None) for attr in self.PER_USER_ATTRS}
+        state["storage"] = self._export_user_storage(user_id)
+        self.compaction_pending.pop(user_id, None)
+        return state
+        
+    def import_user(self, user_id: str, state: Dict[str, Any]):
+        for attr in self.PER_USER_ATTRS:
+            if state.get(attr) is not None:
+                getattr(self, attr)[user_id] = state[attr]
+        self._import_user_storage(user_id, state["storage"])
+        self._check_compaction_due(user_id)
+        
+    def estimate_user_bytes(self, user_id: str) -> int:
+        store = self.embedding_stores.get(user_id)
+        graph = self.keyword_graphs.get(user_id)
+        duplicate_indexes = self.duplicate_indexes.get(user_id, {})
+        return (
+            self._estimate_storage_bytes(user_id)
+            + (store.matrix.nbytes if store is not None else 0)
+            + (graph.estimate_bytes() if graph is not None else 0)
+            + sum(index.estimate_bytes() for index in duplicate_indexes.values())
+            + sum(digest.estimate_bytes() for digest in self.digests.get(user_id, ()))
+        )
+        
+    # Storage backend. Subclasses (see CompactGraphManager) override these
+    # hooks to keep the same public API over a different layout.
+    
+    def _init_storage(self):
+        self.graph = nx.DiGraph()
+        self.user_message_ids: Dict[str, List[str]] = defaultdict(list)
+        
+    def _has_user(self, user_id: str) -> bool:
+        return self.graph.has_node(user_id)
+        
+    def _store_user(self, user_id: str, timestamp: float):
+        self.graph.add_node(
+            user_id,
+            node_type="User",
+            created_at=iso_timestamp(timestamp)
+        )
+        
+    def _store_message(self, user_id: str, message_id: str, message: str, role: str, timestamp: float):
+        self.graph.add_node(
+            message_id,
+            node_type="Message",
+            content=message,
+            role=role,
+            timestamp=iso_timestamp(timestamp),
+            user_id=user_id
+        )
+        
+        self.graph.add_edge(user_id, message_id, edge_type="HAS_MESSAGE")
+        self.user_message_ids[user_id].append(message_id)
+        
+    def _recent_messages(self, user_id: str, limit: int) -> List[Dict]:
+        # Message ids are appended in sequence order, so the newest `limit`
+        # messages are the tail of the user's index - no graph scan needed.
+        message_ids = self.user_message_ids.get(user_id)
+        if not message_ids:
+            return []
+            
+        messages = []
+        for message_id in reversed(message_ids[-limit:]):
+            data = self.graph.nodes[message_id]
+            messages.append({
+                "id": message_id,
+                "content": data.get("content"),
+                "role": data.get("role"),
+                "timestamp": data.get("timestamp")
+            })
+            
+        return messages
+        
+    def _get_message(self, user_id: str, seq: int) -> Optional[Dict]:
+        message_id = f"msg-{user_id}-{seq}"
+        if not self.graph.has_node(message_id):
+            return None
+            
+        data = self.graph.nodes[message_id]
+        return {
+            "id": message_id,
+            "content": data.get("content"),
+            "role": data.get("role"),
+            "timestamp": data.get("timestamp")
+        }
+        
+    def _drop_messages(self, user_id: str, start: int, end: int):
+        """Remove messages start..end-1, the oldest the user still holds, from storage"""
+        message_ids = self.user_message_ids[user_id]
+        self.graph.remove_nodes_from(message_ids[:end - start])
+        del message_ids[:end - start]
+        
+    def _update_preference(self, user_id: str, pref_id: str, keyword: str, timestamp: float) -> Optional[float]:
+        """Bump an existing preference and return its new weight, or None if it does not exist"""
+        if not self.graph.has_node(pref_id):
+            return None
+            
+        node_data = self.graph.nodes[pref_id]
+        node_data["count"] += 1
+        node_data["weight"] = min(1.0, node_data["count"] * 0.1)
+        node_data["last_seen"] = iso_timestamp(timestamp)
+        return node_data["weight"]
+        
+    def _store_preference(self, user_id: str, pref_id: str, keyword: str, weight: float, timestamp: float):
+        now = iso_timestamp(timestamp)
+        self.graph.add_node(
+            pref_id,
+            node_type="Preference",
+            keyword=keyword,
+            count=1,
+            weight=weight,
+            first_seen=now,
+            last_seen=now,
+            user_id=user_id
+        )
+        self.graph.add_edge(user_id, pref_id, edge_type="HAS_PREFERENCE")
+        
+    def _list_preferences(self, user_id: str) -> List[Dict]:
         preferences = []
         if self.graph.has_node(user_id):
             for neighbor in self.graph.neighbors(user_id):
                 node_data = self.graph.nodes[neighbor]
                 if node_data.get("node_type") == "Preference":
-                    preferences.append({
-                        "id": neighbor,
-                        "keyword": node_data.get("keyword"),
-                        "weight": node_data.get("weight"),
-                        "count": node_data.get("count"),
-                        "last_seen": node_data.get("last_seen")
-                    })
-                    
-        preferences.sort(key=lambda x: x["weight"], reverse=True)
+                    preferences.append(self._preference_dict(neighbor, node_data))
         return preferences
+        
+    def _get_preference(self, user_id: str, keyword: str) -> Dict:
+        pref_id = f"pref-{user_id}-{keyword.replace(' ', '_')}"
+        return self._preference_dict(pref_id, self.graph.nodes[pref_id])
+        
+    def _preference_dict(self, pref_id: str, node_data: Dict) -> Dict:
+        return {
+            "id": pref_id,
+            "keyword": node_data.get("keyword"),
+            "weight": node_data.get("weight"),
+            "count": node_data.get("count"),
+            "last_seen": node_data.get("last_seen")
+        }
+        
+    def _pack_storage(self, state: Dict[str, Any]):
+        """Swap the graph in a pickled state for a faster-to-load form.
+        
+        Pickling a million message node dicts, each with its HAS_MESSAGE
+        edge, dominated snapshot write and restore time. Plain message
+        nodes go into one list per attribute, and their edges are implied
+        by user_id; any other node or edge is kept as is.
+        """
+        graph = state.pop("graph")
+        if NX_DIRECT:
+            node_attrs, succ, pred = graph._node, graph._succ, graph._pred
+        else:
+            node_attrs, succ, pred = graph.nodes, graph.succ, graph.pred
+        
+        def packable(node: str) -> bool:
+            data = node_attrs[node]
+            return (data.get("node_type") == "Message" and len(data) == 5 and not succ[node]
+                    and pred[node] == {data["user_id"]: {"edge_type": "HAS_MESSAGE"}})
+                    
+        columns = ([], [], [], [], [])
+        ids, contents, roles, timestamps, owners = columns
+        nodes = []
+        for node, data in node_attrs.items():
+            if packable(node):
+                ids.append(node)
+                contents.append(data["content"])
+                roles.append(data["role"])
+                timestamps.append(data["timestamp"])
+                owners.append(data["user_id"])
+            else:
+                nodes.append((node, data))
+        # Only edges from nodes kept as is can lead anywhere but into a packed message
+        edges = [
+            (node, target, edge_data)
+            for node, _ in nodes
+            for target, edge_data in succ[node].items()
+            if not packable(target)
+        ]
+        state["graph_packed"] = {"nodes": nodes, "messages": columns, "edges": edges}
+        
+    def _unpack_storage(self):
+        packed = self.__dict__.pop("graph_packed")
+        graph = self.graph = nx.DiGraph()
+        if not NX_DIRECT:
+            messages = list(zip(*packed["messages"]))
+            graph.add_nodes_from(packed["nodes"])
+            graph.add_nodes_from(
+                (node, {"node_type": "Message", "content": content, "role": role, "timestamp": timestamp, "user_id": owner})
+                for node, content, role, timestamp, owner in messages
+            )
+            graph.add_edges_from((owner, node, {"edge_type": "HAS_MESSAGE"}) for node, _, _, _, owner in messages)
+            graph.add_edges_from(packed["edges"])
+            return
+        # Fills NetworkX's own adjacency dicts (3.x layout): add_nodes_from /
+        # add_edges_from take twice as long for a million messages
+        node_attrs, succ, pred = graph._node, graph._succ, graph._pred
+        for node, data in packed["nodes"]:
+            node_attrs[node] = data
+            succ[node] = {}
+            pred[node] = {}
+        for node, content, role, timestamp, owner in zip(*packed["messages"]):
+            node_attrs[node] = {"node_type": "Message", "content": content, "role": role, "timestamp": timestamp, "user_id": owner}
+            edge_data = {"edge_type": "HAS_MESSAGE"}
+            succ[node] = {}
+            pred[node] = {owner: edge_data}
+            succ[owner][node] = edge_data
+        for source, target, edge_data in packed["edges"]:
+            succ[source][target] = edge_data
+            pred[target][source] = edge_data
             
-    def get_graph_stats(self, user_id: str) -> Dict:
+    def _export_user_storage(self, user_id: str) -> Dict[str, Any]:
+        nodes = [(user_id, self.graph.nodes[user_id])]
+        edges = []
+        for _, node, edge_data in self.graph.out_edges(user_id, data=True):
+            nodes.append((node, self.graph.nodes[node]))
+            edges.append((user_id, node, edge_data))
+            
+        self.graph.remove_nodes_from([node for node, _ in nodes])
+        return {"nodes": nodes, "edges": edges, "message_ids": self.user_message_ids.pop(user_id, [])}
+        
+    def _import_user_storage(self, user_id: str, storage: Dict[str, Any]):
+        self.graph.add_nodes_from(storage["nodes"])
+        self.graph.add_edges_from(storage["edges"])
+        self.user_message_ids[user_id] = storage["message_ids"]
+        
+    def _estimate_storage_bytes(self, user_id: str) -> int:
+        # Roughly 900 bytes of node/edge dicts per node (see CompactGraphManager)
+        return self.user_node_counts.get(user_id, 0) * 900
+        
+    def _compute_graph_stats(self, user_id: str) -> Dict:
+        """Recount a user's nodes and edges by scanning the whole graph (slow, for consistency checks)"""
         user_nodes = 0
         user_edges = 0
         
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import pickle
+import sqlite3
+import threading
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+def import_user_state(graph_manager, keyword_extractor, user_configs: Dict[str, Any], user_id: str, state: Dict[str, Any]):
+    if state["graph"] is not None:
+        graph_manager.import_user(user_id, state["graph"])
+    keyword_extractor.import_user(user_id, state["keywords"])
+    if state["config"] is not None:
+        user_configs[user_id] = state["config"]
+
+class ColdUserStore:
+    """SQLite table of spilled users, one pickled blob per user.
+    
+    Each blob is stored with the journal position it is current as of
+    (generation, records in that log file), so with MemoryPersistence
+    the table is part of the durable state: snapshots only list which
+    users are cold, and restore replays a cold user's journal records
+    from their blob's position on. A reloaded user's row is kept until
+    the next spill overwrites it.
+    
+    With keep=False (no persistence) it is only a spill area and starts
+    empty. It runs in WAL mode with synchronous=NORMAL; sync() makes
+    every committed blob durable and is called before each snapshot.
+    """
+    
+    def __init__(self, path: str, keep: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(cold_users)")]
+        if columns and "generation" not in columns:
+            self.conn.execute("DROP TABLE cold_users")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cold_users (user_id TEXT PRIMARY KEY, generation INTEGER NOT NULL, "
+            "seq INTEGER NOT NULL, state BLOB NOT NULL)"
+        )
+        if not keep:
+            self.conn.execute("DELETE FROM cold_users")
+        self.conn.commit()
+        
+    def put(self, user_id: str, blob: bytes, position: Tuple[int, int] = (0, 0)):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cold_users (user_id, generation, seq, state) VALUES (?, ?, ?, ?)",
+                (user_id, position[0], position[1], blob)
+            )
+            self.conn.commit()
+            
+    def get(self, user_id: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.conn.execute("SELECT state FROM cold_users WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+            
+    def positions(self) -> Dict[str, Tuple[int, int]]:
+        """Journal position of every stored blob, without reading the blobs"""
+        with self.lock:
+            rows = self.conn.execute("SELECT user_id, generation, seq FROM cold_users").fetchall()
+        return {user_id: (generation, seq) for user_id, generation, seq in rows}
+        
+    def sync(self):
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(FULL)")
+            
+        
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class UserTiering:
+    """Keeps an LRU working set of users in RAM and spills the rest to a ColdUserStore.
+    
+    touch() must be called before a user's memory is read or written; it
+    reloads the user if they were spilled and then evicts least recently
+    used users until the hot set fits max_hot_users and max_hot_bytes
+    (0 disables either limit). Byte sizes are the managers' estimates.
+    Reads touch with existing_only=True, so looking up a user who has no
+    memory neither adds them to the hot set nor spills anyone.
+    
+    A request that awaits between its reads and writes (the LLM call)
+    touches with pin=True and calls unpin() when done: pinned users are
+    never spilled, so the hot set may run over budget while they are.
+    """
+    
+    def __init__(self, graph_manager, keyword_extractor, user_configs: Dict[str, Any], store: ColdUserStore,
+                 max_hot_users: int = 0, max_hot_bytes: int = 0, on_spill=None, journal_position=None):
+        self.graph_manager = graph_manager
+        self.keyword_extractor = keyword_extractor
+        self.user_configs = user_configs
+        self.store = store
+        self.max_hot_users = max_hot_users
+        self.max_hot_bytes = max_hot_bytes
+        self.on_spill = on_spill
+        # Set by MemoryPersistence: the position spilled blobs are current as of
+        self.journal_position = journal_position
+        self.hot_users: "OrderedDict[str, int]" = OrderedDict()
+        self.hot_bytes = 0
+        self.cold_users = set()
+        self.pins: Dict[str, int] = {}
+        self.spills = 0
+        self.reloads = 0
+        self.reload_ms_total = 0.0
+        self.reload_ms_max = 0.0
+        
+    def touch(self, user_id: str, pin: bool = False, existing_only: bool = False):
+        if existing_only and user_id not in self.hot_users and user_id not in self.cold_users:
+            return
+        if pin:
+            # Taken first, so the caller's unpin() balances it even if the reload fails
+            self.pins[user_id] = self.pins.get(user_id, 0) + 1
+        if user_id in self.cold_users:
+            self._reload(user_id)
+            
+        size = self.graph_manager.estimate_user_bytes(user_id) + self.keyword_extractor.estimate_user_bytes(user_id)
+        self.hot_bytes += size - self.hot_users.pop(user_id, 0)
+        self.hot_users[user_id] = size
+        self._evict(keep=user_id)
+        
+    def unpin(self, user_id: str):
+        count = self.pins.get(user_id, 0)
+        if count > 1:
+            self.pins[user_id] = count - 1
+            return
+        self.pins.pop(user_id, None)
+        if user_id in self.hot_users:
+            # Its size may have grown while pinned, and spills may have been held back
+            size = self.graph_manager.estimate_user_bytes(user_id) + self.keyword_extractor.estimate_user_bytes(user_id)
+            self.hot_bytes += size - self.hot_users[user_id]
+            self.hot_users[user_id] = size
+        self._evict()
+        
+    def _evict(self, keep: Optional[str] = None):
+        while len(self.hot_users) > 1 and self._over_budget():
+            victim = next((user for user in self.hot_users if user != keep and user not in self.pins), None)
+            if victim is None:
+                return
+            self._spill(victim)
+            
+    def _over_budget(self) -> bool:
+        return (
+            (self.max_hot_users and len(self.hot_users) > self.max_hot_users)
+            or (self.max_hot_bytes and self.hot_bytes > self.max_hot_bytes)
+        )
+        
+    def _spill(self, user_id: str):
+        self.hot_bytes -= self.hot_users.pop(user_id)
+        state = {
+            "graph": self.graph_manager.export_user(user_id),
+            "keywords": self.keyword_extractor.export_user(user_id),
+            "config": self.user_configs.pop(user_id, None)
+        }
+        if state["graph"] is None and state["keywords"] is None and state["config"] is None:
+            return
+            
+        position = self.journal_position() if self.journal_position else (0, 0)
+        self.store.put(user_id, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), position)
+        self.cold_users.add(user_id)
+        self.spills += 1
+        if self.on_spill:
+            self.on_spill(user_id)
+        logger.debug("user_spilled", user_id=user_id)
+        
+    def _reload(self, user_id: str):
+        start_time = time.time()
+        self.cold_users.discard(user_id)
+        blob = self.store.get(user_id)
+        if blob is None:
+            return
+            
+        import_user_state(self.graph_manager, self.keyword_extractor, self.user_configs, user_id, pickle.loads(blob))
+        elapsed_ms = (time.time() - start_time) * 1000
+        self.reloads += 1
+        self.reload_ms_total += elapsed_ms
+        self.reload_ms_max = max(self.reload_ms_max, elapsed_ms)
+        logger.debug("user_reloaded", user_id=user_id, reload_ms=elapsed_ms)
+        
+    def load_cold(self, user_ids: Iterable[str]):
+        """Mark users whose blobs are already in the store as cold"""
+        self.cold_users.update(user_ids)
+            
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "hot_users": len(self.hot_users),
+            "hot_bytes_estimate": self.hot_bytes,
+            "cold_users": len(self.cold_users),
+            "pinned_users": len(self.pins),
+            "spills": self.spills,
+            "reloads": self.reloads,
+            "reload_ms_avg": self.reload_ms_total / self.reloads if self.reloads else 0.0,
+            "reload_ms_max": self.reload_ms_max
+        }
+        
+    def close(self):
+        self.store.close()
\ No newline at end of file
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Memory Footprint Benchmark
+Stores 1M messages (1000 users, alternating roles, ~30-character contents)
+in the networkx and compact memory backends and reports the bytes each
+message costs, as traced by tracemalloc, with and without the content
+itself. Runs in-process; no server.
+
+    python memory_footprint_benchmark.py            # 1M messages
+    python memory_footprint_benchmark.py 100000     # quicker
+"""
+
+import gc
+import sys
+import tracemalloc
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+
+MESSAGES = 1000000
+USERS = 1000
+
+def footprint(cls, contents):
+    """Traced bytes held by a manager after storing MESSAGES messages"""
+    gc.collect()
+    tracemalloc.start()
+    manager = cls()
+    for i in range(MESSAGES):
+        manager.add_message(f"user-{i % USERS}", contents[i % len(contents)], "user" if i % 2 == 0 else "assistant")
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del manager
+    return used
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    contents = [f"message number {i} about coffee" for i in range(1000)]
+    content_bytes = sum(len(contents[i % len(contents)]) for i in range(MESSAGES))
+    print(f"{MESSAGES} messages over {USERS} users, {content_bytes / MESSAGES:.0f} content bytes per message")
+    print(f"{'backend':<9} {'total MB':>9} {'B/msg':>7} {'B/msg excl. content':>20}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        used = footprint(cls, contents)
+        print(f"{name:<9} {used / 1e6:>9.0f} {used / MESSAGES:>7.0f} {(used - content_bytes) / MESSAGES:>20.0f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Mention Matching Benchmark
+Gives one user 5000 preferences (4000 unigrams, 1000 bigrams) on each
+memory backend and times mentioned_preferences on 2 KB messages, against
+the obvious alternative of one word-boundary regex per preference, which
+is only timed on a few messages. Also checks both find the same
+preferences. Runs in-process; no server.
+
+    python mention_matching_benchmark.py          # 5000 preferences
+    python mention_matching_benchmark.py 50000
+"""
+
+import random
+import re
+import sys
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+
+PREFERENCES = 5000
+MESSAGES = 50
+REGEX_MESSAGES = 5
+MESSAGE_BYTES = 2048
+TOP_K = 3
+
+def regex_mentions(keywords, message: str):
+    """One word-boundary regex per preference keyword"""
+    message = message.lower()
+    return [keyword for keyword in keywords if re.search(r"\b" + re.escape(keyword) + r"\b", message)]
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"one user, {PREFERENCES} preferences, {MESSAGE_BYTES}-byte messages (ms per message)")
+    print(f"{'backend':<9} {'mentioned':>10} {'regex':>8} {'mentions/msg':>13} {'same matches':>13}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        rng = random.Random(0)
+        vocabulary = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(4, 9))) for _ in range(20000)]
+        unigrams = PREFERENCES * 4 // 5
+        bigrams = PREFERENCES - unigrams
+        keywords = rng.sample(vocabulary, unigrams) + [
+            f"{first} {second}" for first, second in zip(rng.sample(vocabulary, bigrams), rng.sample(vocabulary, bigrams))
+        ]
+        manager = cls()
+        manager.create_user("user")
+        manager.create_preferences("user", {keyword: rng.random() for keyword in keywords})
+        messages = []
+        for _ in range(MESSAGES):
+            words = []
+            while sum(len(word) + 1 for word in words) < MESSAGE_BYTES:
+                words.append(rng.choice(vocabulary))
+            messages.append(" ".join(words))
+            
+        start = time.perf_counter()
+        for message in messages:
+            manager.mentioned_preferences("user", message, TOP_K)
+        mentioned_ms = (time.perf_counter() - start) / MESSAGES * 1000
+        start = time.perf_counter()
+        found = [regex_mentions(keywords, message) for message in messages[:REGEX_MESSAGES]]
+        regex_ms = (time.perf_counter() - start) / REGEX_MESSAGES * 1000
+        same = all(
+            {p["keyword"] for p in manager.mentioned_preferences("user", message, PREFERENCES)} == set(hits)
+            for message, hits in zip(messages, found)
+        )
+        mentions = sum(len(hits) for hits in found) / REGEX_MESSAGES
+        print(f"{name:<9} {mentioned_ms:>10.2f} {regex_ms:>8.0f} {mentions:>13.1f} {str(same):>13}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        PREFERENCES = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Message Lookup Benchmark
+Fills both memory backends with 1k to 1M messages spread over 1000 users and
+times the recent-history lookup every /chat makes (get_user_messages, last
+8), against the old full-graph scan and sort, which is only timed up to
+100k messages. Lookup cost should stay flat as the total grows. Runs
+in-process; no server.
+
+    python message_lookup_benchmark.py            # up to 1M messages
+    python message_lookup_benchmark.py 100000     # up to 100k
+"""
+
+import sys
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+
+USERS = 1000
+LIMIT = 8
+LOOKUPS = 2000
+LEGACY_LOOKUPS = 20
+LEGACY_MAX_MESSAGES = 100000
+TOTALS = [1000, 10000, 100000, 1000000]
+
+def legacy_recent_messages(manager: SimpleGraphManager, user_id: str, limit: int):
+    """The lookup before the per-user message index: scan every node, sort by timestamp"""
+    messages = []
+    for node, data in manager.graph.nodes(data=True):
+        if data.get("node_type") == "Message" and data.get("user_id") == user_id:
+            messages.append({
+                "id": node,
+                "content": data.get("content"),
+                "role": data.get("role"),
+                "timestamp": data.get("timestamp")
+            })
+    messages.sort(key=lambda x: x["timestamp"], reverse=True)
+    return messages[:limit]
+
+def time_lookups(lookup, count: int) -> float:
+    """Mean microseconds per lookup, cycling through the users"""
+    start = time.perf_counter()
+    for i in range(count):
+        lookup(f"user-{i % USERS}")
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"{USERS} users, last {LIMIT} messages per lookup (us per lookup)")
+    print(f"{'messages':>9} {'networkx':>10} {'compact':>10} {'old scan':>10}")
+    for total in TOTALS:
+        row = []
+        managers = {}
+        for cls in (SimpleGraphManager, CompactGraphManager):
+            manager = managers[cls] = cls()
+            for i in range(total):
+                manager.add_message(f"user-{i % USERS}", f"message {i} about the weekend plans", "user")
+            row.append(time_lookups(lambda user_id: manager.get_user_messages(user_id, LIMIT), LOOKUPS))
+        legacy = ""
+        if total <= LEGACY_MAX_MESSAGES:
+            networkx = managers[SimpleGraphManager]
+            legacy = f"{time_lookups(lambda user_id: legacy_recent_messages(networkx, user_id, LIMIT), LEGACY_LOOKUPS):.0f}"
+        print(f"{total:>9} {row[0]:>10.1f} {row[1]:>10.1f} {legacy:>10}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        TOTALS = [total for total in TOTALS if total <= int(sys.argv[1])]
+    main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Benchmark
+Gives one user 50k distinct messages of 3-40 words on each memory backend
+with dedup_max_distance=3 and times near-duplicate detection per incoming
+message (SimHash signature plus band index lookup) for chat-sized and
+2 KB messages, then checks that upper-cased, punctuated variants of stored
+messages are folded and that fresh messages are not. Detection should stay
+well under a millisecond. Runs in-process; no server.
+
+    python near_duplicate_benchmark.py          # 50k messages
+    python near_duplicate_benchmark.py 500000
+"""
+
+import random
+import sys
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.near_duplicates import simhash
+
+MESSAGES = 50000
+MAX_DISTANCE = 3
+QUERIES = 2000
+VARIANTS = 500
+
+def mean_us(func, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"one user, {MESSAGES} messages, max distance {MAX_DISTANCE} bits (us per message)")
+    print(f"{'backend':<9} {'add':>6} {'simhash':>8} {'lookup':>7} {'detect':>7} {'2 KB detect':>12} {'variants folded':>16} {'false folds':>12}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        rng = random.Random(0)
+        vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(20000)]
+        messages = [" ".join(rng.choices(vocabulary, k=rng.randint(3, 40))) for _ in range(MESSAGES)]
+        manager = cls(dedup_max_distance=MAX_DISTANCE)
+        add_us = mean_us(lambda message: manager.add_message("user", message, "user"), messages)
+        index = manager.duplicate_indexes["user"]["user"]
+        
+        fresh = [" ".join(rng.choices(vocabulary, k=rng.randint(3, 40))) for _ in range(QUERIES)]
+        signatures = [simhash(message) for message in fresh]
+        simhash_us = mean_us(simhash, fresh)
+        lookup_us = mean_us(lambda signature: index.find(signature, MAX_DISTANCE), signatures)
+        long_messages = [" ".join(rng.choices(vocabulary, k=350)) for _ in range(200)]
+        long_us = mean_us(lambda message: index.find(simhash(message), MAX_DISTANCE), long_messages)
+        folded = sum(
+            index.find(simhash(message.upper() + "!!"), MAX_DISTANCE) is not None
+            for message in rng.sample(messages, VARIANTS)
+        )
+        false_folds = sum(index.find(signature, MAX_DISTANCE) is not None for signature in signatures)
+        print(
+            f"{name:<9} {add_us:>6.0f} {simhash_us:>8.1f} {lookup_us:>7.1f} {simhash_us + lookup_us:>7.1f} {long_us:>12.0f} "
+            f"{f'{folded}/{VARIANTS}':>16} {f'{false_folds}/{QUERIES}':>12}"
+        )
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Overload Benchmark
+Offers a stub provider twice the load it can serve (open-loop arrivals) and
+compares calling it directly with calling it through the adaptive limiter and
+circuit breaker (GuardedLLMClient). Over-capacity calls are either rejected
+with a rate limit at once or hang until they time out. Runs in-process; no
+server or API keys.
+"""
+
+import asyncio
+import time
+import structlog
+from llm.base import LLMConfig
+from llm.guard import AdaptiveLimiter, CircuitBreaker, GuardedLLMClient, ProviderGuard
+from llm.stub_client import StubClient
+
+CAPACITY = 40          # concurrent calls the provider serves
+LATENCY_MS = 200       # so it tops out at CAPACITY / LATENCY = 200 req/s
+RATE = 400             # offered req/s
+DURATION_S = 6
+
+SCENARIOS = {
+    "rate limited": {"overload_ms": 0},
+    "timing out": {"overload_ms": 2000}
+}
+
+async def run(client):
+    ok_latencies = []
+    failure_latencies = []
+    
+    async def one(index):
+        start = time.time()
+        try:
+            await client.agenerate(f"Current message: request {index}", LLMConfig())
+            ok_latencies.append((time.time() - start) * 1000)
+        except Exception:
+            failure_latencies.append((time.time() - start) * 1000)
+            
+    tasks = []
+    start = time.time()
+    for index in range(RATE * DURATION_S):
+        tasks.append(asyncio.create_task(one(index)))
+        await asyncio.sleep(max(0.0, start + (index + 1) / RATE - time.time()))
+    await asyncio.gather(*tasks)
+    return sorted(ok_latencies), failure_latencies, time.time() - start
+
+async def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"{'scenario':<13} {'mode':<9} {'ok':>5} {'failed':>6} {'ok/s':>6} {'ok p50':>7} {'ok p99':>7} "
+          f"{'fail ms':>8} {'calls':>6} {'limit':>6} {'breaker':>9}")
+    for name, stub_kwargs in SCENARIOS.items():
+        for mode in ("direct", "guarded"):
+            provider = StubClient(LATENCY_MS, capacity=CAPACITY, **stub_kwargs)
+            guard = ProviderGuard("stub", AdaptiveLimiter(queue_timeout=1.0), CircuitBreaker(reset_timeout=1.0))
+            client = provider if mode == "direct" else GuardedLLMClient(provider, guard)
+            ok, failed, elapsed = await run(client)
+            failure_ms = sum(failed) / len(failed) if failed else 0.0
+            limit = int(guard.limiter.limit) if mode == "guarded" else "-"
+            breaker = guard.breaker.state if mode == "guarded" else "-"
+            print(
+                f"{name:<13} {mode:<9} {len(ok):>5} {len(failed):>6} {len(ok) / elapsed:>6.1f} "
+                f"{ok[len(ok) // 2] if ok else 0:>7.0f} {ok[int(len(ok) * 0.99)] if ok else 0:>7.0f} "
+                f"{failure_ms:>8.0f} {provider.calls:>6} {limit:>6} {breaker:>9}"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
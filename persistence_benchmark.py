@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Persistence Benchmark
+For both memory backends, with 1M messages over 1000 users: the cost of
+journaling each write, replaying the full log after a crash (no snapshot),
+taking a snapshot in a forked child (the pause the request path sees, and
+the writes it keeps serving meanwhile) and synchronously, and restoring
+from the snapshot. Runs in-process in a temporary directory; no server.
+
+    python persistence_benchmark.py            # 1M messages
+    python persistence_benchmark.py 100000     # quicker
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.keyword_extractor import KeywordExtractor
+from memory.persistence import MemoryPersistence
+
+MESSAGES = 1000000
+USERS = 1000
+
+def write_messages(manager, count: int, start: int = 0) -> float:
+    """Microseconds per add_message"""
+    begin = time.perf_counter()
+    for i in range(start, start + count):
+        manager.add_message(f"user-{i % USERS}", f"message number {i} about coffee", "user")
+    return (time.perf_counter() - begin) / count * 1e6
+
+def open_persistence(cls, directory: str):
+    manager = cls()
+    persistence = MemoryPersistence(directory, manager, KeywordExtractor(), {}, snapshot_interval=10 ** 12)
+    return manager, persistence, persistence.restore()
+
+def benchmark(name: str, cls, directory: str):
+    plain_us = write_messages(cls(), MESSAGES)
+    manager, persistence, _ = open_persistence(cls, directory)
+    journaled_us = write_messages(manager, MESSAGES)
+    # Crash: the log is flushed but no snapshot is taken
+    persistence.log.close()
+    
+    manager, persistence, stats = open_persistence(cls, directory)
+    replay_s = stats["restore_ms"] / 1000
+    
+    persistence.snapshot()
+    writes, worst_ms = 0, 0.0
+    while persistence.snapshot_in_progress():
+        start = time.perf_counter()
+        manager.add_message(f"user-{writes % USERS}", f"later message {writes}", "user")
+        worst_ms = max(worst_ms, (time.perf_counter() - start) * 1000)
+        writes += 1
+    persistence.wait_for_snapshot()
+    pause_ms, forked_s = persistence.last_snapshot_pause_ms, persistence.last_snapshot_ms / 1000
+    
+    persistence.snapshot(background=False)
+    sync_s = persistence.last_snapshot_ms / 1000
+    size_mb = os.path.getsize(os.path.join(directory, "memory.snapshot")) / 1e6
+    persistence.log.close()
+    
+    _, persistence, stats = open_persistence(cls, directory)
+    persistence.log.close()
+    print(
+        f"{name:<9} {journaled_us - plain_us:>11.1f} {replay_s:>9.1f} {pause_ms:>9.1f} {writes:>10} {worst_ms:>9.2f} "
+        f"{forked_s:>9.1f} {sync_s:>7.1f} {size_mb:>8.0f} {stats['snapshot_load_ms'] / 1000:>9.2f}"
+    )
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"{MESSAGES} messages over {USERS} users")
+    print(
+        f"{'backend':<9} {'journal us':>11} {'replay s':>9} {'pause ms':>9} {'writes':>10} {'worst ms':>9} "
+        f"{'forked s':>9} {'sync s':>7} {'size MB':>8} {'restore s':>9}"
+    )
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        directory = tempfile.mkdtemp(prefix="persistence-benchmark-")
+        try:
+            benchmark(name, cls, directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    print("journal us: extra time per write; pause ms: request-path stall of the forked snapshot;")
+    print("writes / worst ms: writes served while the child wrote it, and the slowest of them")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
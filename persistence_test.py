@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Persistence Test
+Checks MemoryPersistence for both memory backends, in-process (no server):
+
+- restart with new settings: a snapshot taken with one configuration
+  (dedup, compaction window, recency half-life, embedding LSH threshold)
+  and restored into managers built with another must run with the new one,
+  with decay rankings, LSH indexes and compaction queues redone for it;
+- crash and restore with tiering: random writes with most users spilled
+  to the cold store, forked and synchronous snapshots, then a restore
+  without a final snapshot (with and without tiering) must bring back
+  every user's messages exactly.
+"""
+
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+from memory.embeddings import HashingEmbedder
+from memory.keyword_extractor import KeywordExtractor
+from memory.persistence import MemoryPersistence
+from memory.recency_manager import RecencyManager
+from memory.user_tiering import ColdUserStore, UserTiering
+
+USERS = 12
+
+def report(name, passed, detail):
+    print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return passed
+
+def make_manager(cls, dedup, window, half_life, lsh_min_vectors):
+    return cls(
+        embedder=HashingEmbedder(),
+        embedding_lsh_min_vectors=lsh_min_vectors,
+        recency=RecencyManager(half_life),
+        dedup_max_distance=dedup,
+        compaction_window=window,
+        digest_size=20
+    )
+
+def check_new_config(cls, directory):
+    results = []
+    manager = make_manager(cls, dedup=3, window=0, half_life=336.0, lsh_min_vectors=0)
+    persistence = MemoryPersistence(directory, manager, KeywordExtractor(), {}, snapshot_interval=10 ** 9)
+    persistence.restore()
+    now = time.time()
+    for i in range(300):
+        manager.add_message("config-user", f"message {i} about coffee and hiking trips", "user")
+    for age_hours, keyword in ((1, "coffee"), (100, "hiking"), (300, "pizza")):
+        manager._apply_preference("config-user", keyword, 0.5, now - age_hours * 3600)
+    persistence.close()
+    
+    manager = make_manager(cls, dedup=None, window=100, half_life=24.0, lsh_min_vectors=50)
+    persistence = MemoryPersistence(directory, manager, KeywordExtractor(), {}, snapshot_interval=10 ** 9)
+    persistence.restore()
+    results.append(report(
+        "  settings kept",
+        (manager.dedup_max_distance, manager.compaction_window, manager.recency.half_life_hours, manager.embedding_lsh_min_vectors)
+        == (None, 100, 24.0, 50),
+        f"dedup {manager.dedup_max_distance}, window {manager.compaction_window}, "
+        f"half-life {manager.recency.half_life_hours}h, LSH from {manager.embedding_lsh_min_vectors} vectors"
+    ))
+    
+    before = manager.count_user_messages("config-user")
+    manager.add_message("config-user", "message 299 about coffee and hiking trips", "user")
+    results.append(report("  dedup off", manager.count_user_messages("config-user") == before + 1, "a repeat is stored"))
+    
+    decayed = manager.top_preferences("config-user", 3, decayed=True)
+    expected = {
+        preference["keyword"]: preference["weight"] * manager.recency.calculate_recency_multiplier(preference["last_seen"])
+        for preference in manager.get_user_preferences("config-user")
+    }
+    errors = [abs(preference["adjusted_weight"] - expected[preference["keyword"]]) for preference in decayed]
+    results.append(report(
+        "  decay rankings at the new half-life",
+        [preference["keyword"] for preference in decayed] == ["coffee", "hiking", "pizza"] and max(errors) < 1e-9,
+        f"largest error {max(errors):.1e}"
+    ))
+    
+    store = manager.embedding_stores.get("config-user")
+    results.append(report("  LSH index built", store is not None and store.lsh is not None, f"{len(store or [])} vectors"))
+    
+    folded = 0
+    while manager.compaction_pending:
+        folded += manager.compact_pending(max_chunks=8)
+    results.append(report("  compaction queued", folded > 0, f"{folded} messages compacted after restore"))
+    persistence.close()
+    return results
+
+def check_crash_restore(cls, directory, fork):
+    cold_path = os.path.join(directory, "cold.db")
+    log_directory = os.path.join(directory, "memory")
+    
+    def build(tiered):
+        manager, keywords, configs = cls(), KeywordExtractor(), {}
+        tiering = UserTiering(manager, keywords, configs, ColdUserStore(cold_path, keep=True), max_hot_users=3) if tiered else None
+        persistence = MemoryPersistence(
+            log_directory, manager, keywords, configs, snapshot_interval=10 ** 9, fork_snapshots=fork, cold_store_path=cold_path
+        )
+        persistence.tiering = tiering
+        stats = persistence.restore()
+        return manager, tiering, persistence, stats
+        
+    manager, tiering, persistence, _ = build(True)
+    rng = random.Random(1)
+    expected = {}
+    for i in range(3000):
+        user_id = f"user-{rng.randrange(USERS)}"
+        tiering.touch(user_id)
+        manager.add_message(user_id, f"message {i} about coffee", "user")
+        expected.setdefault(user_id, []).append(f"message {i} about coffee")
+        if i % 700 == 699:
+            persistence.snapshot()
+            persistence.wait_for_snapshot()
+    # Crash: no final snapshot
+    persistence.log.close()
+    tiering.close()
+    
+    results = []
+    for tiered in (True, True, False):
+        manager, tiering, persistence, stats = build(tiered)
+        wrong = 0
+        for user_id, messages in expected.items():
+            if tiering:
+                tiering.touch(user_id)
+            stored = [message["content"] for message in reversed(manager.get_user_messages(user_id, 10000))]
+            wrong += stored != messages
+        results.append(report(
+            f"  {'forked' if fork else 'synchronous'} snapshots, restore {'with' if tiered else 'without'} tiering",
+            wrong == 0,
+            f"{USERS - wrong}/{USERS} users exact, {stats['records_replayed']} records replayed, {stats['records_skipped']} skipped"
+        ))
+        persistence.log.close()
+        if tiering:
+            tiering.close()
+    return results
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    results = []
+    for cls in (SimpleGraphManager, CompactGraphManager):
+        print(cls.__name__)
+        checks = [lambda directory: check_new_config(cls, directory)]
+        checks += [lambda directory, fork=fork: check_crash_restore(cls, directory, fork) for fork in (True, False)]
+        for check in checks:
+            directory = tempfile.mkdtemp(prefix="persistence-")
+            try:
+                results += check(directory)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Preference Filter Benchmark
+Simulates 300 users sending 30 messages each of 10 words: 3 generic verbs
+every user says, 2 of the user's own 30 topic words and 5 from a shared 2k
+vocabulary. Every message goes through the chat service's keyword tracking
+and preference scoring, once with the document-frequency gate off
+(PREFERENCE_MIN_IDF=0) and once at the configured minimum idf, and the
+resulting preference nodes are counted. Generic preferences should mostly
+disappear while topic preferences survive. Runs in-process; no server.
+
+    python preference_filter_benchmark.py         # 300 users
+    python preference_filter_benchmark.py 1000
+"""
+
+import random
+import sys
+import time
+import structlog
+from app.config import settings
+from app.simple_chat_service import SimpleChatService
+
+USERS = 300
+MESSAGES_PER_USER = 30
+GENERIC = ["want", "need", "really", "like", "know", "think", "get", "make", "going", "thanks", "please", "help", "tell", "good", "well"]
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    rng = random.Random(0)
+    shared = ["".join(rng.choice("abcdefghij") for _ in range(6)) for _ in range(2000)]
+    topics = {f"user-{i}": ["".join(rng.choice("klmnopqrst") for _ in range(7)) for _ in range(30)] for i in range(USERS)}
+    messages = []
+    for _ in range(MESSAGES_PER_USER):
+        for user_id, words in topics.items():
+            message = rng.sample(GENERIC, 3) + rng.sample(words, 2) + rng.sample(shared, 5)
+            rng.shuffle(message)
+            messages.append((user_id, " ".join(message)))
+            
+    min_idf = settings.preference_min_idf
+    print(f"{USERS} users, {len(messages)} messages, min idf {min_idf} after {settings.preference_idf_min_documents} messages")
+    print(f"{'gate':<5} {'nodes':>7} {'per user':>9} {'generic':>8} {'topic':>7} {'suppressed':>11} {'us/message':>11}")
+    for gate in (0.0, min_idf):
+        settings.preference_min_idf = gate
+        service = SimpleChatService()
+        start = time.perf_counter()
+        for user_id, message in messages:
+            changed = service.keyword_extractor.track_user_keywords(user_id, message)
+            service.graph_manager.create_preferences(user_id, service.score_preferences(user_id, changed))
+        elapsed = time.perf_counter() - start
+        manager = service.graph_manager
+        nodes = manager.count_preferences()
+        generic = sum(manager.has_preference(user_id, keyword) for user_id in topics for keyword in GENERIC)
+        topic = sum(manager.has_preference(user_id, keyword) for user_id, words in topics.items() for keyword in words)
+        suppressed = sum(service.suppressed_preferences.values())
+        label = "on" if gate else "off"
+        print(f"{label:<5} {nodes:>7} {nodes / USERS:>9.1f} {generic:>8} {topic:>7} {suppressed:>11} {elapsed / len(messages) * 1e6:>11.0f}")
+    settings.preference_min_idf = min_idf
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        USERS = int(sys.argv[1])
+    main()
\ No newline at end of file
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Preference Ranking Benchmark
+Gives one user 5000 preferences with random weights on each memory backend
+and times the read every Stage 2+ chat makes: the full listing sorted by
+weight and cut to 5 (get_user_preferences, the old read path) against the
+maintained ranking (top_preferences, raw and recency-decayed), plus the
+cost of a preference update with the ranking upkeep. Runs in-process; no
+server.
+
+    python preference_ranking_benchmark.py          # 5000 preferences
+    python preference_ranking_benchmark.py 50000
+"""
+
+import random
+import sys
+import time
+import structlog
+from memory import CompactGraphManager, SimpleGraphManager
+
+PREFERENCES = 5000
+TOP_K = 5
+READS = 200
+
+def mean_us(func, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    print(f"one user, {PREFERENCES} preferences, top {TOP_K} (us per call)")
+    print(f"{'backend':<9} {'full sort':>10} {'top-k':>7} {'top-k decayed':>14} {'update':>7} {'same order':>11}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        rng = random.Random(5)
+        manager = cls()
+        now = time.time()
+        for i in range(PREFERENCES):
+            manager._apply_preference("user", f"keyword{i}", rng.random(), now - rng.uniform(0, 90 * 86400))
+            
+        full = mean_us(lambda: manager.get_user_preferences("user")[:TOP_K], max(READS // 10, 5))
+        top = mean_us(lambda: manager.top_preferences("user", TOP_K), READS)
+        decayed = mean_us(lambda: manager.top_preferences("user", TOP_K, decayed=True), READS)
+        keywords = [f"keyword{rng.randrange(PREFERENCES)}" for _ in range(READS)]
+        start = time.perf_counter()
+        for keyword in keywords:
+            manager.create_preference("user", keyword)
+        update = (time.perf_counter() - start) / len(keywords) * 1e6
+        same = [p["keyword"] for p in manager.get_user_preferences("user")[:TOP_K]] == [
+            p["keyword"] for p in manager.top_preferences("user", TOP_K)
+        ]
+        print(f"{name:<9} {full:>10.0f} {top:>7.1f} {decayed:>14.1f} {update:>7.1f} {str(same):>11}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        PREFERENCES = int(sys.argv[1])
+    main()
\ No newline at end of file
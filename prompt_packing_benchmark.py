@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Prompt Packing Benchmark
+Builds prompts for users whose history mixes short chat turns with long
+pasted messages, the old way (first 5 memory nodes, whole) and through the
+token-budget PromptPacker (exact counts with a cold and a warm token cache,
+and approximate counts), and reports build time and prompt tokens.
+Runs in-process; no server or API keys.
+"""
+
+import random
+import sys
+import time
+import structlog
+import tiktoken
+from app.prompt_packer import PromptPacker
+from llm.base import LLMConfig
+from llm.openai_client import _encoder
+from llm.stub_client import StubClient
+
+USERS = 200
+TURNS = 20             # prompts built per user
+PASTE_RATE = 0.2       # fraction of history messages that are long pastes
+PASTE_WORDS = (300, 1500)
+
+WORDS = (
+    "the a to and of in is it you that for on with this my be are have i was not but what can do so "
+    "about like just how your if from or me one all would there they will an by at up out when should "
+    "python code function error server database memory request response cache token model prompt user "
+    "message history context budget latency query index search result value list string number file "
+    "music coffee travel weekend book movie pizza garden running guitar photo recipe city mountain"
+).split()
+
+def offline_encoding() -> tiktoken.Encoding:
+    """Stand-in BPE over the benchmark vocabulary, for when no tiktoken encoding can be downloaded"""
+    ranks = {bytes([byte]): byte for byte in range(256)}
+    pieces = sorted({
+        piece[start:end]
+        for word in WORDS for piece in (word, " " + word)
+        for start in range(len(piece)) for end in range(start + 2, len(piece) + 1)
+    }, key=len)
+    for piece in pieces:
+        ranks.setdefault(piece.encode(), len(ranks))
+    return tiktoken.Encoding(
+        "offline-bpe",
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={}
+    )
+
+class TokenizingStub(StubClient):
+    def __init__(self, encoding: tiktoken.Encoding):
+        super().__init__(default_model="gpt-4o-mini")
+        self.encoding = encoding
+        self.encoded = 0
+        
+    def count_tokens(self, text: str) -> int:
+        self.encoded += 1
+        return len(self.encoding.encode(text))
+
+def make_history(rng: random.Random, user: int):
+    history = []
+    for seq in range(40):
+        words = rng.randint(*PASTE_WORDS) if rng.random() < PASTE_RATE else rng.randint(5, 25)
+        history.append({"id": f"msg-u{user}-{seq}", "content": " ".join(rng.choice(WORDS) for _ in range(words))})
+    return history
+
+def legacy_memory_lines(memory_nodes):
+    lines = []
+    for node in memory_nodes[:5]:
+        if node.get("content"):
+            lines.append(f"- {node['content']}")
+        elif node.get("keyword"):
+            lines.append(f"- User likes: {node['keyword']}")
+    return lines
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    encoding = _encoder("gpt-4o-mini")
+    tokenizer = "tiktoken gpt-4o-mini"
+    if encoding is None:
+        encoding, tokenizer = offline_encoding(), "offline stand-in BPE (tiktoken encodings not downloadable)"
+    client = TokenizingStub(encoding)
+    config = LLMConfig()
+    rng = random.Random(7)
+    
+    # Each prompt sees 8 recent messages and 2 preferences, like Stage 2-3 retrieval
+    workload = []
+    for user in range(USERS):
+        history = make_history(rng, user)
+        for turn in range(TURNS):
+            recent = list(reversed(history[turn:turn + 8]))
+            preferences = [{"id": f"pref-u{user}-{kw}", "keyword": kw} for kw in rng.sample(WORDS[-12:], 2)]
+            workload.append(("what do you remember about me?", recent + preferences))
+            
+    modes = {
+        "old (first 5 whole)": None,
+        "packed exact, cold": PromptPacker(exact=True),
+        "packed approximate": PromptPacker(exact=False)
+    }
+    print(f"tokenizer: {tokenizer}; {len(workload)} prompts")
+    print(f"{'mode':<22} {'build us':>9} {'encodes':>8} {'tokens avg':>11} {'tokens p95':>11} {'tokens max':>11}")
+    for name, packer in modes.items():
+        runs = [("", packer)]
+        if name == "packed exact, cold":
+            runs.append(("packed exact, warm", packer))
+        for label, run_packer in runs:
+            client.encoded = 0
+            start = time.perf_counter()
+            prompts = []
+            for message, nodes in workload:
+                if run_packer is None:
+                    lines = legacy_memory_lines(nodes)
+                else:
+                    lines, _ = run_packer.pack(message, nodes, "Stage 2", client, config)
+                prompts.append("\n".join(["Previous context:", *lines, f"\nCurrent message: {message}"]))
+            build_us = (time.perf_counter() - start) / len(workload) * 1e6
+            encodes = client.encoded
+            tokens = sorted(len(encoding.encode(prompt)) for prompt in prompts)
+            print(
+                f"{label or name:<22} {build_us:>9.1f} {encodes:>8} {sum(tokens) / len(tokens):>11.0f} "
+                f"{tokens[int(len(tokens) * 0.95)]:>11} {tokens[-1]:>11}"
+            )
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        USERS = int(sys.argv[1])
+    main()
\ No newline at end of file
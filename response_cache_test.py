@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Response Cache Test
+Repeats one message for a user, sequentially, over /chat and /chat/stream,
+and checks that the response cache answers once the prompt (which embeds
+the recent history) repeats, that a hit returns the reply the provider
+gave for that prompt without calling it, and that a new message (a prompt
+the cache has not seen) still reaches the provider. Start the server with
+the stub provider and the cache on:
+
+    LLM_PROVIDER=stub STUB_LLM_LATENCY_MS=200 RESPONSE_CACHE_ENABLED=true python -m app.simple_main
+"""
+
+import json
+import sys
+import uuid
+import httpx
+
+API_BASE = "http://localhost:8001"
+REPEATS = 8
+MESSAGE = "What should I cook tonight?"
+
+def metrics(client):
+    data = client.get(f"{API_BASE}/metrics").json()
+    if "stub_llm" not in data or "response_cache" not in data:
+        sys.exit("Server needs LLM_PROVIDER=stub and RESPONSE_CACHE_ENABLED=true")
+    return data["stub_llm"]["calls"], data["response_cache"]["hits"]
+
+def chat(client, user_id, message):
+    payload = {"userId": user_id, "message": message, "config": {"temperature": 0}}
+    return client.post(f"{API_BASE}/chat", json=payload).json()["response"]
+
+def chat_stream(client, user_id, message):
+    payload = {"userId": user_id, "message": message, "config": {"temperature": 0}}
+    parts = []
+    with client.stream("POST", f"{API_BASE}/chat/stream", json=payload) as response:
+        for line in response.iter_lines():
+            if line.startswith("data: "):
+                data = json.loads(line[6:])
+                if "text" in data:
+                    parts.append(data["text"])
+    return "".join(parts)
+
+def report(name, passed, detail):
+    print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return passed
+
+def check(client, name, send):
+    user_id = f"cache-{name}-{uuid.uuid4().hex[:8]}"
+    results = []
+    calls_before, hits_before = metrics(client)
+    replies = [send(client, user_id, MESSAGE) for _ in range(REPEATS)]
+    calls, hits = metrics(client)
+    calls -= calls_before
+    hits -= hits_before
+    results.append(report(
+        f"{name} repeats hit",
+        hits > 0 and calls + hits == REPEATS and len(set(replies)) == 1,
+        f"{REPEATS} identical messages -> {calls} provider calls, {hits} cache hits, {len(set(replies))} distinct replies"
+    ))
+    
+    calls_before, hits_before = metrics(client)
+    send(client, user_id, "Actually, I am vegetarian now")
+    calls, hits = metrics(client)
+    results.append(report(
+        f"{name} new message misses",
+        calls - calls_before == 1 and hits == hits_before,
+        f"{calls - calls_before} provider call, {hits - hits_before} cache hits"
+    ))
+    return results
+
+def main():
+    with httpx.Client(timeout=60) as client:
+        results = check(client, "chat", chat) + check(client, "stream", chat_stream)
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
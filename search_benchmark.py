@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Search Benchmark
+Gives one user 100k messages of 5-40 words drawn from a Zipf-distributed
+vocabulary on each memory backend and times BM25 search
+(search_user_messages, top 3) for queries of 5 to 300 terms, common and
+rare, against the 200 ms memory_retrieval_timeout_ms budget that Stage 4
+retrieval runs under. Runs in-process; no server.
+
+    python search_benchmark.py            # 100k messages
+    python search_benchmark.py 10000
+"""
+
+import itertools
+import random
+import string
+import sys
+import time
+import structlog
+from app.config import settings
+from memory import CompactGraphManager, SimpleGraphManager
+
+MESSAGES = 100000
+REPEATS = 5
+
+def main():
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(40))
+    rng = random.Random(0)
+    vocabulary = ["".join(letters) for letters in itertools.islice(itertools.product(string.ascii_lowercase, repeat=4), 20000)]
+    vocabulary[:10] = ["really", "like", "want", "need", "coffee", "morning", "project", "python", "espresso", "debugging"]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    
+    def words(count: int):
+        return rng.choices(vocabulary, cum_weights=weights, k=count)
+        
+    messages = [" ".join(words(rng.randint(5, 40))) for _ in range(MESSAGES)]
+    queries = [
+        ("12 terms, common", "I really like espresso in the morning while debugging my python project"),
+        ("5 terms", "what coffee do you recommend"),
+        ("10 terms, rare", " ".join(vocabulary[500:510])),
+        ("60 terms", " ".join(words(60))),
+        ("300 terms", " ".join(words(300)))
+    ]
+    budget = settings.memory_retrieval_timeout_ms
+    print(f"one user, {MESSAGES} messages; BM25 top 3, ms per query (budget {budget} ms)")
+    print(f"{'backend':<9} {'index us/msg':>13} " + " ".join(f"{name:>17}" for name, _ in queries) + f" {'budget':>7}")
+    for name, cls in (("networkx", SimpleGraphManager), ("compact", CompactGraphManager)):
+        manager = cls()
+        start = time.perf_counter()
+        for i, message in enumerate(messages):
+            manager.add_message("user", message, "user" if i % 2 else "assistant")
+        index_us = (time.perf_counter() - start) / MESSAGES * 1e6
+        latencies = []
+        for _, query in queries:
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                manager.search_user_messages("user", query, limit=3)
+            latencies.append((time.perf_counter() - start) / REPEATS * 1000)
+        verdict = "ok" if max(latencies) < budget else "over"
+        print(f"{name:<9} {index_us:>13.1f} " + " ".join(f"{latency:>17.1f}" for latency in latencies) + f" {verdict:>7}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        MESSAGES = int(sys.argv[1])
+    main()
\ No newline at end of file
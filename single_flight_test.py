@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Coalescing Test
+Fires bursts of identical concurrent /chat requests (double submits, client
+retries) and checks that each distinct request reaches the provider exactly
+once and is stored in memory exactly once, and that an idempotency key
+reused for a different message is refused. Start the server with the stub
+provider and a rate limit above the burst size:
+
+    LLM_PROVIDER=stub STUB_LLM_LATENCY_MS=500 MAX_CONCURRENT_USERS=1000 python -m app.simple_main
+"""
+
+import asyncio
+import sys
+import uuid
+import httpx
+
+API_BASE = "http://localhost:8001"
+USERS = 5
+BURST = 20
+
+async def upstream_calls(client):
+    metrics = (await client.get(f"{API_BASE}/metrics")).json()
+    if "stub_llm" not in metrics:
+        sys.exit("Server is not running the stub provider (LLM_PROVIDER=stub)")
+    return metrics["stub_llm"]["calls"]
+
+async def burst(client, payload):
+    responses = await asyncio.gather(*(
+        client.post(f"{API_BASE}/chat", json=payload, timeout=60) for _ in range(BURST)
+    ))
+    return [response.json() for response in responses]
+
+async def conversation_count(client, user_id):
+    return (await client.get(f"{API_BASE}/memory/{user_id}")).json()["conversationCount"]
+
+def report(name, passed, detail):
+    print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return passed
+
+async def main():
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=USERS * BURST)
+    async with httpx.AsyncClient(limits=limits) as client:
+        results = []
+        
+        # Identical concurrent requests without a key: one provider call per user
+        calls_before = await upstream_calls(client)
+        users = [f"flight-{run_id}-{slot}" for slot in range(USERS)]
+        bursts = await asyncio.gather(*(
+            burst(client, {"userId": user_id, "message": "I enjoy hiking and strong coffee", "config": {"temperature": 0}})
+            for user_id in users
+        ))
+        calls = await upstream_calls(client) - calls_before
+        counts = [await conversation_count(client, user_id) for user_id in users]
+        results.append(report(
+            "duplicate submits",
+            calls == USERS and all(count == 2 for count in counts),
+            f"{USERS} users x {BURST} concurrent requests -> {calls} provider calls, messages stored per user {counts}"
+        ))
+        results.append(report(
+            "shared replies",
+            all(len({response["response"] for response in responses}) == 1 for responses in bursts),
+            "every request in a burst got the same reply"
+        ))
+        
+        # Same idempotency key: one run, concurrent and later replays get the stored response
+        user_id = f"idem-{run_id}"
+        payload = {"userId": user_id, "message": "Plan a weekend trip", "idempotencyKey": f"key-{run_id}"}
+        calls_before = await upstream_calls(client)
+        responses = await burst(client, payload)
+        responses += [(await client.post(f"{API_BASE}/chat", json=payload, timeout=60)).json() for _ in range(3)]
+        calls = await upstream_calls(client) - calls_before
+        count = await conversation_count(client, user_id)
+        request_ids = {response["requestId"] for response in responses}
+        results.append(report(
+            "idempotency key",
+            calls == 1 and count == 2 and len(request_ids) == 1,
+            f"{len(responses)} requests -> {calls} provider call, {len(request_ids)} distinct requestId, {count} messages stored"
+        ))
+        
+        # The same key with another message: refused while the first request runs and after it is stored
+        user_id = f"reuse-{run_id}"
+        payload = {"userId": user_id, "message": "Plan a weekend trip", "idempotencyKey": f"key-{run_id}"}
+        other = {**payload, "message": "Book a table for two"}
+        first, during = await asyncio.gather(
+            client.post(f"{API_BASE}/chat", json=payload, timeout=60),
+            client.post(f"{API_BASE}/chat", json=other, timeout=60)
+        )
+        after = await client.post(f"{API_BASE}/chat", json=other, timeout=60)
+        count = await conversation_count(client, user_id)
+        results.append(report(
+            "idempotency key reused",
+            first.status_code == 200 and during.status_code == 409 and after.status_code == 409 and count == 2,
+            f"first {first.status_code}, different message during run {during.status_code}, after {after.status_code}, "
+            f"{count} messages stored"
+        ))
+        
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file